@@ -1,66 +1,513 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Blueprint, Response, current_app, g, make_response, request, jsonify, render_template, send_from_directory
+from flask.json.provider import DefaultJSONProvider
+import hmac
 import os
-from predict_disease import DiseasePredictor
+import threading
+import time
+import metrics
+from http_caching import init_http_caching, validated_by_model
+from inference_pool import BatchingExecutor, InferenceTimeout, Overloaded
+from predict_disease import DiseasePredictor, model_version_on_disk
+from prediction_cache import LRUCache
 
-app = Flask(__name__, static_folder='static')
+try:
+    import orjson
+except ImportError:  # optional: responses fall back to Flask's stdlib JSON encoder
+    orjson = None
 
-predictor = None
+bp = Blueprint('medica', __name__)
 
-def load_predictor():
-    global predictor
-    if predictor is None:
+# Upper bound on the number of records accepted by /api/predict/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 5000))
+
+# Upper bound on the suggestions returned by /api/symptoms/suggest
+MAX_SUGGESTIONS = 50
+
+# Entries per prediction/parse cache (0 disables) and optional entry lifetime in seconds
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+PREDICTION_CACHE_TTL = float(os.environ['PREDICTION_CACHE_TTL']) if os.environ.get('PREDICTION_CACHE_TTL') else None
+
+MODEL_DIR = os.environ.get('MODEL_DIR', 'models')
+
+# 'sklearn' (pickled forest), 'compiled' (flat-array export, no sklearn import)
+# or 'mmap' (compiled forest memory-mapped from models/bundles, shared by workers)
+MODEL_ENGINE = os.environ.get('MODEL_ENGINE', 'sklearn')
+
+# Seconds between checks of MODEL_DIR for a new model (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 30))
+
+# Shared secret for POST /api/admin/reload (the endpoint is disabled when unset)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Inference pool: threads running the model off the request thread (0 runs it
+# inline), queued jobs before requests are shed with 503, inputs coalesced per
+# model call, how long a worker waits to coalesce, and the per-request timeout
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+INFERENCE_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE', 256))
+INFERENCE_MAX_BATCH = int(os.environ.get('INFERENCE_MAX_BATCH', 64))
+INFERENCE_BATCH_WINDOW_MS = float(os.environ.get('INFERENCE_BATCH_WINDOW_MS', 2))
+INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 5))
+
+# Responses smaller than this many bytes are not compressed, and the gzip level used
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+# Add a Server-Timing header with the per-stage durations to every response
+SERVER_TIMING = os.environ.get('SERVER_TIMING') == '1'
+
+_load_lock = threading.Lock()
+_reload_lock = threading.Lock()
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson
+
+    Serializes NumPy scalars and arrays natively and keeps keys in insertion
+    order (the stdlib provider sorts them), which is several times faster for
+    prediction responses. Anything orjson rejects goes through the stdlib path.
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        try:
+            return orjson.dumps(obj, option=self.option).decode()
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+def create_app(model_dir=MODEL_DIR, load_model=True):
+    """
+    Application factory
+
+    The predictor is loaded here, before the app is handed to the server, so no
+    request ever triggers a model load. Under gunicorn with preload_app this runs
+    once in the master process and the workers share the loaded model.
+
+    Args:
+        model_dir: Directory containing trained model files
+        load_model: Load the predictor immediately (False leaves the app not ready)
+    """
+    app = Flask(__name__, static_folder='static')
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    app.config['MODEL_DIR'] = model_dir
+    app.extensions['predictor'] = None
+    app.extensions['predictor_error'] = None
+    app.extensions['last_reload'] = None
+    app.extensions['model_watcher'] = None
+    app.extensions['inference_pool'] = None
+    # Shared by every predictor this app loads; keys carry the model version
+    app.extensions['parse_cache'] = LRUCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+    app.extensions['prediction_cache'] = LRUCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+    if INFERENCE_WORKERS > 0:
+        app.extensions['inference_pool'] = BatchingExecutor(
+            lambda: app.extensions.get('predictor'),
+            workers=INFERENCE_WORKERS,
+            max_queue=INFERENCE_QUEUE_SIZE,
+            max_batch=INFERENCE_MAX_BATCH,
+            batch_window=INFERENCE_BATCH_WINDOW_MS / 1000,
+            timeout=INFERENCE_TIMEOUT
+        )
+    app.register_blueprint(bp)
+    init_http_caching(app, min_size=COMPRESS_MIN_SIZE, level=COMPRESS_LEVEL)
+    metrics.REGISTRY.set_collector('app', lambda: collect_app_metrics(app))
+
+    if load_model:
+        load_predictor(app)
+    return app
+
+def build_predictor(app):
+    return DiseasePredictor(
+        model_dir=app.config['MODEL_DIR'],
+        engine=MODEL_ENGINE,
+        parse_cache=app.extensions['parse_cache'],
+        prediction_cache=app.extensions['prediction_cache']
+    )
+
+def load_predictor(app):
+    """Load the predictor for app exactly once, even if called from several threads"""
+    with _load_lock:
+        if app.extensions.get('predictor') is not None:
+            return app.extensions['predictor']
+
+        start = time.perf_counter()
         try:
-            predictor = DiseasePredictor(model_dir='models')
-            print("✅ Predictor loaded!")
-        except Exception as e:
+            app.extensions['predictor'] = build_predictor(app)
+            app.extensions['predictor_error'] = None
+            record_model_load('success', start)
+            print(f"✅ Predictor loaded in {time.perf_counter() - start:.2f}s!")
+        except (Exception, SystemExit) as e:
+            # DiseasePredictor exits on missing files; keep serving so health checks can report it
+            app.extensions['predictor_error'] = str(e)
+            record_model_load('failure', start)
             print("❌ Predictor failed to load:", e)
+        return app.extensions['predictor']
+
+def record_model_load(outcome, start):
+    metrics.MODEL_LOADS.inc(outcome=outcome)
+    metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - start, outcome=outcome)
+
+def smoke_test(predictor):
+    """Run one prediction through predictor, raising RuntimeError if it can't serve"""
+    results = predictor.predict_and_info(', '.join(predictor.symptom_list[:3]))
+    if 'error' in results:
+        raise RuntimeError(f"Smoke prediction failed: {results['error']}")
+    probability = results['top_prediction']['probability']
+    if not 0.0 <= probability <= 1.0:
+        raise RuntimeError(f"Smoke prediction returned probability {probability}")
+
+def reload_predictor(app, force=False):
+    """
+    Load the model currently in MODEL_DIR and swap it in if it passes a smoke test
+
+    The new predictor is built next to the serving one and published with a
+    single reference assignment, so requests that already hold the old predictor
+    finish on it while new requests get the new one. A model that fails to load
+    or to predict is discarded and the old one keeps serving.
+
+    Args:
+        app: Application whose predictor is replaced
+        force: Reload even if the model version on disk is the one being served
+
+    Returns:
+        'reloaded', 'unchanged', 'busy' (another reload is running) or 'failed'
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return 'busy'
+    try:
+        current = app.extensions.get('predictor')
+        on_disk = model_version_on_disk(app.config['MODEL_DIR'], MODEL_ENGINE)
+        if not force and current is not None and on_disk == current.model_version:
+            return 'unchanged'
+
+        start = time.perf_counter()
+        try:
+            candidate = build_predictor(app)
+            smoke_test(candidate)
+        except (Exception, SystemExit) as e:
+            record_model_load('failure', start)
+            app.extensions['last_reload'] = {'status': 'failed', 'error': str(e), 'at': time.time()}
+            print("❌ Model reload failed, keeping the current model:", e)
+            return 'failed'
+
+        record_model_load('success', start)
+        app.extensions['predictor'] = candidate
+        app.extensions['predictor_error'] = None
+        app.extensions['last_reload'] = {
+            'status': 'reloaded',
+            'model_version': candidate.model_version,
+            'previous_version': current.model_version if current is not None else None,
+            'load_seconds': round(time.perf_counter() - start, 3),
+            'at': time.time()
+        }
+        print(f"✅ Model {candidate.model_version} swapped in after {time.perf_counter() - start:.2f}s")
+        return 'reloaded'
+    finally:
+        _reload_lock.release()
+
+def start_model_watcher(app, interval=MODEL_WATCH_INTERVAL):
+    """
+    Poll MODEL_DIR from a daemon thread and hot-reload when the model changes
+
+    Threads don't survive fork, so this must run in every serving process:
+    gunicorn.conf.py calls it from post_fork, the development server at startup.
+
+    Returns:
+        The watcher thread, or None if watching is disabled or already running
+    """
+    if interval <= 0 or app.extensions.get('model_watcher') is not None:
+        return None
+
+    def watch():
+        model_dir = app.config['MODEL_DIR']
+        current = app.extensions.get('predictor')
+        seen = current.model_version if current is not None else None
+        pending = None
+        while True:
+            time.sleep(interval)
+            try:
+                version = model_version_on_disk(model_dir, MODEL_ENGINE)
+            except OSError:
+                continue
+            if version is None or version == seen:
+                pending = None
+                continue
+            # Joblib artifacts are rewritten file by file, so wait until the
+            # fingerprint holds for a full interval; bundles are published atomically
+            if MODEL_ENGINE != 'mmap' and version != pending:
+                pending = version
+                continue
+            # Remember the version even if it fails to load, so a broken model
+            # isn't retried every interval; the next write changes the version
+            seen, pending = version, None
+            reload_predictor(app)
+
+    thread = threading.Thread(target=watch, name='model-watcher', daemon=True)
+    thread.start()
+    app.extensions['model_watcher'] = thread
+    return thread
+
+def get_predictor():
+    """Predictor of the current app, or None if it failed to load"""
+    return current_app.extensions.get('predictor')
+
+def model_unavailable():
+    return jsonify({'error': 'Model not loaded. Please try again later.'}), 503
+
+@bp.before_app_request
+def start_request_timing():
+    g.request_start = time.perf_counter()
+    metrics.begin_timing()
+
+@bp.after_app_request
+def record_request_timing(response):
+    timings = metrics.finish_timing() or {}
+    total = time.perf_counter() - g.get('request_start', time.perf_counter())
+    metrics.REQUEST_SECONDS.observe(total, endpoint=request.endpoint or 'unmatched')
+    if SERVER_TIMING:
+        entries = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in timings.items()]
+        entries.append(f'total;dur={total * 1000:.3f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
+def server_busy(message):
+    response = jsonify({'error': f'{message}. Please try again later.'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@bp.route('/healthz')
+def liveness():
+    # The process is up and serving requests
+    return jsonify({'status': 'alive'}), 200
+
+@bp.route('/readyz')
+def readiness():
+    predictor = get_predictor()
+    if predictor is None:
+        return jsonify({
+            'status': 'not ready',
+            'error': current_app.extensions.get('predictor_error') or 'Model not loaded'
+        }), 503
+    return jsonify({
+        'status': 'ready',
+        'model_version': predictor.model_version,
+        'last_reload': current_app.extensions.get('last_reload')
+    }), 200
+
+@bp.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Start a background model reload in this process
+
+    Requires the X-Admin-Token header to match ADMIN_TOKEN. Under gunicorn only
+    the worker that receives the call reloads immediately; the model watcher
+    brings the other workers over within MODEL_WATCH_INTERVAL seconds.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Reload endpoint disabled (ADMIN_TOKEN is not set)'}), 404
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    if _reload_lock.locked():
+        return jsonify({'error': 'A reload is already in progress'}), 409
+
+    app = current_app._get_current_object()
+    force = request.args.get('force') == '1'
+    threading.Thread(target=reload_predictor, args=(app, force),
+                     name='model-reload', daemon=True).start()
 
-@app.route('/')
+    predictor = get_predictor()
+    return jsonify({
+        'status': 'reloading',
+        'model_version': predictor.model_version if predictor is not None else None
+    }), 202
+
+@bp.route('/')
 def index():
-    return render_template('index.html')
+    # The page embeds fingerprinted asset URLs, so its ETag changes with them
+    response = make_response(render_template('index.html'))
+    response.add_etag()
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
-@app.route('/api/predict', methods=['POST'])
+@bp.route('/api/predict', methods=['POST'])
 def predict():
-    global predictor
-    load_predictor()
-    
+    predictor = get_predictor()
     if predictor is None:
-        return jsonify({'error': 'Model not loaded. Please try again later.'}), 500
+        return model_unavailable()
 
     try:
         data = request.json
         symptoms = data.get('symptoms', '')
 
         if not symptoms:
+            metrics.REQUESTS.inc(endpoint='predict', outcome='bad_request')
             return jsonify({'error': 'No symptoms provided'}), 400
 
-        results = predictor.predict_and_info(symptoms)
-        messages = format_results_for_chat(results)
+        pool = current_app.extensions.get('inference_pool')
+        if pool is not None:
+            results = pool.predict(symptoms)
+        else:
+            results = predictor.predict_and_info(symptoms)
+        with metrics.stage('format'):
+            messages = format_results_for_chat(results, predictor)
 
+        metrics.REQUESTS.inc(endpoint='predict',
+                             outcome='no_valid_symptoms' if 'error' in results else 'success')
         return jsonify({
             'status': 'success',
             'messages': messages,
             'raw_results': results
         }), 200
 
+    except Overloaded:
+        metrics.REQUESTS.inc(endpoint='predict', outcome='overloaded')
+        return server_busy('Server busy')
+    except InferenceTimeout:
+        metrics.REQUESTS.inc(endpoint='predict', outcome='timeout')
+        return server_busy('Prediction timed out')
     except Exception as e:
-        app.logger.error(f"Error in prediction: {str(e)}")
+        metrics.REQUESTS.inc(endpoint='predict', outcome='error')
+        current_app.logger.error(f"Error in prediction: {str(e)}")
         return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
 
-@app.route('/api/symptoms')
-def get_symptoms():
-    global predictor
-    load_predictor()
+@bp.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    predictor = get_predictor()
+    if predictor is None:
+        return model_unavailable()
+
+    try:
+        data = request.json
+        # Accept either a bare JSON array or {"symptoms": [...]}
+        records = data.get('symptoms') if isinstance(data, dict) else data
+
+        if not isinstance(records, list) or not records:
+            metrics.REQUESTS.inc(endpoint='predict_batch', outcome='bad_request')
+            return jsonify({'error': 'Expected a non-empty JSON array of symptom strings'}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            metrics.REQUESTS.inc(endpoint='predict_batch', outcome='bad_request')
+            return jsonify({'error': f'Batch too large (max {MAX_BATCH_SIZE} records)'}), 413
+
+        # Each record may be a comma-separated string or a list of symptom names
+        symptom_inputs = [
+            ', '.join(map(str, r)) if isinstance(r, list) else str(r or '')
+            for r in records
+        ]
+        pool = current_app.extensions.get('inference_pool')
+        if pool is not None:
+            results = pool.predict_many(symptom_inputs)
+        else:
+            results = predictor.predict_and_info_batch(symptom_inputs)
+
+        metrics.REQUESTS.inc(endpoint='predict_batch', outcome='success')
+        return jsonify({
+            'status': 'success',
+            'count': len(results),
+            'results': results
+        }), 200
+
+    except Overloaded:
+        metrics.REQUESTS.inc(endpoint='predict_batch', outcome='overloaded')
+        return server_busy('Server busy')
+    except InferenceTimeout:
+        metrics.REQUESTS.inc(endpoint='predict_batch', outcome='timeout')
+        return server_busy('Batch prediction timed out')
+    except Exception as e:
+        metrics.REQUESTS.inc(endpoint='predict_batch', outcome='error')
+        current_app.logger.error(f"Error in batch prediction: {str(e)}")
+        return jsonify({'error': f'Batch prediction failed: {str(e)}'}), 500
 
+@bp.route('/api/symptoms')
+@validated_by_model(get_predictor)
+def get_symptoms():
+    predictor = get_predictor()
     if predictor is None:
-        return jsonify({'error': 'Model not loaded. Please try again later.'}), 500
+        return model_unavailable()
 
     return jsonify({
         'status': 'success',
         'symptoms': predictor.symptom_list
     }), 200
 
-def format_results_for_chat(results):
+@bp.route('/api/symptoms/suggest')
+@validated_by_model(get_predictor)
+def suggest_symptoms():
+    predictor = get_predictor()
+    if predictor is None:
+        return model_unavailable()
+
+    query = request.args.get('q', '')
+    rank = request.args.get('rank', 'name')
+    try:
+        limit = min(max(int(request.args.get('limit', 7)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if rank not in predictor.suggester.rankings:
+        return jsonify({'error': f"rank must be one of {', '.join(predictor.suggester.rankings)}"}), 400
+
+    return jsonify({
+        'status': 'success',
+        'query': query,
+        'suggestions': predictor.suggest_symptoms(query, limit, rank)
+    }), 200
+
+@bp.route('/api/cache/stats')
+def cache_stats():
+    predictor = get_predictor()
+    if predictor is None:
+        return model_unavailable()
+
+    return jsonify({
+        'status': 'success',
+        'cache': predictor.cache_stats()
+    }), 200
+
+@bp.route('/api/pool/stats')
+def pool_stats():
+    pool = current_app.extensions.get('inference_pool')
+    if pool is None:
+        return jsonify({'status': 'disabled'}), 200
+
+    return jsonify({
+        'status': 'success',
+        'pool': pool.stats()
+    }), 200
+
+CACHE_EVENTS = metrics.REGISTRY.register(metrics.Counter(
+    'medica_cache_events_total', 'Parse/prediction cache events of the serving model', ('cache', 'event')))
+POOL_EVENTS = metrics.REGISTRY.register(metrics.Counter(
+    'medica_inference_pool_events_total', 'Inference pool job counters', ('event',)))
+POOL_QUEUED = metrics.REGISTRY.register(metrics.Gauge(
+    'medica_inference_pool_queued', 'Jobs waiting in the inference pool queue'))
+
+def collect_app_metrics(app):
+    """Mirror the cache and pool counters of app into the registry before each snapshot"""
+    for cache in ('parse', 'prediction'):
+        stats = app.extensions[f'{cache}_cache'].stats()
+        for outcome in ('hits', 'misses', 'evictions', 'expirations'):
+            CACHE_EVENTS.set(stats[outcome], cache=cache, event=outcome)
+    pool = app.extensions.get('inference_pool')
+    if pool is not None:
+        stats = pool.stats()
+        POOL_QUEUED.set(stats['queued'])
+        for event in ('submitted', 'rejected', 'timeouts', 'batches'):
+            POOL_EVENTS.set(stats[event], event=event)
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    # Under gunicorn this merges the snapshots of every worker (METRICS_MULTIPROC_DIR)
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+def format_results_for_chat(results, predictor=None):
+    """
+    Turn predict_and_info results into chat messages
+
+    With predictor given, the precaution list comes from the bullet blocks it
+    precomputed per disease instead of being rebuilt for every response.
+    """
     messages = []
 
     if 'error' in results:
@@ -70,9 +517,10 @@ def format_results_for_chat(results):
         })
 
         if results.get('suggestions'):
-            suggestions_text = "Did you mean:\n"
-            for original, suggestions in results['suggestions']:
-                suggestions_text += f"• {original} → {', '.join(suggestions)}\n"
+            suggestions_text = "Did you mean:\n" + ''.join(
+                f"• {original} → {', '.join(suggestions)}\n"
+                for original, suggestions in results['suggestions']
+            )
             messages.append({
                 'type': 'text',
                 'content': suggestions_text
@@ -88,26 +536,28 @@ def format_results_for_chat(results):
     })
 
     if pred['precautions']:
-        precautions_text = "⚠️ Recommended Precautions:\n"
-        for p in pred['precautions']:
-            precautions_text += f"• {p}\n"
+        block = predictor.precaution_blocks.get(pred['disease']) if predictor is not None else None
+        if block is None:
+            block = ''.join(f"• {p}\n" for p in pred['precautions'])
         messages.append({
             'type': 'precautions',
-            'content': precautions_text
+            'content': "⚠️ Recommended Precautions:\n" + block
         })
 
     if results['alternative_predictions']:
-        alt_text = "🔄 Alternative possibilities:\n"
-        for alt in results['alternative_predictions']:
-            alt_text += f"• {alt['disease']} ({alt['probability']*100:.1f}%)\n"
+        alt_text = "🔄 Alternative possibilities:\n" + ''.join(
+            f"• {alt['disease']} ({alt['probability']*100:.1f}%)\n"
+            for alt in results['alternative_predictions']
+        )
         messages.append({
             'type': 'alternatives',
             'content': alt_text
         })
 
-    symptom_text = "🩺 Symptom Severity Analysis:\n"
-    for detail in results['symptom_details']:
-        symptom_text += f"• {detail['symptom']}: {detail['severity']} out of 7\n"
+    symptom_text = "🩺 Symptom Severity Analysis:\n" + ''.join(
+        f"• {detail['symptom']}: {detail['severity']} out of 7\n"
+        for detail in results['symptom_details']
+    )
     messages.append({
         'type': 'symptoms',
         'content': symptom_text
@@ -115,11 +565,16 @@ def format_results_for_chat(results):
 
     return messages
 
-@app.route('/favicon.ico')
+@bp.route('/favicon.ico')
 def favicon():
-    return send_from_directory(os.path.join(app.root_path, 'static'),
+    return send_from_directory(current_app.static_folder,
                                'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
+app = create_app()
+
 if __name__ == '__main__':
+    # Development server only; production runs gunicorn -c gunicorn.conf.py
     port = int(os.environ.get('PORT', 10000))
-    app.run(debug=True, host='0.0.0.0', port=port)
+    start_model_watcher(app)
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=port)
+
@@ -0,0 +1,70 @@
+"""
+Microbenchmark for DiseasePredictor feature encoding.
+
+Compares the original encoding (dict comprehension over every known symptom
+wrapped in a one-row DataFrame) with the precomputed symptom index that writes
+into a reusable NumPy row. Only models/symptom_list.joblib is needed, so this
+runs without a trained forest.
+
+Usage:
+    python benchmarks/bench_encoding.py [--model-dir models] [--repeat 20000]
+"""
+import argparse
+import os
+import random
+import timeit
+
+import joblib
+import numpy as np
+import pandas as pd
+
+
+def legacy_encode(symptom_list, symptoms):
+    """Encoding as done before the symptom index was introduced"""
+    feat = {f'has_{sym}': int(sym in symptoms) for sym in symptom_list}
+    return pd.DataFrame([feat])
+
+
+def indexed_encode(symptom_index, row, symptoms):
+    """Encoding through the symptom -> column map and a preallocated row"""
+    cols = [symptom_index[sym] for sym in symptoms if sym in symptom_index]
+    row[0, cols] = 1
+    row[0, cols] = 0  # the predictor clears the row after each prediction
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark symptom feature encoding')
+    parser.add_argument('--model-dir', default='models', help='Directory containing symptom_list.joblib')
+    parser.add_argument('--repeat', type=int, default=20000, help='Encodings per measurement')
+    args = parser.parse_args()
+
+    symptom_list = joblib.load(os.path.join(args.model_dir, 'symptom_list.joblib'))
+    symptom_index = {sym: i for i, sym in enumerate(symptom_list)}
+    row = np.zeros((1, len(symptom_list)), dtype=np.float32)
+
+    rng = random.Random(42)
+    samples = [rng.sample(symptom_list, rng.randint(2, 6)) for _ in range(64)]
+
+    def run_legacy():
+        for symptoms in samples:
+            legacy_encode(symptom_list, symptoms)
+
+    def run_indexed():
+        for symptoms in samples:
+            indexed_encode(symptom_index, row, symptoms)
+
+    loops = max(1, args.repeat // len(samples))
+    n = loops * len(samples)
+    results = {}
+    for name, fn in [('legacy (dict + DataFrame)', run_legacy), ('indexed (NumPy row)', run_indexed)]:
+        best = min(timeit.repeat(fn, number=loops, repeat=3))
+        results[name] = best / n * 1e6
+        print(f"{name:<28} {results[name]:10.2f} us/encoding")
+
+    legacy, indexed = results.values()
+    print(f"Speedup: {legacy / indexed:.1f}x over {n} encodings of {len(symptom_list)} symptoms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark for the training preprocessing stage.
+
+Times the original row-by-row one-hot encoding (iterrows + dict per row +
+DataFrame from a list of dicts + row-wise apply for symptom counts) against
+train_model.encode_symptoms on dataset/dataset.csv and on copies of it
+replicated N times, and checks both produce the same features and stats.
+
+Usage:
+    python benchmarks/bench_preprocessing.py [--replicate 1 100] [--skip-legacy-above 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from train_model import encode_symptoms, load_dataset  # noqa: E402
+
+
+def legacy_encode(df, symptom_cols):
+    """The encoding train_disease_model used before encode_symptoms"""
+    disease_symptom_counts = df.apply(
+        lambda row: sum(1 for col in symptom_cols if row[col]), axis=1
+    )
+    all_symptoms = sorted({
+        s for col in symptom_cols
+        for s in df[col].unique()
+        if s and s != 'nan' and not pd.isna(s)
+    })
+    data = []
+    symptom_occurrence = {sym: 0 for sym in all_symptoms}
+    for _, row in df.iterrows():
+        row_symptoms = [s for s in row[symptom_cols].values if s and s != 'nan']
+        data.append({f'has_{sym}': int(sym in row_symptoms) for sym in all_symptoms})
+        for sym in row_symptoms:
+            if sym in symptom_occurrence:
+                symptom_occurrence[sym] += 1
+    return pd.DataFrame(data), all_symptoms, symptom_occurrence, disease_symptom_counts
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark training preprocessing')
+    parser.add_argument('--dataset', default='dataset/dataset.csv', help='Path to dataset CSV')
+    parser.add_argument('--replicate', type=int, nargs='+', default=[1, 100],
+                        help='Replication factors of the dataset to benchmark')
+    parser.add_argument('--skip-legacy-above', type=int, default=None,
+                        help='Skip the (slow) legacy encoder for datasets with more rows than this')
+    args = parser.parse_args()
+
+    base, symptom_cols = load_dataset(args.dataset)
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for factor in args.replicate:
+        df = pd.concat([base] * factor, ignore_index=True)
+        new, new_time = timed(encode_symptoms, df, symptom_cols)
+
+        if args.skip_legacy_above is not None and len(df) > args.skip_legacy_above:
+            print(f"{len(df):>10} {'skipped':>12} {new_time:>15.3f} {'-':>8}")
+            continue
+
+        old, old_time = timed(legacy_encode, df, symptom_cols)
+        assert list(old[0].columns) == list(new[0].columns), "feature columns differ"
+        assert (old[0].to_numpy() == new[0].to_numpy()).all(), "feature values differ"
+        assert old[1] == new[1] and old[2] == new[2], "symptom vocabulary or occurrence differ"
+        assert (old[3].to_numpy() == new[3].to_numpy()).all(), "symptom counts differ"
+        print(f"{len(df):>10} {old_time:>12.3f} {new_time:>15.3f} {old_time / new_time:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
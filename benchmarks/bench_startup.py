@@ -0,0 +1,104 @@
+"""
+Startup-time check for the serving process.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter (which builds
+the app and loads the model, as a gunicorn worker does) and summarizes:
+total import time, the slowest imports of app.py, the wall time to a ready app,
+and whether heavy libraries got imported. With --engine mmap nothing from
+pandas, scikit-learn or joblib should be loaded; --forbid turns that into a
+failing check and --max-import-ms bounds the total import time.
+
+Usage:
+    python benchmarks/bench_startup.py [--model-dir models] [--engine mmap]
+        [--runs 3] [--top 15] [--max-import-ms 800] [--forbid pandas sklearn joblib]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+PROBE = (
+    "import sys, time, json\n"
+    "start = time.perf_counter()\n"
+    "import app\n"
+    "ready = time.perf_counter() - start\n"
+    "heavy = ('pandas', 'sklearn', 'joblib', 'scipy', 'matplotlib')\n"
+    "print(json.dumps({'ready_s': ready, 'loaded': [m for m in heavy if m in sys.modules],"
+    " 'model_loaded': app.app.extensions.get('predictor') is not None}))\n"
+)
+
+
+def parse_importtime(stderr):
+    """Return (total self time in us, [(cumulative us, module)] for imports up to one level deep)"""
+    total, shallow = 0, []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        total += int(self_us)
+        # -X importtime indents nested imports by two spaces per level; keep the
+        # interpreter's own imports and what app.py imports directly
+        if len(indent) <= 3 and module != 'app':
+            shallow.append((int(cumulative_us), module))
+    return total, sorted(shallow, reverse=True)
+
+
+def measure(model_dir, engine):
+    env = dict(os.environ, MODEL_DIR=model_dir, MODEL_ENGINE=engine, MODEL_WATCH_INTERVAL='0')
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], cwd=REPO_ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    total_us, shallow = parse_importtime(proc.stderr)
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    return total_us, shallow, probe
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure serving startup and import time')
+    parser.add_argument('--model-dir', default='models', help='Directory containing model files')
+    parser.add_argument('--engine', choices=('sklearn', 'compiled', 'mmap'), default='mmap',
+                        help='MODEL_ENGINE used by the app')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to measure (median reported)')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+    parser.add_argument('--max-import-ms', type=float, default=None,
+                        help='Fail if the median total import time exceeds this')
+    parser.add_argument('--forbid', nargs='*', default=None,
+                        help='Fail if any of these modules is imported (e.g. pandas sklearn joblib)')
+    args = parser.parse_args()
+
+    model_dir = os.path.abspath(args.model_dir)
+    runs = [measure(model_dir, args.engine) for _ in range(args.runs)]
+    import_ms = statistics.median(r[0] for r in runs) / 1000
+    ready_s = statistics.median(r[2]['ready_s'] for r in runs)
+    _, shallow, probe = runs[-1]
+
+    print(f"Engine: {args.engine}  model loaded: {probe['model_loaded']}")
+    # app.py builds the app at import time, so the import total includes the model load
+    print(f"Total import time (median of {args.runs}): {import_ms:8.1f} ms")
+    print(f"Time to ready app (median of {args.runs}):  {ready_s * 1000:8.1f} ms")
+    print(f"Heavy modules loaded: {', '.join(probe['loaded']) or 'none'}")
+    print("\nSlowest imports of app.py (cumulative):")
+    for cumulative_us, module in shallow[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+    failures = []
+    if not probe['model_loaded']:
+        failures.append('the model did not load')
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f'import time {import_ms:.1f} ms exceeds {args.max_import_ms:.1f} ms')
+    forbidden = [m for m in (args.forbid or []) if m in probe['loaded']]
+    if forbidden:
+        failures.append(f"forbidden modules imported: {', '.join(forbidden)}")
+    if failures:
+        sys.exit('Startup check failed: ' + '; '.join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""
+Benchmark and load-test suite for DiseasePredictor and the Flask API.
+
+Scenarios:
+    cold_start      DiseasePredictor construction in a fresh interpreter (imports included)
+    single          predict_and_info latency with the caches disabled
+    batch           predict_and_info_batch latency and throughput per batch size
+    matcher         SymptomMatcher.lookup throughput on clean, typo-laden and unknown inputs
+    preprocessing   load_dataset + encode_symptoms on dataset/dataset.csv
+    http            POST /api/predict through the Flask test client, or a running
+                    server with --url, from --concurrency client threads
+
+Every latency measurement reports p50/p95/p99 and throughput. Results can be
+written as a JSON baseline and compared against an earlier one; a metric that
+got slower by more than --tolerance is reported as a regression (exit code 1).
+
+Everything runs offline. If the model directory has no disease_rf_model.joblib,
+a small forest is trained on dataset/dataset.csv into a temporary directory
+and used instead, so numbers from such runs are only comparable with each other.
+Baselines are machine-specific (the JSON records the interpreter, platform and
+CPU count); benchmarks/baselines/synthetic-sklearn.json is a reference run of
+the default settings on the synthetic model.
+
+Usage:
+    python benchmarks/bench_suite.py [--scenarios single batch http] [--engine sklearn]
+        [--output benchmarks/baselines/local.json] [--compare benchmarks/baselines/local.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+
+SCENARIOS = ('cold_start', 'single', 'batch', 'matcher', 'preprocessing', 'http')
+BATCH_SIZES = (1, 16, 256, 1024)
+
+
+def summarize(samples, items_per_sample=1):
+    """Latency percentiles (ms) and throughput (items/s) of per-call durations in seconds"""
+    samples = np.asarray(samples, dtype=np.float64)
+    total = samples.sum()
+    return {
+        'n': int(len(samples)),
+        'p50_ms': float(np.percentile(samples, 50) * 1000),
+        'p95_ms': float(np.percentile(samples, 95) * 1000),
+        'p99_ms': float(np.percentile(samples, 99) * 1000),
+        'mean_ms': float(samples.mean() * 1000),
+        'throughput_per_s': float(len(samples) * items_per_sample / total) if total else 0.0
+    }
+
+
+def time_calls(fn, inputs):
+    """Call fn on each input and return the per-call durations"""
+    durations = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def build_synthetic_model(model_dir, n_estimators=30):
+    """Train a small forest on dataset/dataset.csv and save it the way train_model does"""
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    from forest_engine import export_forest, save_compiled_forest
+    from model_bundle import write_bundle
+    from train_model import encode_symptoms, load_dataset
+
+    df, symptom_cols = load_dataset(os.path.join(REPO_ROOT, 'dataset', 'dataset.csv'))
+    X, all_symptoms, _, _ = encode_symptoms(df, symptom_cols)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=12, random_state=0, n_jobs=1)
+    model.fit(X, df['Disease'])
+
+    importance = dict(zip(X.columns, model.feature_importances_.tolist()))
+    joblib.dump(model, os.path.join(model_dir, 'disease_rf_model.joblib'))
+    joblib.dump(all_symptoms, os.path.join(model_dir, 'symptom_list.joblib'))
+    joblib.dump({'symptom_to_feature': {s: f'has_{s}' for s in all_symptoms},
+                 'feature_to_symptom': {f'has_{s}': s for s in all_symptoms}},
+                os.path.join(model_dir, 'symptom_mapping.joblib'))
+    save_compiled_forest(model, model_dir)
+    write_bundle(model_dir, export_forest(model), all_symptoms, importance,
+                 metadata={'source': 'benchmarks/bench_suite.py synthetic model'})
+
+
+def resolve_model_dir(model_dir):
+    """Return (model_dir, synthetic) with a synthetic model built if the real one is absent"""
+    if os.path.exists(os.path.join(model_dir, 'disease_rf_model.joblib')):
+        return model_dir, False
+    synthetic_dir = tempfile.mkdtemp(prefix='medica-bench-model-')
+    print(f"No trained model in {model_dir}; training a small synthetic model in {synthetic_dir}")
+    build_synthetic_model(synthetic_dir)
+    return synthetic_dir, True
+
+
+def sample_inputs(symptom_list, n, rng):
+    """Comma-separated symptom strings of 2-6 known symptoms, written as users type them"""
+    return [', '.join(s.replace('_', ' ') for s in rng.sample(symptom_list, rng.randint(2, 6)))
+            for _ in range(n)]
+
+
+def add_typo(word, rng):
+    """Apply one random deletion, substitution, insertion or transposition"""
+    i = rng.randrange(len(word))
+    op = rng.choice('dsit')
+    if op == 'd' and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    if op == 's':
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    if op == 'i':
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word + rng.choice(string.ascii_lowercase)
+
+
+def bench_cold_start(args, model_dir):
+    code = (
+        "import time; start = time.perf_counter()\n"
+        "from predict_disease import DiseasePredictor\n"
+        f"DiseasePredictor(model_dir={model_dir!r}, engine={args.engine!r})\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    durations = []
+    for _ in range(args.cold_start_runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        durations.append(float(output.strip().splitlines()[-1]))
+    return {'constructor': summarize(durations)}
+
+
+def bench_single(args, predictor, rng):
+    inputs = sample_inputs(predictor.symptom_list, args.iterations, rng)
+    predictor.predict_and_info(inputs[0])  # warm-up
+    return {'predict_and_info': summarize(time_calls(predictor.predict_and_info, inputs))}
+
+
+def bench_batch(args, predictor, rng):
+    results = {}
+    for size in BATCH_SIZES:
+        repeats = max(3, min(50, args.iterations * 4 // size))
+        batches = [sample_inputs(predictor.symptom_list, size, rng) for _ in range(repeats)]
+        predictor.predict_and_info_batch(batches[0])  # warm-up
+        results[f'batch_{size}'] = summarize(time_calls(predictor.predict_and_info_batch, batches), size)
+    return results
+
+
+def bench_matcher(args, predictor, rng):
+    from symptom_matcher import SymptomMatcher
+    matcher = SymptomMatcher(predictor.symptom_list)
+    names = [s.replace('_', ' ') for s in predictor.symptom_list]
+    workloads = {
+        'clean': [rng.choice(names) for _ in range(args.iterations)],
+        'typo': [add_typo(rng.choice(names), rng) for _ in range(args.iterations)],
+        'unknown': [''.join(rng.choice(string.ascii_lowercase + ' ') for _ in range(rng.randint(5, 20)))
+                    for _ in range(args.iterations)]
+    }
+    return {name: summarize(time_calls(matcher.lookup, words)) for name, words in workloads.items()}
+
+
+def bench_preprocessing(args):
+    from train_model import encode_symptoms, load_dataset
+    dataset = os.path.join(REPO_ROOT, 'dataset', 'dataset.csv')
+
+    def run(_):
+        df, symptom_cols = load_dataset(dataset)
+        encode_symptoms(df, symptom_cols)
+
+    with open(dataset, encoding='utf-8') as f:
+        n_rows = sum(1 for _ in f) - 1
+    return {'load_and_encode': summarize(time_calls(run, range(args.preprocessing_runs)), n_rows)}
+
+
+def _http_client(args, model_dir):
+    """Callable posting one JSON body to /api/predict and returning the status code"""
+    if args.url:
+        import urllib.error
+        import urllib.request
+        url = args.url.rstrip('/') + '/api/predict'
+
+        def post(body):
+            request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                             headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+        return post
+
+    # app.py builds its app from the environment at import time
+    os.environ['MODEL_DIR'] = model_dir
+    os.environ['MODEL_ENGINE'] = args.engine
+    os.environ.setdefault('MODEL_WATCH_INTERVAL', '0')
+    os.environ.setdefault('PREDICTION_CACHE_SIZE', '0')
+    from app import app
+    local = threading.local()
+
+    def post(body):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        return client.post('/api/predict', json=body).status_code
+    return post
+
+
+def bench_http(args, model_dir, symptom_list, rng):
+    post = _http_client(args, model_dir)
+    inputs = sample_inputs(symptom_list, args.http_requests, rng)
+    post({'symptoms': inputs[0]})  # warm-up
+
+    durations, statuses = [], {}
+    lock = threading.Lock()
+    chunks = [inputs[i::args.concurrency] for i in range(args.concurrency)]
+
+    def worker(chunk):
+        local_durations, local_statuses = [], {}
+        for symptoms in chunk:
+            start = time.perf_counter()
+            status = post({'symptoms': symptoms})
+            local_durations.append(time.perf_counter() - start)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            durations.extend(local_durations)
+            for status, count in local_statuses.items():
+                statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = summarize(durations)
+    # Wall-clock throughput across all client threads
+    stats['throughput_per_s'] = len(durations) / elapsed
+    stats['concurrency'] = args.concurrency
+    stats['status_codes'] = statuses
+    return {'predict': stats}
+
+
+def compare(results, baseline, tolerance):
+    """Print per-metric changes against a baseline and return the regressions"""
+    regressions = []
+    print(f"\nComparison with baseline ({baseline.get('created', 'unknown date')}):")
+    for scenario, metrics in results['scenarios'].items():
+        for name, stats in metrics.items():
+            old = baseline.get('scenarios', {}).get(scenario, {}).get(name)
+            if not old:
+                continue
+            for key in ('p50_ms', 'p99_ms'):
+                if not old.get(key):
+                    continue
+                change = stats[key] / old[key] - 1
+                flag = ''
+                if change > tolerance:
+                    flag = '  REGRESSION'
+                    regressions.append(f'{scenario}.{name}.{key}')
+                metric = f'{scenario}.{name}.{key}'
+                print(f"  {metric:<40} {old[key]:10.3f} -> {stats[key]:10.3f} ms ({change:+.1%}){flag}")
+    return regressions
+
+
+def print_results(results):
+    for scenario, metrics in results['scenarios'].items():
+        print(f"\n[{scenario}]")
+        for name, stats in metrics.items():
+            print(f"  {name:<18} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                  f"p99 {stats['p99_ms']:9.3f} ms  {stats['throughput_per_s']:12.1f}/s  (n={stats['n']})")
+
+
+def run(args, model_dir):
+    from predict_disease import DiseasePredictor
+    rng = random.Random(args.seed)
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'engine': args.engine,
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'scenarios': {}
+    }
+
+    predictor = None
+    if {'single', 'batch', 'matcher', 'http'} & set(args.scenarios):
+        # Caches off so every call measures the full pipeline
+        predictor = DiseasePredictor(model_dir=model_dir, engine=args.engine, cache_size=0)
+
+    for scenario in args.scenarios:
+        print(f"Running {scenario}...")
+        if scenario == 'cold_start':
+            results['scenarios'][scenario] = bench_cold_start(args, model_dir)
+        elif scenario == 'single':
+            results['scenarios'][scenario] = bench_single(args, predictor, rng)
+        elif scenario == 'batch':
+            results['scenarios'][scenario] = bench_batch(args, predictor, rng)
+        elif scenario == 'matcher':
+            results['scenarios'][scenario] = bench_matcher(args, predictor, rng)
+        elif scenario == 'preprocessing':
+            results['scenarios'][scenario] = bench_preprocessing(args)
+        elif scenario == 'http':
+            results['scenarios'][scenario] = bench_http(args, model_dir, predictor.symptom_list, rng)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DiseasePredictor and the Flask API')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS),
+                        help='Scenarios to run (default: all)')
+    parser.add_argument('--model-dir', default=os.path.join(REPO_ROOT, 'models'),
+                        help='Directory containing model files')
+    parser.add_argument('--engine', choices=('sklearn', 'compiled', 'mmap'), default='sklearn',
+                        help='DiseasePredictor inference engine')
+    parser.add_argument('--iterations', type=int, default=500, help='Calls per latency scenario')
+    parser.add_argument('--cold-start-runs', type=int, default=5, help='Fresh interpreters for cold_start')
+    parser.add_argument('--preprocessing-runs', type=int, default=5, help='Repetitions of preprocessing')
+    parser.add_argument('--http-requests', type=int, default=1000, help='Requests sent by the http scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='Client threads for the http scenario')
+    parser.add_argument('--url', default=None,
+                        help='Base URL of a running server for the http scenario (default: Flask test client)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for the generated inputs')
+    parser.add_argument('--output', default=None, help='Write the results to this JSON file')
+    parser.add_argument('--compare', default=None, help='Baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative slowdown of p50/p99 reported as a regression')
+    args = parser.parse_args()
+
+    # DiseasePredictor reads the auxiliary CSVs relative to the repository root
+    os.chdir(REPO_ROOT)
+    model_dir, synthetic = resolve_model_dir(os.path.abspath(args.model_dir))
+    try:
+        results = run(args, model_dir)
+    finally:
+        if synthetic:
+            shutil.rmtree(model_dir, ignore_errors=True)
+    results['synthetic_model'] = synthetic
+
+    print_results(results)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('synthetic_model') != synthetic or baseline.get('engine') != args.engine:
+            print("Warning: baseline was recorded with a different model or engine")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} regression(s) above {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
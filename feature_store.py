@@ -0,0 +1,258 @@
+import json
+import os
+import resource
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+STORE_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+FEATURES_FILE = 'features.u8'
+LABELS_FILE = 'labels.npy'
+
+
+def clean_dataset_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Clean a dataset.csv-shaped frame (or a chunk of one) in place
+
+    Returns:
+        Tuple of (df, symptom_cols) with stripped disease names and symptom
+        cells, empty/NaN symptom cells replaced by ''
+    """
+    # Clean column names and values
+    df.columns = [c.strip() for c in df.columns]
+
+    # Extract symptom columns
+    symptom_cols = [c for c in df.columns if c.lower().startswith('symptom')]
+    for col in symptom_cols:
+        df[col] = df[col].astype(str).str.strip()
+        # Replace empty/NaN values with empty string
+        df[col] = df[col].fillna('').replace('nan', '')
+
+    # Clean disease names
+    df['Disease'] = df['Disease'].astype(str).str.strip()
+
+    return df, symptom_cols
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def encode_with_vocabulary(df: pd.DataFrame, symptom_cols: List[str],
+                           vocabulary: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    One-hot encode cleaned rows against a fixed symptom vocabulary
+
+    Symptoms missing from the vocabulary are ignored.
+
+    Returns:
+        Tuple of (dense uint8 matrix with one column per vocabulary entry,
+        per-cell presence mask over the symptom columns, vocabulary codes of
+        the present cells with -1 for unknown symptoms)
+    """
+    values = df[symptom_cols].to_numpy(dtype=object)
+    present = (values != '') & (values != 'nan')
+    rows = np.nonzero(present)[0]
+    codes = pd.Categorical(values[present], categories=vocabulary).codes
+    known = codes >= 0
+
+    dense = np.zeros((len(df), len(vocabulary)), dtype=np.uint8)
+    dense[rows[known], codes[known]] = 1
+    return dense, present, codes
+
+
+def _read_chunks(dataset_path: str, chunksize: int) -> Iterator[Tuple[pd.DataFrame, List[str]]]:
+    for chunk in pd.read_csv(dataset_path, chunksize=chunksize, dtype=str):
+        yield clean_dataset_frame(chunk)
+
+
+class FeatureStore:
+    """
+    On-disk training set: bit-packed one-hot symptom rows plus integer labels
+
+    Each row takes ceil(n_symptoms / 8) bytes (17 bytes for the shipped 131
+    symptoms) instead of a dense int64 row, and the packed matrix is read through
+    a memory map, so chunks can be unpacked on demand.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Directory written by build_feature_store
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature store format {self.manifest.get('format_version')} in {path}")
+
+        self.vocabulary: List[str] = self.manifest['vocabulary']
+        self.classes: List[str] = self.manifest['classes']
+        self.n_rows: int = self.manifest['n_rows']
+        self.n_bytes = (len(self.vocabulary) + 7) // 8
+        self.packed = np.memmap(os.path.join(path, FEATURES_FILE), dtype=np.uint8, mode='r',
+                                shape=(self.n_rows, self.n_bytes)) if self.n_rows else \
+            np.zeros((0, self.n_bytes), dtype=np.uint8)
+        self.labels = np.load(os.path.join(path, LABELS_FILE), mmap_mode='r')
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [f'has_{s}' for s in self.vocabulary]
+
+    @property
+    def symptom_occurrence(self) -> Dict[str, int]:
+        return self.manifest['symptom_occurrence']
+
+    @property
+    def symptoms_per_row(self) -> Dict[str, float]:
+        """Min, max and mean number of symptoms per row"""
+        return self.manifest['symptoms_per_row']
+
+    def unpack(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Dense uint8 feature rows [start, stop)"""
+        return np.unpackbits(self.packed[start:stop], axis=1, count=len(self.vocabulary))
+
+    def iter_chunks(self, chunk_rows: int = 100_000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield (dense uint8 features, label codes) chunk by chunk"""
+        for start in range(0, self.n_rows, chunk_rows):
+            yield self.unpack(start, start + chunk_rows), np.asarray(self.labels[start:start + chunk_rows])
+
+    def to_frame(self) -> Tuple[pd.DataFrame, pd.Series]:
+        """All rows as a uint8 feature DataFrame and a disease label Series"""
+        X = np.empty((self.n_rows, len(self.vocabulary)), dtype=np.uint8)
+        for start in range(0, self.n_rows, 100_000):
+            X[start:start + 100_000] = self.unpack(start, start + 100_000)
+        y = pd.Series(np.asarray(self.classes, dtype=object)[np.asarray(self.labels)], name='Disease')
+        return pd.DataFrame(X, columns=self.feature_names, copy=False), y
+
+    def sample_frame(self, max_rows: int, random_state: int = 42) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Stratified sample of at most max_rows rows as a feature DataFrame and label Series
+
+        Each disease keeps its share of the rows (at least two, or all of them if it
+        has fewer, so stratified splits still work). Only the sampled rows are
+        unpacked, so the frame's size is bounded by max_rows, not by the store.
+        """
+        labels = np.asarray(self.labels)
+        if self.n_rows <= max_rows:
+            return self.to_frame()
+
+        rng = np.random.default_rng(random_state)
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=len(self.classes))
+        picked = []
+        start = 0
+        for count in counts:
+            take = min(count, max(int(round(count * max_rows / self.n_rows)), 2))
+            picked.append(rng.choice(order[start:start + count], size=take, replace=False))
+            start += count
+        rows = np.sort(np.concatenate(picked))
+
+        X = np.unpackbits(self.packed[rows], axis=1, count=len(self.vocabulary))
+        y = pd.Series(np.asarray(self.classes, dtype=object)[labels[rows]], name='Disease')
+        return pd.DataFrame(X, columns=self.feature_names, copy=False), y
+
+    def deduplicated(self, chunk_rows: int = 100_000) -> Tuple[pd.DataFrame, pd.Series, np.ndarray]:
+        """
+        Unique (disease, symptom set) rows with their counts, built chunk by chunk
+
+        Memory grows with the number of unique rows, not with the number of rows,
+        so highly redundant exports can be trained on without materializing them.
+
+        Returns:
+            Tuple of (X_unique, y_unique, sample_weight) in first-occurrence order
+        """
+        counts: Dict[bytes, int] = {}
+        for start in range(0, self.n_rows, chunk_rows):
+            packed = np.asarray(self.packed[start:start + chunk_rows])
+            labels = np.asarray(self.labels[start:start + chunk_rows], dtype='>u4')
+            keys = np.hstack([packed, labels.view(np.uint8).reshape(len(labels), 4)])
+            for key in map(bytes, keys):
+                counts[key] = counts.get(key, 0) + 1
+
+        keys = np.frombuffer(b''.join(counts), dtype=np.uint8).reshape(len(counts), self.n_bytes + 4)
+        X = np.unpackbits(keys[:, :self.n_bytes], axis=1, count=len(self.vocabulary))
+        labels = keys[:, self.n_bytes:].copy().view('>u4').ravel()
+        y = pd.Series(np.asarray(self.classes, dtype=object)[labels], name='Disease')
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        return pd.DataFrame(X, columns=self.feature_names, copy=False), y, weights
+
+
+def build_feature_store(dataset_path: str, store_dir: str, chunksize: int = 100_000) -> FeatureStore:
+    """
+    Stream a dataset.csv-shaped file into a FeatureStore in two passes
+
+    Pass 1 collects the symptom vocabulary, disease classes and row count; pass 2
+    encodes each chunk against that vocabulary, bit-packs it and writes it to a
+    preallocated memory-mapped file. Only one chunk of raw rows is in memory at a time.
+
+    Args:
+        dataset_path: CSV with a Disease column and Symptom_* columns
+        store_dir: Output directory (created if needed, previous contents overwritten)
+        chunksize: Rows read per chunk; bounds the memory used by ingestion
+
+    Returns:
+        The opened FeatureStore
+    """
+    os.makedirs(store_dir, exist_ok=True)
+
+    # Pass 1: vocabulary and sizes
+    symptoms, diseases, n_rows = set(), set(), 0
+    for chunk, symptom_cols in _read_chunks(dataset_path, chunksize):
+        values = chunk[symptom_cols].to_numpy(dtype=object)
+        symptoms.update(values[(values != '') & (values != 'nan')])
+        diseases.update(chunk['Disease'].unique())
+        n_rows += len(chunk)
+
+    vocabulary = sorted(str(s) for s in symptoms)
+    classes = sorted(str(d) for d in diseases)
+    n_bytes = (len(vocabulary) + 7) // 8
+
+    # Pass 2: encode, pack and write chunk by chunk
+    features_path = os.path.join(store_dir, FEATURES_FILE)
+    packed = np.memmap(features_path, dtype=np.uint8, mode='w+', shape=(n_rows, n_bytes)) if n_rows else None
+    labels = np.lib.format.open_memmap(os.path.join(store_dir, LABELS_FILE), mode='w+',
+                                       dtype=np.int32, shape=(n_rows,))
+    occurrence = np.zeros(len(vocabulary), dtype=np.int64)
+    per_row_min, per_row_max, per_row_total = None, 0, 0
+
+    offset = 0
+    for chunk, symptom_cols in _read_chunks(dataset_path, chunksize):
+        dense, present, codes = encode_with_vocabulary(chunk, symptom_cols, vocabulary)
+        packed[offset:offset + len(chunk)] = np.packbits(dense, axis=1)
+        labels[offset:offset + len(chunk)] = pd.Categorical(chunk['Disease'], categories=classes).codes
+
+        occurrence += np.bincount(codes, minlength=len(vocabulary))
+        per_row = present.sum(axis=1)
+        per_row_min = int(per_row.min()) if per_row_min is None else min(per_row_min, int(per_row.min()))
+        per_row_max = max(per_row_max, int(per_row.max()))
+        per_row_total += int(per_row.sum())
+        offset += len(chunk)
+
+    if packed is not None:
+        packed.flush()
+    labels.flush()
+    del packed, labels
+
+    manifest = {
+        'format_version': STORE_FORMAT_VERSION,
+        'source': os.path.abspath(dataset_path),
+        'n_rows': n_rows,
+        'vocabulary': vocabulary,
+        'classes': classes,
+        'symptom_occurrence': dict(zip(vocabulary, occurrence.tolist())),
+        'symptoms_per_row': {
+            'min': per_row_min or 0,
+            'max': per_row_max,
+            'mean': per_row_total / n_rows if n_rows else 0.0
+        }
+    }
+    with open(os.path.join(store_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    return FeatureStore(store_dir)
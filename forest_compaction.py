@@ -0,0 +1,226 @@
+import copy
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.metrics import balanced_accuracy_score
+
+from forest_engine import CompiledForest, export_forest, sklearn_proba
+
+# Candidate sub-forest sizes; values beyond the full forest are dropped and the
+# full tree count / depth is always included
+DEFAULT_TREE_COUNTS = (1, 2, 3, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+DEFAULT_DEPTHS = (2, 3, 4, 6, 8, 10, 12, 16, 20, 30, 40, 60)
+
+# sklearn's markers for "no child" / "no feature" in a tree's node table
+_TREE_LEAF = -1
+_TREE_UNDEFINED = -2
+
+
+def truncate_tree(estimator: Any, max_depth: int) -> Any:
+    """
+    Copy of a fitted sklearn decision tree cut off at max_depth
+
+    Internal nodes at max_depth become leaves predicting the class distribution
+    of the training samples that reached them, which is exactly what the
+    untruncated tree stores for them; the subtrees below are dropped. Node ids
+    are renumbered so the copy only holds reachable nodes.
+    """
+    tree = estimator.tree_
+    if max_depth is None or tree.max_depth <= max_depth:
+        return estimator
+
+    state = tree.__getstate__()
+    nodes, values = state['nodes'], state['values']
+    left, right = nodes['left_child'], nodes['right_child']
+
+    # Depth of every node reachable within max_depth (-1 for those below it)
+    depth = np.full(len(nodes), -1, dtype=np.int64)
+    depth[0] = 0
+    frontier = np.array([0])
+    for level in range(1, max_depth + 1):
+        internal = frontier[left[frontier] != _TREE_LEAF]
+        frontier = np.concatenate([left[internal], right[internal]])
+        depth[frontier] = level
+
+    # Children always have larger ids than their parent, so keeping ids in order
+    # keeps the root first and every parent before its children
+    keep = depth >= 0
+    new_id = np.cumsum(keep) - 1
+    new_nodes = nodes[keep].copy()
+    cut = (depth[keep] == max_depth) & (new_nodes['left_child'] != _TREE_LEAF)
+    internal = (new_nodes['left_child'] != _TREE_LEAF) & ~cut
+    new_nodes['left_child'][internal] = new_id[new_nodes['left_child'][internal]]
+    new_nodes['right_child'][internal] = new_id[new_nodes['right_child'][internal]]
+    new_nodes['left_child'][cut] = _TREE_LEAF
+    new_nodes['right_child'][cut] = _TREE_LEAF
+    new_nodes['feature'][cut] = _TREE_UNDEFINED
+    new_nodes['threshold'][cut] = _TREE_UNDEFINED
+
+    new_tree = type(tree)(tree.n_features, tree.n_classes, tree.n_outputs)
+    new_tree.__setstate__({
+        'max_depth': max_depth,
+        'node_count': int(keep.sum()),
+        'nodes': new_nodes,
+        'values': np.ascontiguousarray(values[keep])
+    })
+    truncated = copy.copy(estimator)
+    truncated.tree_ = new_tree
+    truncated.max_depth = max_depth
+    return truncated
+
+
+def sub_forest(model: Any, n_trees: Optional[int] = None, max_depth: Optional[int] = None) -> Any:
+    """
+    Copy of a fitted RandomForestClassifier keeping its first n_trees trees, each cut at max_depth
+
+    None keeps all trees / the full depth. The original model is not modified.
+    """
+    compact = copy.copy(model)
+    estimators = model.estimators_[:n_trees] if n_trees else model.estimators_
+    compact.estimators_ = [truncate_tree(e, max_depth) for e in estimators]
+    compact.n_estimators = len(compact.estimators_)
+    if max_depth is not None:
+        compact.max_depth = max_depth
+    return compact
+
+
+def forest_max_depth(model: Any) -> int:
+    """Depth of the deepest tree of a fitted forest"""
+    return max(e.tree_.max_depth for e in model.estimators_)
+
+
+def measure_latency(predictor: Any, X: np.ndarray, rows: int = 100) -> Tuple[float, float]:
+    """
+    Per-prediction latency of a forest, predicting one row at a time as a request does
+
+    Args:
+        predictor: Fitted RandomForestClassifier or CompiledForest
+        X: Rows to predict (the first `rows` are used)
+        rows: Number of single-row predictions timed
+
+    Returns:
+        Tuple of (p50, p95) latency in milliseconds
+    """
+    X = np.ascontiguousarray(X[:rows], dtype=np.float32)
+    if isinstance(predictor, CompiledForest):
+        predict_proba = predictor.predict_proba
+    else:
+        predict_proba = partial(sklearn_proba, predictor)
+    predict_proba(X[:1])  # warm-up
+    samples = []
+    for i in range(len(X)):
+        start = time.perf_counter()
+        predict_proba(X[i:i + 1])
+        samples.append(time.perf_counter() - start)
+    p50, p95 = np.percentile(samples, [50, 95]) * 1000
+    return float(p50), float(p95)
+
+
+def balanced_accuracy(model: Any, X_val: Any, y_val: Any,
+                      sample_weight: Optional[np.ndarray] = None) -> float:
+    """Validation balanced accuracy of a fitted forest, predicted with the compiled engine it ships to"""
+    predictions = CompiledForest(export_forest(model)).predict(np.asarray(X_val, dtype=np.float32))
+    return float(balanced_accuracy_score(y_val, predictions, sample_weight=sample_weight))
+
+
+def compact_forest(model: Any, X_val: Any, y_val: Any, sample_weight: Optional[np.ndarray] = None,
+                   tolerance: float = 0.005, latency_budget_ms: Optional[float] = None,
+                   tree_counts: Sequence[int] = DEFAULT_TREE_COUNTS,
+                   depths: Sequence[int] = DEFAULT_DEPTHS, engine: str = 'compiled',
+                   latency_rows: int = 100) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Find the smallest sub-forest whose validation balanced accuracy is within tolerance of the full model
+
+    Every combination of a tree-count prefix and a depth cap is scored on the
+    validation rows and its per-prediction latency and size (nodes and bytes of
+    the exported arrays) are measured. The selected candidate is the one with
+    the fewest nodes among those within tolerance and, if latency_budget_ms is
+    given, with a p95 latency within budget. If no candidate meets the budget
+    the fastest one within tolerance is selected.
+
+    Args:
+        model: Fitted RandomForestClassifier (trained without the validation rows)
+        X_val, y_val: Validation features and labels
+        sample_weight: Validation row weights (multiplicities of deduplicated rows)
+        tolerance: Largest acceptable drop in balanced accuracy from the full model
+        latency_budget_ms: Optional p95 per-prediction latency budget
+        tree_counts, depths: Candidate tree-count prefixes and depth caps
+        engine: 'compiled' to time the flat-array CompiledForest the mmap and
+            compiled engines serve, or 'sklearn' to time predict_proba itself
+        latency_rows: Single-row predictions timed per candidate
+
+    Returns:
+        Tuple of (selected candidate, trade-off curve); each is a dict with n_trees,
+        max_depth (None for unlimited), balanced_accuracy, accuracy_drop,
+        latency_p50_ms, latency_p95_ms, n_nodes, size_kb and within_tolerance
+    """
+    X_val = np.asarray(X_val, dtype=np.float32)
+    full_trees, full_depth = len(model.estimators_), forest_max_depth(model)
+    counts = sorted({n for n in tree_counts if 0 < n < full_trees} | {full_trees})
+    caps = sorted({d for d in depths if 0 < d < full_depth}) + [None]
+
+    curve = []
+    for max_depth in caps:
+        # Truncate every tree once per depth; tree-count prefixes are then just slices
+        truncated = sub_forest(model, max_depth=max_depth)
+        for n_trees in counts:
+            candidate = sub_forest(truncated, n_trees=n_trees)
+            arrays = export_forest(candidate)
+            compiled = CompiledForest(arrays)
+            predictions = compiled.predict(X_val)
+            p50, p95 = measure_latency(compiled if engine == 'compiled' else candidate,
+                                       X_val, latency_rows)
+            curve.append({
+                'n_trees': n_trees,
+                'max_depth': max_depth,
+                'balanced_accuracy': float(balanced_accuracy_score(y_val, predictions,
+                                                                   sample_weight=sample_weight)),
+                'latency_p50_ms': round(p50, 4),
+                'latency_p95_ms': round(p95, 4),
+                'n_nodes': int(len(arrays['feature'])),
+                'size_kb': round(sum(a.nbytes for a in arrays.values()) / 1024, 1)
+            })
+
+    reference = curve[-1]['balanced_accuracy']  # all trees, unlimited depth
+    for point in curve:
+        point['accuracy_drop'] = round(reference - point['balanced_accuracy'], 6)
+        point['within_tolerance'] = point['accuracy_drop'] <= tolerance
+
+    eligible = [p for p in curve if p['within_tolerance']]
+    within_budget = [p for p in eligible
+                     if latency_budget_ms is None or p['latency_p95_ms'] <= latency_budget_ms]
+    if within_budget:
+        selected = min(within_budget, key=lambda p: (p['n_nodes'], p['n_trees']))
+    else:
+        print(f"Warning: no sub-forest within tolerance meets the {latency_budget_ms} ms budget; "
+              f"using the fastest one")
+        selected = min(eligible, key=lambda p: p['latency_p95_ms'])
+    return selected, curve
+
+
+def pareto_front(curve: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Candidates not beaten on both size and balanced accuracy by a smaller one, smallest first"""
+    front, best = [], -1.0
+    for point in sorted(curve, key=lambda p: (p['n_nodes'], -p['balanced_accuracy'])):
+        if point['balanced_accuracy'] > best:
+            front.append(point)
+            best = point['balanced_accuracy']
+    return front
+
+
+def print_tradeoff(curve: List[Dict[str, Any]], selected: Dict[str, Any]) -> None:
+    """Print the accuracy/latency/size Pareto front of a compaction curve and the full model"""
+    print(f"{'trees':>6} {'depth':>6} {'bal_acc':>8} {'drop':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'nodes':>8} {'size KB':>9}")
+    front = pareto_front(curve)
+    for point in (selected, curve[-1]):
+        if not any(p is point for p in front):
+            front = sorted(front + [point], key=lambda p: p['n_nodes'])
+    for p in front:
+        marker = '  <- selected' if p is selected else '  (full model)' if p is curve[-1] else ''
+        depth = p['max_depth'] if p['max_depth'] is not None else '-'
+        print(f"{p['n_trees']:>6} {depth:>6} {p['balanced_accuracy']:>8.4f} {p['accuracy_drop']:>8.4f} "
+              f"{p['latency_p50_ms']:>8.3f} {p['latency_p95_ms']:>8.3f} {p['n_nodes']:>8} "
+              f"{p['size_kb']:>9.1f}{marker}")
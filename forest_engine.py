@@ -0,0 +1,269 @@
+import argparse
+import os
+import sys
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+COMPILED_MODEL_FILE = 'disease_rf_compiled.npz'
+
+
+def export_forest(model: Any) -> Dict[str, np.ndarray]:
+    """
+    Flatten a fitted sklearn RandomForestClassifier into plain NumPy arrays
+
+    All trees are concatenated into one node table. Leaves point to themselves,
+    which is also how the evaluator recognizes them.
+
+    Returns:
+        Dict of arrays: feature, threshold, left, right, is_leaf (per node),
+        value (per-node class distribution), roots (first node of each tree),
+        classes, n_features and max_depth
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        node_ids = np.arange(n, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left).astype(np.int32) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right).astype(np.int32) + offset)
+
+        # Normalize counts/weights per node so each tree votes with a distribution
+        value = tree.value[:, 0, :].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1.0
+        values.append((value / totals).astype(np.float32))
+
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    left = np.concatenate(lefts)
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': left,
+        'right': np.concatenate(rights),
+        'is_leaf': left == np.arange(len(left)),
+        'value': np.concatenate(values),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'classes': np.asarray(model.classes_).astype(str),
+        'n_features': np.asarray(model.n_features_in_),
+        'max_depth': np.asarray(max_depth)
+    }
+
+
+class CompiledForest:
+    """
+    Random forest evaluated directly from the arrays produced by export_forest
+
+    Exposes the small part of the sklearn classifier API the predictor uses
+    (classes_, n_features_in_, predict_proba, predict) without importing sklearn.
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray], chunk_size: int = 1024):
+        """
+        Args:
+            arrays: Output of export_forest, the saved .npz loaded back, or the
+                memory-mapped arrays of a model bundle (used without copying)
+            chunk_size: Rows evaluated together; bounds the (rows x trees) work arrays
+        """
+        self.feature = np.asarray(arrays['feature'])
+        self.threshold = np.asarray(arrays['threshold'])
+        self.left = np.asarray(arrays['left'])
+        self.right = np.asarray(arrays['right'])
+        self.value = np.asarray(arrays['value'])
+        self.roots = np.asarray(arrays['roots'])
+        self.classes_ = np.asarray(arrays['classes']).astype(object)
+        self.n_features_in_ = int(arrays['n_features'])
+        self.max_depth = int(arrays['max_depth'])
+        self.n_estimators = len(self.roots)
+        self.chunk_size = chunk_size
+        if 'is_leaf' in arrays:
+            self.is_leaf = np.asarray(arrays['is_leaf'])
+        else:
+            self.is_leaf = self.left == np.arange(len(self.left))
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledForest':
+        """Load a forest saved by save_compiled_forest"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node reached in every tree, shape (n_rows, n_trees)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        x_flat = X.ravel()
+
+        # One entry per (row, tree) pair; row_offset locates the row's features in x_flat
+        nodes = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_estimators)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+
+        # Each step moves the pairs still at internal nodes one level down and
+        # drops those that reached a leaf, so shallow paths stop costing work early
+        while active.size:
+            current = nodes[active]
+            go_left = x_flat[row_offset[active] + self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[~self.is_leaf[current]]
+
+        return nodes.reshape(n_rows, self.n_estimators)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Mean of the per-tree leaf class distributions, shape (n_rows, n_classes)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input with {self.n_features_in_} features, got shape {X.shape}")
+
+        probas = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], self.chunk_size):
+            leaves = self.apply(X[start:start + self.chunk_size])
+            probas[start:start + self.chunk_size] = self.value[leaves].mean(axis=1, dtype=np.float64)
+        return probas
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Most probable class per row"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def align_forest(arrays: Dict[str, Any], classes: List[str], n_features: int) -> Dict[str, Any]:
+    """
+    Re-express an exported forest over a wider class list and feature space
+
+    Leaf distributions are scattered into the columns of `classes` (which must
+    contain every class of the forest). Feature indices are kept, so the forest's
+    features must be the first columns of the new feature space.
+    """
+    own_classes = [str(c) for c in arrays['classes']]
+    if int(arrays['n_features']) > n_features:
+        raise ValueError("Cannot shrink the feature space of a forest")
+
+    column = {c: i for i, c in enumerate(classes)}
+    value = np.zeros((len(arrays['value']), len(classes)), dtype=np.float32)
+    value[:, [column[c] for c in own_classes]] = arrays['value']
+
+    aligned = dict(arrays)
+    aligned.update(value=value, classes=np.asarray(classes).astype(str), n_features=np.asarray(n_features))
+    return aligned
+
+
+def merge_forests(*forests: Dict[str, Any], shares: Optional[List[float]] = None) -> Dict[str, Any]:
+    """
+    Concatenate exported forests into one, as if their trees had been trained together
+
+    All forests must share the same classes and feature space (see align_forest).
+
+    Args:
+        shares: Fraction of the merged forest's vote given to each forest. By default
+            every tree gets an equal vote; otherwise the leaf distributions of each
+            forest are rescaled so its trees jointly carry its share
+    """
+    first = forests[0]
+    n_trees = [len(f['roots']) for f in forests]
+    if shares is None:
+        scales = [1.0] * len(forests)
+    else:
+        if len(shares) != len(forests) or not np.isclose(sum(shares), 1.0):
+            raise ValueError("shares must give one fraction per forest and sum to 1")
+        # Predictions average over all trees, so a forest of n trees holding share s
+        # needs its leaves scaled by s * total_trees / n
+        scales = [share * sum(n_trees) / n for share, n in zip(shares, n_trees)]
+    for other in forests[1:]:
+        if list(other['classes']) != list(first['classes']) or int(other['n_features']) != int(first['n_features']):
+            raise ValueError("Forests must be aligned to the same classes and features before merging")
+
+    merged = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'is_leaf', 'value', 'roots')}
+    offset = 0
+    for forest, scale in zip(forests, scales):
+        n_nodes = len(forest['feature'])
+        is_leaf = forest['is_leaf'] if 'is_leaf' in forest else forest['left'] == np.arange(n_nodes)
+        merged['feature'].append(np.asarray(forest['feature']))
+        merged['threshold'].append(np.asarray(forest['threshold']))
+        merged['left'].append(np.asarray(forest['left']) + offset)
+        merged['right'].append(np.asarray(forest['right']) + offset)
+        merged['is_leaf'].append(np.asarray(is_leaf))
+        merged['value'].append(np.asarray(forest['value']) * np.float32(scale))
+        merged['roots'].append(np.asarray(forest['roots']) + offset)
+        offset += n_nodes
+
+    result = {name: np.concatenate(parts) for name, parts in merged.items()}
+    result.update(
+        classes=np.asarray(first['classes']).astype(str),
+        n_features=np.asarray(int(first['n_features'])),
+        max_depth=np.asarray(max(int(f['max_depth']) for f in forests))
+    )
+    return result
+
+
+def sklearn_proba(model: Any, X: np.ndarray) -> np.ndarray:
+    """predict_proba of an sklearn model on a plain array, without its feature-name warning"""
+    with warnings.catch_warnings():
+        # The sklearn model may have been fitted on a DataFrame; plain arrays are fine here
+        warnings.simplefilter('ignore', UserWarning)
+        return model.predict_proba(X)
+
+
+def save_compiled_forest(model: Any, output_dir: str) -> str:
+    """Export model with export_forest and write it next to the other artifacts"""
+    path = os.path.join(output_dir, COMPILED_MODEL_FILE)
+    np.savez(path, **export_forest(model))
+    return path
+
+
+def verify_compiled_forest(model: Any, compiled: CompiledForest, X: np.ndarray,
+                           atol: float = 1e-6) -> float:
+    """
+    Check the compiled forest reproduces sklearn's predict_proba and predict on X
+
+    Returns:
+        Maximum absolute probability difference
+
+    Raises:
+        AssertionError if probabilities differ by more than atol or any label differs
+    """
+    X = np.asarray(X, dtype=np.float32)
+    expected = sklearn_proba(model, X)
+    actual = compiled.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max()) if len(X) else 0.0
+    assert max_diff <= atol, f"Compiled forest probabilities differ by {max_diff:.2e}"
+    assert list(compiled.classes_) == list(model.classes_), "Compiled forest classes differ"
+    assert (model.classes_[np.argmax(expected, axis=1)] == compiled.predict(X)).all(), \
+        "Compiled forest predictions differ"
+    return max_diff
+
+
+def main():
+    """Export (and verify) the compiled forest from an existing trained model"""
+    parser = argparse.ArgumentParser(description='Export the trained random forest as flat arrays')
+    parser.add_argument('--model-dir', default='models', help='Directory containing model files')
+    parser.add_argument('--verify-rows', type=int, default=2000,
+                        help='Random binary rows used to check equivalence with sklearn')
+    args = parser.parse_args()
+
+    import joblib
+    try:
+        model = joblib.load(os.path.join(args.model_dir, 'disease_rf_model.joblib'))
+    except FileNotFoundError as e:
+        sys.exit(f"Error loading model files: {e}. Please ensure you've trained the model first.")
+
+    path = save_compiled_forest(model, args.model_dir)
+    compiled = CompiledForest.load(path)
+
+    rng = np.random.default_rng(42)
+    X = (rng.random((args.verify_rows, compiled.n_features_in_)) < 0.05).astype(np.float32)
+    max_diff = verify_compiled_forest(model, compiled, X)
+    print(f"Exported {compiled.n_estimators} trees ({len(compiled.feature)} nodes) to {path}")
+    print(f"Verified against sklearn on {len(X)} rows (max probability difference {max_diff:.2e})")
+
+
+if __name__ == '__main__':
+    main()
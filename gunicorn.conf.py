@@ -0,0 +1,70 @@
+# Gunicorn configuration for production serving: gunicorn -c gunicorn.conf.py
+import gc
+import multiprocessing
+import os
+import tempfile
+
+# Workers publish metric snapshots here and /metrics merges them, so a scrape
+# reaching any worker reports the whole server. Set before the app is imported
+os.environ.setdefault('METRICS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='medica-metrics-'))
+
+# app:app is built by create_app(), which loads the model at import time
+wsgi_app = 'app:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# Import the app (and load the model) once in the master before forking, so the
+# workers share the model's memory pages copy-on-write instead of each loading it
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound any slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Drop snapshots left by a previous run in a reused METRICS_MULTIPROC_DIR
+    from metrics import REGISTRY
+    REGISTRY.clear_snapshots()
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far (the model included) out of the GC's
+    # tracked generations so collections in the workers don't touch those
+    # pages and break copy-on-write sharing
+    gc.freeze()
+    # The master's own metrics (the preloaded model's load) are reported from its snapshot
+    from metrics import REGISTRY
+    REGISTRY.write_snapshot()
+
+
+def post_fork(server, worker):
+    # Threads don't survive fork, so each worker runs its own model watcher
+    # (set MODEL_WATCH_INTERVAL=0 to disable hot reloading)
+    from app import app, start_model_watcher
+    from metrics import REGISTRY
+    start_model_watcher(app)
+    # Counting starts from zero in each worker; the master's values are in its own snapshot
+    REGISTRY.reset()
+    REGISTRY.start_flusher(float(os.environ.get('METRICS_FLUSH_INTERVAL', 1)))
+
+
+def worker_exit(server, worker):
+    from metrics import REGISTRY
+    REGISTRY.write_snapshot()
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters in the totals but drop its gauges
+    from metrics import REGISTRY
+    REGISTRY.mark_process_dead(worker.pid)
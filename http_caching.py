@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import current_app, make_response, request
+from werkzeug.http import is_resource_modified
+
+from prediction_cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # optional: without it responses are gzip-compressed only
+    brotli = None
+
+# Cache lifetime of fingerprinted static URLs; the URL changes whenever the file does
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+# Brotli quality 5 compresses better than gzip -6 at a similar speed
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+
+class StaticFingerprints:
+    """
+    Content hashes of static files, recomputed only when a file's size or mtime changes
+
+    The hash is appended to static URLs (?v=<hash>) so they can be cached
+    indefinitely: an edited file gets a new URL.
+    """
+    def __init__(self, static_folder: str):
+        self.static_folder = static_folder
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, filename: str) -> Optional[str]:
+        """Short content hash of a file under the static folder, or None if it doesn't exist"""
+        path = os.path.join(self.static_folder, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(filename)
+            if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+                return cached[2]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._hashes[filename] = (st.st_size, st.st_mtime_ns, digest)
+        return digest
+
+
+def _choose_encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_response(response, min_size: int = 1024, level: int = 6,
+                      cache: Optional[LRUCache] = None):
+    """
+    Compress a 200 text/JSON/JS response with brotli or gzip if the client accepts it
+
+    Bodies smaller than min_size are sent as is. Static files are read from
+    their file wrapper, and their compressed bytes are kept in cache keyed by
+    ETag, so each asset version is compressed once per process. The ETag is made
+    weak because the compressed body is a different byte sequence of the same
+    resource, which keeps If-None-Match revalidation working for every encoding.
+    """
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    etag, _ = response.get_etag()
+    if response.direct_passthrough:
+        # send_file responses: only static assets, which are small, are buffered
+        if request.endpoint != 'static':
+            return response
+        response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    key = (request.path, etag, encoding)
+    compressed = cache.get(key) if cache is not None and etag else None
+    if compressed is None:
+        compressed = _compress(data, encoding, level)
+        if cache is not None and etag:
+            cache.put(key, compressed)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def validated_by_model(get_predictor: Callable[[], object]):
+    """
+    Decorator for views whose response depends only on the loaded model
+
+    The model version is the ETag and the predictor's load time the
+    Last-Modified date, so a client revalidating a response built from the same
+    model gets a bodyless 304 before the view runs. Responses are marked
+    no-cache: browsers keep them but revalidate, so a model reload shows up on
+    the next request.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            predictor = get_predictor()
+            if predictor is None:
+                return view(*args, **kwargs)
+
+            etag = predictor.model_version
+            loaded_at = datetime.fromtimestamp(int(predictor.loaded_at), timezone.utc)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=loaded_at):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.last_modified = loaded_at
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def init_http_caching(app, min_size: int = 1024, level: int = 6) -> None:
+    """
+    Fingerprint static URLs, set their cache lifetimes and compress responses
+
+    Args:
+        app: Flask application
+        min_size: Smallest body in bytes worth compressing (0 compresses everything)
+        level: gzip compression level (brotli always uses BROTLI_QUALITY)
+    """
+    fingerprints = StaticFingerprints(app.static_folder)
+    compressed_assets = LRUCache(maxsize=256)
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'v' not in values:
+            digest = fingerprints.get(values.get('filename', ''))
+            if digest:
+                values['v'] = digest
+
+    @app.after_request
+    def cache_and_compress(response):
+        if request.endpoint == 'static' and response.status_code in (200, 304):
+            if request.args.get('v'):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = STATIC_MAX_AGE
+                response.cache_control.immutable = True
+            else:
+                # Unversioned URL (e.g. /favicon.ico links): keep it but revalidate
+                response.cache_control.no_cache = True
+        return compress_response(response, min_size, level, compressed_assets)
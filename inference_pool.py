@@ -0,0 +1,186 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+
+class Overloaded(RuntimeError):
+    """The inference queue is full; the request should be shed"""
+
+
+class InferenceTimeout(RuntimeError):
+    """A request was not served within its timeout"""
+
+
+class BatchingExecutor:
+    """
+    Bounded inference pool that coalesces concurrent requests into batched model calls
+
+    Request threads enqueue their symptom inputs and wait on a Future. Each worker
+    thread takes the oldest job, keeps collecting jobs for up to batch_window
+    seconds (or until max_batch inputs are gathered) and answers all of them with
+    one DiseasePredictor.predict_and_info_batch call, so a burst of requests pays
+    for one forest evaluation instead of one each. When the queue is full new
+    requests fail fast with Overloaded instead of piling up behind the backlog.
+
+    Workers start lazily in the process that first submits, so an executor
+    created before gunicorn forks its workers runs in each worker.
+    """
+    def __init__(self, get_predictor: Callable[[], Any], workers: int = 2, max_queue: int = 256,
+                 max_batch: int = 64, batch_window: float = 0.002, timeout: float = 5.0):
+        """
+        Args:
+            get_predictor: Returns the predictor to use for the next batch (looked up
+                per batch so hot reloads take effect immediately)
+            workers: Number of inference threads
+            max_queue: Maximum queued jobs before submissions are rejected
+            max_batch: Maximum inputs coalesced into one model call
+            batch_window: Seconds a worker waits for more jobs after the first one
+            timeout: Default seconds a request waits for its result
+        """
+        self.get_predictor = get_predictor
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.max_batch = max(1, int(max_batch))
+        self.batch_window = batch_window
+        self.timeout = timeout
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._threads: List[threading.Thread] = []
+        self.submitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.batches = 0
+        self.batched_inputs = 0
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads inherited through fork are not running here; start fresh ones
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._threads = [
+                threading.Thread(target=self._work, name=f'inference-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, symptom_inputs: List[str]) -> Future:
+        """
+        Queue symptom inputs for prediction
+
+        Returns:
+            Future resolving to (list of predict_and_info results, stage timings of
+            the batch they ran in, or None)
+
+        Raises:
+            Overloaded if the queue is full
+        """
+        self._ensure_started()
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((list(symptom_inputs), future))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(f"Inference queue full ({self.max_queue} jobs waiting)")
+        with self._lock:
+            self.submitted += 1
+        return future
+
+    def predict_many(self, symptom_inputs: List[str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Predict a list of inputs through the pool, waiting at most timeout seconds
+
+        Raises:
+            Overloaded if the queue is full, InferenceTimeout if the result is late
+        """
+        future = self.submit(symptom_inputs)
+        try:
+            results, timings = future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            # A job still waiting in the queue is dropped by the worker
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise InferenceTimeout("Prediction timed out")
+        metrics.add_timings(timings)
+        return results
+
+    def predict(self, symptom_input: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Pool-backed equivalent of DiseasePredictor.predict_and_info"""
+        return self.predict_many([symptom_input], timeout)[0]
+
+    def _collect(self) -> List[tuple]:
+        """Block for one job, then gather more until the window closes or the batch is full"""
+        jobs = [self._queue.get()]
+        size = len(jobs[0][0])
+        deadline = time.monotonic() + self.batch_window
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            jobs.append(job)
+            size += len(job[0])
+        return jobs
+
+    def _work(self) -> None:
+        while True:
+            # Skip jobs whose caller already gave up
+            jobs = [job for job in self._collect() if job[1].set_running_or_notify_cancel()]
+            if not jobs:
+                continue
+            inputs = [symptom_input for symptom_inputs, _ in jobs for symptom_input in symptom_inputs]
+            # Stage timings of a coalesced batch are recorded once for the whole batch
+            metrics.begin_timing()
+            try:
+                predictor = self.get_predictor()
+                if predictor is None:
+                    raise RuntimeError('Model not loaded')
+                results = predictor.predict_and_info_batch(inputs)
+            except Exception as e:
+                for _, future in jobs:
+                    future.set_exception(e)
+                continue
+            finally:
+                timings = metrics.finish_timing()
+
+            with self._lock:
+                self.batches += 1
+                self.batched_inputs += len(inputs)
+            offset = 0
+            for symptom_inputs, future in jobs:
+                # The caller's thread adds the batch's stage times to its own (Server-Timing)
+                future.set_result((results[offset:offset + len(symptom_inputs)], timings))
+                offset += len(symptom_inputs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the pool counters"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queued': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'max_batch': self.max_batch,
+                'batch_window_ms': self.batch_window * 1000,
+                'timeout': self.timeout,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'batches': self.batches,
+                'mean_batch_size': self.batched_inputs / self.batches if self.batches else 0.0
+            }
@@ -0,0 +1,390 @@
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Directory shared by the serving processes (gunicorn.conf.py sets it). Each process
+# keeps a snapshot of its metrics there and /metrics renders the merged totals, so
+# a scrape reaching any worker reports all of them
+MULTIPROC_DIR_ENV = 'METRICS_MULTIPROC_DIR'
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond cache hits to slow batches
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _TimingState(threading.local):
+    # Class defaults so threads that never began a collection read None without a getattr fallback
+    timings: Optional[Dict[str, float]] = None
+    # Stage times measured on another thread for this request (already observed there)
+    borrowed: Optional[Dict[str, float]] = None
+
+
+_local = _TimingState()
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def render(self, series: Optional[list] = None) -> List[str]:
+        """Exposition lines of series (a snapshot or merge result; default this process's values)"""
+        series = self.snapshot() if series is None else series
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}'] + self._samples(series)
+
+    def snapshot(self) -> list:
+        """JSON-serializable copy of every series, sorted by labels"""
+        raise NotImplementedError
+
+    def merge(self, snapshots: List[Tuple[int, list]]) -> list:
+        """Combine the snapshots of several processes, given as (pid, snapshot) pairs"""
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+    def _samples(self, series: list) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter per label combination"""
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        """Overwrite the total, for counters mirrored from another component's stats"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(k), v] for k, v in sorted(self._values.items())]
+
+    def merge(self, snapshots: List[Tuple[int, list]]) -> list:
+        # Every process counts its own events, so the totals add up
+        totals: Dict[Tuple[str, ...], float] = {}
+        for _, series in snapshots:
+            for key, value in series:
+                totals[tuple(key)] = totals.get(tuple(key), 0.0) + value
+        return [[list(k), v] for k, v in sorted(totals.items())]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self, series: list) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}' for k, v in series]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down
+
+    Values of different processes don't add up, so merged gauges keep one
+    series per process, told apart by a pid label.
+    """
+    kind = 'gauge'
+
+    def merge(self, snapshots: List[Tuple[int, list]]) -> list:
+        return sorted([list(key) + [str(pid)], value] for pid, series in snapshots for key, value in series)
+
+    def render(self, series: Optional[list] = None) -> List[str]:
+        if series is None:
+            return super().render()
+        # Merged series carry the pid as an extra, last label
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        labelnames = self.labelnames + ('pid',)
+        return lines + [f'{self.name}{_format_labels(labelnames, k)} {_format_value(v)}' for k, v in series]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label combination"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(k), [*s[0]], s[1], s[2]] for k, s in sorted(self._series.items())]
+
+    def merge(self, snapshots: List[Tuple[int, list]]) -> list:
+        merged: Dict[Tuple[str, ...], list] = {}
+        for _, series in snapshots:
+            for key, counts, total, count in series:
+                entry = merged.setdefault(tuple(key), [[0] * len(counts), 0.0, 0])
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+        return [[list(k), *entry] for k, entry in sorted(merged.items())]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def _samples(self, series: list) -> List[str]:
+        lines = []
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Set of metrics rendered together in the Prometheus text exposition format
+
+    With a multiprocess_dir, which every serving process shares, each process
+    writes a snapshot of its metrics to <multiprocess_dir>/<pid>.json (from a
+    flusher thread, when it exits, and right before it renders) and render()
+    merges all snapshots: counters and histograms are summed, gauges keep one
+    series per pid. Snapshots of exited processes are kept so totals never go
+    backwards when workers are recycled; only their gauges are dropped.
+    """
+    def __init__(self, multiprocess_dir: Optional[str] = None):
+        self._metrics: List[_Metric] = []
+        self._collectors: Dict[str, Callable[[], None]] = {}
+        self.multiprocess_dir = multiprocess_dir
+        self._flusher_pid: Optional[int] = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def set_collector(self, name: str, collect: Callable[[], None]) -> None:
+        """Run collect before every snapshot, e.g. to mirror another component's counters (replaces name)"""
+        self._collectors[name] = collect
+
+    def snapshot(self) -> Dict[str, list]:
+        """Series of every metric in this process, by metric name"""
+        for collect in list(self._collectors.values()):
+            collect()
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def reset(self) -> None:
+        """Forget this process's values, e.g. in a forked worker whose parent reports its own"""
+        for metric in self._metrics:
+            metric.reset()
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.multiprocess_dir, f'{pid}.json')
+
+    def write_snapshot(self) -> None:
+        """Atomically publish this process's snapshot in multiprocess_dir (no-op without one)"""
+        if not self.multiprocess_dir:
+            return
+        path = self._snapshot_path(os.getpid())
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'live': True, 'metrics': self.snapshot()}, f)
+        os.replace(tmp, path)
+
+    def mark_process_dead(self, pid: int) -> None:
+        """Keep an exited process's counters and histograms but drop its gauges"""
+        if not self.multiprocess_dir:
+            return
+        path = self._snapshot_path(pid)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        data['live'] = False
+        tmp = f'{path}.dead.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def clear_snapshots(self) -> None:
+        """Remove every snapshot, for a fresh start of the serving processes"""
+        if self.multiprocess_dir:
+            for path in glob.glob(os.path.join(self.multiprocess_dir, '*.json')):
+                os.remove(path)
+
+    def start_flusher(self, interval: float = 1.0) -> Optional[threading.Thread]:
+        """
+        Write this process's snapshot every interval seconds from a daemon thread
+
+        Threads don't survive fork, so each worker starts its own. Returns the
+        thread, or None without a multiprocess_dir or if one already runs here.
+        """
+        if not self.multiprocess_dir or self._flusher_pid == os.getpid():
+            return None
+        self._flusher_pid = os.getpid()
+
+        def flush():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot()
+                except OSError:
+                    pass
+
+        thread = threading.Thread(target=flush, name='metrics-flusher', daemon=True)
+        thread.start()
+        return thread
+
+    def _merged(self) -> Dict[str, list]:
+        self.write_snapshot()
+        snapshots: Dict[str, List[Tuple[int, list]]] = {}
+        for path in glob.glob(os.path.join(self.multiprocess_dir, '*.json')):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+                pid = int(os.path.basename(path)[:-len('.json')])
+            except (OSError, ValueError):
+                continue  # replaced or removed meanwhile
+            for metric in self._metrics:
+                if metric.kind == 'gauge' and not data.get('live', True):
+                    continue
+                snapshots.setdefault(metric.name, []).append((pid, data['metrics'].get(metric.name, [])))
+        return {metric.name: metric.merge(snapshots.get(metric.name, [])) for metric in self._metrics}
+
+    def render(self) -> str:
+        """Exposition of this process's metrics, or of all processes' with a multiprocess_dir"""
+        if self.multiprocess_dir:
+            merged = self._merged()
+            lines = [line for metric in self._metrics for line in metric.render(merged[metric.name])]
+        else:
+            for collect in list(self._collectors.values()):
+                collect()
+            lines = [line for metric in self._metrics for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry(os.environ.get(MULTIPROC_DIR_ENV) or None)
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'medica_stage_seconds', 'Time spent in each prediction pipeline stage per request or batch', ('stage',)))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'medica_request_seconds', 'HTTP request latency by endpoint', ('endpoint',)))
+REQUESTS = REGISTRY.register(Counter(
+    'medica_requests_total', 'Prediction requests by endpoint and outcome', ('endpoint', 'outcome')))
+MODEL_LOADS = REGISTRY.register(Counter(
+    'medica_model_loads_total', 'Model loads and reloads by outcome', ('outcome',)))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    'medica_model_load_seconds', 'Duration of the last model load attempt by outcome', ('outcome',)))
+
+
+class _Stage:
+    __slots__ = ('name', 'timings', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> '_Stage':
+        self.timings = _local.timings
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        timings = self.timings
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+def stage(name: str) -> _Stage:
+    """
+    Context manager adding the time spent in the block to the current collection
+
+    Outside begin_timing()/finish_timing() it does nothing, so instrumented code
+    costs nothing in the CLI and scripts. Repeated stages (e.g. one per row of a
+    batch) are summed and observed once when the collection finishes.
+    """
+    return _Stage(name)
+
+
+def begin_timing() -> None:
+    """Start collecting stage timings on this thread"""
+    _local.timings = {}
+    _local.borrowed = None
+
+
+def add_timings(timings: Optional[Dict[str, float]]) -> None:
+    """
+    Add stage times measured on another thread (e.g. an inference worker) to this
+    thread's collection
+
+    They show up in what finish_timing() returns, for the Server-Timing header,
+    but are not observed again: the thread that measured them already did.
+    """
+    if timings and _local.timings is not None:
+        borrowed = _local.borrowed if _local.borrowed is not None else {}
+        for name, seconds in timings.items():
+            borrowed[name] = borrowed.get(name, 0.0) + seconds
+        _local.borrowed = borrowed
+
+
+def finish_timing() -> Optional[Dict[str, float]]:
+    """Stop collecting on this thread, record the stage totals and return them"""
+    timings = _local.timings
+    borrowed = _local.borrowed
+    _local.timings = _local.borrowed = None
+    if timings:
+        for name, seconds in timings.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+    if borrowed:
+        for name, seconds in (timings or {}).items():
+            borrowed[name] = borrowed.get(name, 0.0) + seconds
+        return borrowed
+    return timings
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLES_DIR = 'bundles'
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+
+
+class ModelBundle:
+    """
+    A versioned model artifact bundle opened from disk
+
+    Numeric arrays are .npy files opened with mmap_mode='r', so every process
+    serving the same bundle reads the same page-cache pages instead of holding
+    a private copy. Small metadata (symptom list, classes, importances) lives in
+    the JSON manifest.
+    """
+    def __init__(self, path: str, mmap: bool = True):
+        """
+        Args:
+            path: Bundle directory containing manifest.json
+            mmap: Memory-map the arrays (False reads them into private memory)
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+
+        if self.manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format {self.manifest.get('format_version')} in {path}")
+
+        mmap_mode = 'r' if mmap else None
+        self.arrays: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(path, spec['file']), mmap_mode=mmap_mode, allow_pickle=False)
+            for name, spec in self.manifest['arrays'].items()
+        }
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def symptom_list(self) -> List[str]:
+        return self.manifest['symptom_list']
+
+    @property
+    def feature_importance(self) -> Optional[Dict[str, float]]:
+        return self.manifest.get('feature_importance')
+
+    def forest_arrays(self) -> Dict[str, Any]:
+        """Arrays in the layout expected by forest_engine.CompiledForest"""
+        arrays = dict(self.arrays)
+        arrays['classes'] = np.asarray(self.manifest['classes'])
+        arrays['n_features'] = self.manifest['n_features']
+        arrays['max_depth'] = self.manifest['max_depth']
+        return arrays
+
+
+def write_bundle(output_dir: str, forest_arrays: Dict[str, np.ndarray], symptom_list: List[str],
+                 feature_importance: Optional[Dict[str, float]] = None,
+                 metadata: Optional[Dict[str, Any]] = None,
+                 version: Optional[str] = None) -> str:
+    """
+    Write a new bundle version under output_dir/bundles and mark it as the latest
+
+    Args:
+        output_dir: Model directory (the bundle goes to output_dir/bundles/<version>)
+        forest_arrays: Output of forest_engine.export_forest
+        symptom_list: Feature order used by the model
+        feature_importance: Optional mapping of feature name to importance
+        metadata: Extra JSON-serializable information stored in the manifest
+        version: Bundle version (defaults to a UTC timestamp)
+
+    Returns:
+        Path of the written bundle directory
+    """
+    version = version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    bundles_dir = os.path.join(output_dir, BUNDLES_DIR)
+    final_path = os.path.join(bundles_dir, version)
+    tmp_path = final_path + '.tmp'
+    if os.path.exists(final_path):
+        raise FileExistsError(f"Bundle version {version} already exists in {bundles_dir}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    scalars = ('classes', 'n_features', 'max_depth')
+    arrays_spec = {}
+    for name, array in forest_arrays.items():
+        if name in scalars:
+            continue
+        array = np.ascontiguousarray(array)
+        filename = f'{name}.npy'
+        np.save(os.path.join(tmp_path, filename), array, allow_pickle=False)
+        arrays_spec[name] = {'file': filename, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'version': version,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'n_features': int(forest_arrays['n_features']),
+        'max_depth': int(forest_arrays['max_depth']),
+        'classes': [str(c) for c in forest_arrays['classes']],
+        'symptom_list': list(symptom_list),
+        'feature_importance': (
+            {str(k): float(v) for k, v in feature_importance.items()}
+            if feature_importance is not None else None
+        ),
+        'arrays': arrays_spec,
+        'metadata': metadata or {}
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Publish the directory, then the pointer, so readers never see a partial bundle
+    os.replace(tmp_path, final_path)
+    _write_latest(bundles_dir, version)
+    return final_path
+
+
+def _write_latest(bundles_dir: str, version: str) -> None:
+    """Atomically point bundles/LATEST at version"""
+    tmp = os.path.join(bundles_dir, LATEST_FILE + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+    os.replace(tmp, os.path.join(bundles_dir, LATEST_FILE))
+
+
+def latest_version(model_dir: str) -> Optional[str]:
+    """Version named by model_dir/bundles/LATEST, or None if there is no bundle"""
+    try:
+        with open(os.path.join(model_dir, BUNDLES_DIR, LATEST_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def open_bundle(model_dir: str, version: Optional[str] = None, mmap: bool = True) -> ModelBundle:
+    """
+    Open a bundle from model_dir (the latest one unless version is given)
+
+    Raises:
+        FileNotFoundError if no bundle exists
+    """
+    version = version or latest_version(model_dir)
+    if version is None:
+        raise FileNotFoundError(f"No model bundle found in {os.path.join(model_dir, BUNDLES_DIR)}")
+    return ModelBundle(os.path.join(model_dir, BUNDLES_DIR, version), mmap=mmap)
+
+
+def main():
+    """Build a bundle from the joblib artifacts of an already trained model"""
+    parser = argparse.ArgumentParser(description='Write a memory-mappable model bundle')
+    parser.add_argument('--model-dir', default='models', help='Directory containing model files')
+    args = parser.parse_args()
+
+    import joblib
+    from forest_engine import export_forest
+    try:
+        model = joblib.load(os.path.join(args.model_dir, 'disease_rf_model.joblib'))
+        symptom_list = joblib.load(os.path.join(args.model_dir, 'symptom_list.joblib'))
+    except FileNotFoundError as e:
+        sys.exit(f"Error loading model files: {e}. Please ensure you've trained the model first.")
+    try:
+        importance = joblib.load(os.path.join(args.model_dir, 'feature_importance.joblib')).to_dict()
+    except FileNotFoundError:
+        importance = None
+
+    path = write_bundle(args.model_dir, export_forest(model), symptom_list, importance,
+                        metadata={'source': 'disease_rf_model.joblib'})
+    print(f"Model bundle written to {path}")
+
+
+if __name__ == '__main__':
+    main()
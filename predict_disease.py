@@ -1,11 +1,58 @@
-import joblib
-import pandas as pd
+import csv
+import json
+import multiprocessing
 import numpy as np
 import os
-from difflib import get_close_matches
 import sys
-from typing import Dict, List, Tuple, Any, Optional, Union
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple, Any, Optional, Union
 import argparse
+import hashlib
+from collections import deque
+from contextlib import redirect_stdout
+from forest_engine import COMPILED_MODEL_FILE, CompiledForest
+from metrics import stage
+from model_bundle import latest_version, open_bundle
+from prediction_cache import LRUCache
+from symptom_matcher import SymptomMatcher, SymptomPrefixIndex
+
+# Files in model_dir whose contents determine the predictions
+MODEL_ARTIFACTS = ('disease_rf_model.joblib', COMPILED_MODEL_FILE, 'symptom_list.joblib',
+                   'symptom_mapping.joblib', 'feature_importance.joblib')
+
+# Default bulk scoring processes: each may hold its own model copy (every engine but
+# mmap), so more than a few cost memory for little extra throughput
+DEFAULT_BULK_WORKERS = min(4, os.cpu_count() or 1)
+
+def artifact_fingerprint(model_dir: str) -> str:
+    """Short hash of the size and mtime of each model artifact, used as the model version"""
+    digest = hashlib.sha1()
+    for name in MODEL_ARTIFACTS:
+        path = os.path.join(model_dir, name)
+        try:
+            st = os.stat(path)
+            digest.update(f'{name}:{st.st_size}:{st.st_mtime_ns};'.encode())
+        except OSError:
+            digest.update(f'{name}:missing;'.encode())
+    return digest.hexdigest()[:12]
+
+def read_csv_records(path: str) -> List[Dict[str, str]]:
+    """Rows of a small CSV file as dicts of strings (stdlib csv, so serving never imports pandas)"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def _parse_number(value: str) -> Union[int, float]:
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def model_version_on_disk(model_dir: str, engine: str = 'sklearn') -> Optional[str]:
+    """Version a DiseasePredictor(model_dir, engine=engine) would load right now"""
+    if engine == 'mmap':
+        return latest_version(model_dir)
+    return artifact_fingerprint(model_dir)
 
 class DiseasePredictor:
     """
@@ -15,7 +62,15 @@ class DiseasePredictor:
                  model_dir: str = 'models',
                  symptom_desc_path: str = 'dataset/symptom_description.csv',
                  symptom_prec_path: str = 'dataset/symptom_precaution.csv',
-                 symptom_sev_path: str = 'dataset/symptom_severity.csv'):
+                 symptom_sev_path: str = 'dataset/symptom_severity.csv',
+                 top_k: int = 3,
+                 min_probability: float = 0.01,
+                 cache_size: int = 1024,
+                 cache_ttl: Optional[float] = None,
+                 engine: str = 'sklearn',
+                 bundle_version: Optional[str] = None,
+                 parse_cache: Optional[LRUCache] = None,
+                 prediction_cache: Optional[LRUCache] = None):
         """
         Initialize the disease predictor with model and reference data
         
@@ -24,65 +79,147 @@ class DiseasePredictor:
             symptom_desc_path: Path to symptom description CSV
             symptom_prec_path: Path to symptom precaution CSV
             symptom_sev_path: Path to symptom severity CSV
+            top_k: Default number of diseases reported (top prediction included)
+            min_probability: Default probability floor for alternative predictions
+            cache_size: Maximum entries in each of the parse and prediction caches (0 disables)
+            cache_ttl: Seconds a cache entry stays valid, or None for no expiry
+            engine: 'sklearn' to run the pickled RandomForestClassifier, 'compiled'
+                to evaluate the flat-array export (disease_rf_compiled.npz) without sklearn,
+                or 'mmap' to run the compiled forest zero-copy from a model bundle
+                (model_dir/bundles), sharing its pages across worker processes
+            bundle_version: Bundle to open with engine='mmap' (defaults to the latest)
+            parse_cache, prediction_cache: Caches to use instead of new ones sized by
+                cache_size and cache_ttl, e.g. to keep them across model reloads.
+                Entries are keyed by model version, so a shared cache never serves
+                another model's results
         """
+        if engine not in ('sklearn', 'compiled', 'mmap'):
+            raise ValueError(f"Unknown engine '{engine}', expected 'sklearn', 'compiled' or 'mmap'")
+        self.engine = engine
+        self.top_k = top_k
+        self.min_probability = min_probability
+        
         # 1. Load model and metadata
         try:
-            self.model = joblib.load(os.path.join(model_dir, 'disease_rf_model.joblib'))
-            self.symptom_list = joblib.load(os.path.join(model_dir, 'symptom_list.joblib'))
-            
-            # Try to load feature importance if available
-            try:
-                self.feature_importance = joblib.load(os.path.join(model_dir, 'feature_importance.joblib'))
-                self.has_importance = True
-            except:
-                self.has_importance = False
+            if engine == 'mmap':
+                # Everything comes from the bundle; the forest arrays stay memory-mapped
+                bundle = open_bundle(model_dir, bundle_version)
+                self.model_version = bundle.version
+                self.model = CompiledForest(bundle.forest_arrays())
+                self.symptom_list = bundle.symptom_list
+                self.feature_importance = bundle.feature_importance
+                self.has_importance = self.feature_importance is not None
+            else:
+                # joblib (and with it sklearn/pandas for the unpickled objects) is only
+                # needed here; the mmap engine serves without importing any of them
+                import joblib
+                self.model_version = artifact_fingerprint(model_dir)
+                if engine == 'compiled':
+                    self.model = CompiledForest.load(os.path.join(model_dir, COMPILED_MODEL_FILE))
+                else:
+                    self.model = joblib.load(os.path.join(model_dir, 'disease_rf_model.joblib'))
+                self.symptom_list = joblib.load(os.path.join(model_dir, 'symptom_list.joblib'))
+                
+                # Try to load feature importance if available
+                try:
+                    self.feature_importance = joblib.load(os.path.join(model_dir, 'feature_importance.joblib'))
+                    self.has_importance = True
+                except:
+                    self.has_importance = False
                 
         except FileNotFoundError as e:
             sys.exit(f"Error loading model files: {e}. Please ensure you've trained the model first.")
             
-        # 2. Load auxiliary dataframes
+        # 2. Load auxiliary reference data
         try:
-            self.df_desc = pd.read_csv(symptom_desc_path)    # Columns: Disease, Description
-            self.df_prec = pd.read_csv(symptom_prec_path)    # Columns: Disease, Precaution_1...4
-            self.df_sev = pd.read_csv(symptom_sev_path)      # Columns: Symptom, weight
+            desc_rows = read_csv_records(symptom_desc_path)    # Columns: Disease, Description
+            prec_rows = read_csv_records(symptom_prec_path)    # Columns: Disease, Precaution_1...4
+            sev_rows = read_csv_records(symptom_sev_path)      # Columns: Symptom, weight
         except FileNotFoundError as e:
             sys.exit(f"Error loading auxiliary data files: {e}")
             
-        # 3. Clean identifier columns
-        self.df_desc['Disease'] = self.df_desc['Disease'].astype(str).str.strip()
-        self.df_prec['Disease'] = self.df_prec['Disease'].astype(str).str.strip()
-        self.df_sev['Symptom'] = self.df_sev['Symptom'].astype(str).str.strip()
-
-        # 4. Build lookup maps
-        self.desc_map = dict(zip(self.df_desc['Disease'], self.df_desc['Description']))
-        self.prec_cols = [col for col in self.df_prec.columns if col.startswith('Precaution')]
+        # 3. Build lookup maps on stripped identifiers
+        self.desc_map = {row['Disease'].strip(): row['Description'] for row in desc_rows}
+        self.prec_cols = [col for col in (prec_rows[0] if prec_rows else {}) if col.startswith('Precaution')]
         self.prec_map = {
-            row['Disease']: [row[col] for col in self.prec_cols if pd.notna(row[col])]  
-            for _, row in self.df_prec.iterrows()
+            row['Disease'].strip(): [row[col] for col in self.prec_cols if row[col]]
+            for row in prec_rows
+        }
+        weights = [_parse_number(row['weight']) for row in sev_rows]
+        self.sev_map = {row['Symptom'].strip(): w for row, w in zip(sev_rows, weights)}
+        # Mean over all rows, duplicates included
+        self.mean_sev = sum(weights) / len(weights) if weights else 0.0
+        
+        # 4. JSON-ready result fragments built once per disease and symptom, in plain
+        # Python types; a prediction copies the small template and fills in the numbers
+        self.disease_payloads = [
+            {
+                'disease': str(disease),
+                'probability': 0.0,
+                'description': str(self.desc_map.get(disease, 'No description available')),
+                'precautions': [str(p) for p in self.prec_map.get(disease, [])]
+            }
+            for disease in self.model.classes_
+        ]
+        self.precaution_blocks = {
+            payload['disease']: ''.join(f"• {p}\n" for p in payload['precautions'])
+            for payload in self.disease_payloads
         }
-        self.sev_map = dict(zip(self.df_sev['Symptom'], self.df_sev['weight']))
-        self.mean_sev = self.df_sev['weight'].mean()
+        self.symptom_payloads = {sym: self._symptom_payload(sym) for sym in self.symptom_list}
         
-        # 5. Create a list of all symptoms for fuzzy matching
+        # 5. Build the fuzzy matching indexes over all known symptoms
         self.all_symptoms_lower = {s.lower(): s for s in self.symptom_list}
+        self.matcher = SymptomMatcher(self.symptom_list)
+        
+        # 5b. Autocomplete index, rankable by model importance or severity
+        self.suggester = SymptomPrefixIndex(self.symptom_list, scores={
+            'importance': {sym: p['importance'] for sym, p in self.symptom_payloads.items()},
+            'severity': {sym: p['severity'] for sym, p in self.symptom_payloads.items()}
+        })
+        
+        # 6. Feature column names in model order
+        self.feature_names = [f'has_{sym}' for sym in self.symptom_list]
+        
+        # 7. Symptom -> column index map and reusable per-thread feature rows
+        self.symptom_index = {sym: i for i, sym in enumerate(self.symptom_list)}
+        self._buffers = threading.local()
+        self._buffers.row = np.zeros((1, len(self.symptom_list)), dtype=np.float32)
+        
+        # The model is fed plain arrays from here on, so check the column order
+        # it was fitted with once and then drop the names to skip per-call checks
+        fitted_names = getattr(self.model, 'feature_names_in_', None)
+        if fitted_names is not None:
+            if list(fitted_names) != self.feature_names:
+                sys.exit("Error loading model files: symptom_list.joblib does not match "
+                         "the model's feature columns. Please retrain the model.")
+            del self.model.feature_names_in_
+        
+        # 8. Memoization: raw input -> parsed symptoms, and symptom set -> probabilities.
+        # Keys include the model version, so entries of a previous model never hit
+        self.parse_cache = parse_cache if parse_cache is not None else LRUCache(cache_size, cache_ttl)
+        self.prediction_cache = (prediction_cache if prediction_cache is not None
+                                 else LRUCache(cache_size, cache_ttl))
         
         print(f"Loaded disease prediction model with {len(self.symptom_list)} symptoms.")
         print(f"Model can predict {len(self.model.classes_)} different diseases.")
+        
+        # When this model started serving; HTTP responses derived from it use it as Last-Modified
+        self.loaded_at = time.time()
 
+    def suggest_symptoms(self, query: str, limit: int = 7, rank: str = 'name') -> List[str]:
+        """
+        Autocomplete known symptoms from a partially typed name
+        
+        Args:
+            query: Text typed so far; underscores and spaces are interchangeable
+            limit: Maximum number of symptoms returned
+            rank: 'name', 'importance' (model feature importance) or 'severity'
+        """
+        return self.suggester.suggest(query, limit, rank)
+    
     def get_closest_symptom_match(self, symptom: str) -> Optional[str]:
         """Find the closest matching symptom from the known symptom list"""
-        symptom = symptom.lower().strip()
-        
-        # Exact match
-        if symptom in self.all_symptoms_lower:
-            return self.all_symptoms_lower[symptom]
-            
-        # Fuzzy match
-        matches = get_close_matches(symptom, list(self.all_symptoms_lower.keys()), n=1, cutoff=0.6)
-        if matches:
-            return self.all_symptoms_lower[matches[0]]
-            
-        return None
+        return self.matcher.match(symptom)
     
     def parse_symptoms(self, symptom_input: str) -> Tuple[List[str], List[str], List[str]]:
         """
@@ -99,17 +236,14 @@ class DiseasePredictor:
         suggested = []
         
         for symptom in input_symptoms:
-            match = self.get_closest_symptom_match(symptom)
+            # One lookup yields both the match and, failing that, the suggestions
+            match, suggestions = self.matcher.lookup(symptom)
             if match:
                 matched.append(match)
             else:
                 unmatched.append(symptom)
-                # Get potential suggestions
-                matches = get_close_matches(symptom.lower(), 
-                                           list(self.all_symptoms_lower.keys()), 
-                                           n=3, cutoff=0.4)
-                if matches:
-                    suggested.append((symptom, [self.all_symptoms_lower[m] for m in matches]))
+                if suggestions:
+                    suggested.append((symptom, suggestions))
                     
         return matched, unmatched, suggested
     
@@ -120,63 +254,194 @@ class DiseasePredictor:
         Returns:
             Tuple of (predicted_disease, probability_array)
         """
-        # Build feature vector for model
-        feat = {f'has_{sym}': int(sym in symptoms) for sym in self.symptom_list}
-        X = pd.DataFrame([feat])
-        
-        # Predict disease and probabilities
-        disease = self.model.predict(X)[0]
-        probas = self.model.predict_proba(X)[0]
+        with stage('encode'):
+            X = self.encode(symptoms)
+        try:
+            # The forest's predict() is the argmax of predict_proba(), so one pass covers both
+            with stage('model'):
+                probas = self.model.predict_proba(X)[0]
+            disease = self.model.classes_[np.argmax(probas)]
+        finally:
+            # Reset only the columns that were set so the row is clean for the next call
+            X[0, self._symptom_columns(symptoms)] = 0
         
         return disease, probas
     
-    def get_top_diseases(self, probas: np.ndarray, n: int = 3) -> List[Dict[str, Any]]:
-        """Get top N diseases with their probabilities"""
-        classes = self.model.classes_
-        # Get indices of top N probabilities
-        top_indices = np.argsort(probas)[::-1][:n]
+    def encode(self, symptoms: List[str]) -> np.ndarray:
+        """
+        Encode a list of symptoms into this thread's preallocated feature row
+        
+        The returned (1, n_features) array is reused across calls on the same
+        thread, so callers must clear it once the model has consumed it.
+        """
+        row = getattr(self._buffers, 'row', None)
+        if row is None:
+            row = self._buffers.row = np.zeros((1, len(self.symptom_list)), dtype=np.float32)
+        row[0, self._symptom_columns(symptoms)] = 1
+        return row
+    
+    def _symptom_columns(self, symptoms: List[str]) -> List[int]:
+        """Map symptom names to feature column indices, ignoring unknown names"""
+        index = self.symptom_index
+        return [index[sym] for sym in symptoms if sym in index]
+    
+    def encode_batch(self, symptom_lists: List[List[str]]) -> np.ndarray:
+        """
+        Encode several symptom lists into one binary feature matrix
+        
+        Args:
+            symptom_lists: One list of matched symptom names per request
+            
+        Returns:
+            float32 array of shape (len(symptom_lists), len(symptom_list)); float32
+            is what the forest uses internally, so no conversion copy is made
+        """
+        X = np.zeros((len(symptom_lists), len(self.symptom_list)), dtype=np.float32)
+        
+        rows, cols = [], []
+        for row, symptoms in enumerate(symptom_lists):
+            row_cols = self._symptom_columns(symptoms)
+            rows.extend([row] * len(row_cols))
+            cols.extend(row_cols)
+        X[rows, cols] = 1
+        
+        return X
+    
+    def _parse_cached(self, symptom_input: str) -> Tuple[List[str], List[str], List[str]]:
+        """parse_symptoms() through the parse cache; returns fresh lists on every call"""
+        text = symptom_input.strip()
+        key = (self.model_version, text)
+        parsed = self.parse_cache.get(key)
+        if parsed is None:
+            with stage('parse'):
+                matched, unmatched, suggested = self.parse_symptoms(text)
+            parsed = (tuple(matched), tuple(unmatched), tuple(suggested))
+            self.parse_cache.put(key, parsed)
+        matched, unmatched, suggested = parsed
+        return list(matched), list(unmatched), list(suggested)
+    
+    def _symptom_key(self, symptoms: List[str]) -> Tuple[str, frozenset]:
+        """Cache key for a set of matched symptoms (order and duplicates ignored) under this model"""
+        return self.model_version, frozenset(symptoms)
+    
+    def _predict_cached(self, symptoms: List[str]) -> np.ndarray:
+        """Class probabilities for a matched symptom list, through the prediction cache"""
+        key = self._symptom_key(symptoms)
+        probas = self.prediction_cache.get(key)
+        if probas is None:
+            _, probas = self.predict(symptoms)
+            probas.setflags(write=False)
+            self.prediction_cache.put(key, probas)
+        return probas
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for the parse and prediction caches"""
+        return {
+            'model_version': self.model_version,
+            'parse_cache': self.parse_cache.stats(),
+            'prediction_cache': self.prediction_cache.stats()
+        }
+    
+    def predict_batch(self, symptom_lists: List[List[str]]) -> Tuple[List[str], np.ndarray]:
+        """
+        Predict diseases for many symptom lists with a single model call
+        
+        Args:
+            symptom_lists: One list of matched symptom names per request
+            
+        Returns:
+            Tuple of (predicted_diseases, probability_matrix) where row i of the
+            matrix holds the class probabilities for symptom_lists[i]
+        """
+        if not symptom_lists:
+            return [], np.empty((0, len(self.model.classes_)))
+        
+        with stage('encode'):
+            X = self.encode_batch(symptom_lists)
+        
+        with stage('model'):
+            probas = self.model.predict_proba(X)
+        diseases = list(self.model.classes_[np.argmax(probas, axis=1)])
+        
+        return diseases, probas
+    
+    def get_top_diseases(self, probas: np.ndarray, n: Optional[int] = None,
+                         min_probability: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get top N diseases with their probabilities
+        
+        Args:
+            probas: Class probability vector from the model
+            n: Number of diseases to consider (defaults to self.top_k)
+            min_probability: Only diseases above this probability are returned
+                (defaults to self.min_probability)
+        """
+        if min_probability is None:
+            min_probability = self.min_probability
         
         return [
-            {
-                'disease': classes[i],
-                'probability': probas[i],
-                'description': self.desc_map.get(classes[i], 'No description available'),
-                'precautions': self.prec_map.get(classes[i], [])
-            }
-            for i in top_indices if probas[i] > 0.01  # Only return diseases with some probability
+            self._disease_entry(i, probas[i])
+            for i in self._top_indices(probas, n)
+            if probas[i] > min_probability  # Only return diseases with some probability
         ]
     
+    def _top_indices(self, probas: np.ndarray, n: Optional[int] = None) -> np.ndarray:
+        """Indices of the n largest probabilities, highest first (ties keep class order)"""
+        n = min(self.top_k if n is None else n, len(probas))
+        if n <= 0:
+            return np.empty(0, dtype=np.intp)
+        
+        # argpartition is O(C); only the n selected entries get sorted
+        top = np.argpartition(-probas, n - 1)[:n]
+        order = np.lexsort((top, -probas[top]))
+        return top[order]
+    
+    def _disease_entry(self, class_idx: int, probability: float) -> Dict[str, Any]:
+        """Result entry for a single disease class"""
+        entry = self.disease_payloads[class_idx].copy()
+        entry['probability'] = float(probability)
+        return entry
+    
+    def _symptom_payload(self, sym: str) -> Dict[str, Any]:
+        """Severity and importance entry for one symptom, in plain Python types"""
+        severity = self.sev_map.get(sym, self.mean_sev)
+        # Add feature importance if available
+        importance = None
+        if self.has_importance and f'has_{sym}' in self.feature_importance:
+            importance = float(self.feature_importance[f'has_{sym}'])
+        
+        return {
+            'symptom': sym,
+            'severity': severity.item() if isinstance(severity, np.generic) else severity,
+            'importance': importance
+        }
+    
     def get_symptom_information(self, symptoms: List[str]) -> List[Dict[str, Any]]:
         """Get information about each symptom including severity"""
-        details = []
-        for sym in symptoms:
-            severity = self.sev_map.get(sym, self.mean_sev)
-            # Add feature importance if available
-            importance = None
-            if self.has_importance and f'has_{sym}' in self.feature_importance:
-                importance = self.feature_importance[f'has_{sym}']
-                
-            details.append({
-                'symptom': sym,
-                'severity': severity,
-                'importance': importance
-            })
+        payloads = self.symptom_payloads
+        details = [
+            payloads[sym].copy() if sym in payloads else self._symptom_payload(sym)
+            for sym in symptoms
+        ]
         
         # Sort by severity (higher first)
         return sorted(details, key=lambda x: x['severity'], reverse=True)
         
-    def predict_and_info(self, symptom_input: str) -> Dict[str, Any]:
+    def predict_and_info(self, symptom_input: str, top_k: Optional[int] = None,
+                         min_probability: Optional[float] = None) -> Dict[str, Any]:
         """
         Main prediction function that processes user input and returns comprehensive results
         
         Args:
             symptom_input: Comma-separated string of symptoms
+            top_k: Number of diseases reported, overriding self.top_k
+            min_probability: Probability floor for alternatives, overriding self.min_probability
             
         Returns:
             Dictionary containing prediction results and additional information
         """
         # Parse user symptoms
-        matched_symptoms, unmatched, suggested = self.parse_symptoms(symptom_input)
+        matched_symptoms, unmatched, suggested = self._parse_cached(symptom_input)
         
         if not matched_symptoms:
             return {
@@ -186,23 +451,92 @@ class DiseasePredictor:
             }
             
         # Make prediction
-        disease, probas = self.predict(matched_symptoms)
+        probas = self._predict_cached(matched_symptoms)
+        
+        return self._build_results(probas, matched_symptoms, unmatched, suggested,
+                                   top_k, min_probability)
+    
+    def predict_and_info_batch(self, symptom_inputs: List[str], top_k: Optional[int] = None,
+                               min_probability: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Batch version of predict_and_info that runs the model once for all inputs
+        
+        Args:
+            symptom_inputs: Comma-separated symptom strings, one per request
+            top_k: Number of diseases reported, overriding self.top_k
+            min_probability: Probability floor for alternatives, overriding self.min_probability
+            
+        Returns:
+            List of result dictionaries in the same order and format as predict_and_info
+        """
+        parsed = [self._parse_cached(symptom_input) for symptom_input in symptom_inputs]
+        
+        # Only inputs with at least one recognised symptom need probabilities; serve
+        # those from the cache where possible and run the rest through one model call
+        valid = [i for i, (matched, _, _) in enumerate(parsed) if matched]
+        probas = {}
+        misses = {}
+        for i in valid:
+            key = self._symptom_key(parsed[i][0])
+            cached = self.prediction_cache.get(key)
+            if cached is not None:
+                probas[i] = cached
+            else:
+                misses.setdefault(key, []).append(i)
+        
+        if misses:
+            _, computed = self.predict_batch([parsed[rows[0]][0] for rows in misses.values()])
+            for (key, rows), row_probas in zip(misses.items(), computed):
+                # Copy so a cached row does not keep the whole batch matrix alive
+                row_probas = row_probas.copy()
+                row_probas.setflags(write=False)
+                self.prediction_cache.put(key, row_probas)
+                for i in rows:
+                    probas[i] = row_probas
+        
+        results: List[Dict[str, Any]] = [
+            {
+                'error': 'No valid symptoms provided',
+                'unmatched': unmatched,
+                'suggestions': suggested
+            }
+            for _, unmatched, suggested in parsed
+        ]
+        for i in valid:
+            matched_symptoms, unmatched, suggested = parsed[i]
+            results[i] = self._build_results(probas[i], matched_symptoms, unmatched, suggested,
+                                             top_k, min_probability)
         
-        # Get top diseases
-        top_diseases = self.get_top_diseases(probas)
+        return results
+    
+    def _build_results(self, probas: np.ndarray, matched_symptoms: List[str],
+                       unmatched: List[str], suggested: List[Tuple[str, List[str]]],
+                       top_k: Optional[int] = None,
+                       min_probability: Optional[float] = None) -> Dict[str, Any]:
+        """Assemble the result dictionary for a single prediction"""
+        if min_probability is None:
+            min_probability = self.min_probability
+        
+        # Top prediction and alternatives all come from the same probability vector;
+        # the first top index is the argmax, i.e. what model.predict() would return
+        with stage('rank'):
+            top_indices = self._top_indices(probas, max(top_k if top_k is not None else self.top_k, 1))
+            best = top_indices[0]
+            top_prediction = self._disease_entry(best, probas[best])
+            alternatives = [
+                self._disease_entry(i, probas[i])
+                for i in top_indices[1:]
+                if probas[i] > min_probability  # Only return diseases with some probability
+            ]
         
         # Get symptom details
-        symptom_details = self.get_symptom_information(matched_symptoms)
+        with stage('symptom_info'):
+            symptom_details = self.get_symptom_information(matched_symptoms)
         
         # Return comprehensive results
         return {
-            'top_prediction': {
-                'disease': disease,
-                'probability': probas[list(self.model.classes_).index(disease)],
-                'description': self.desc_map.get(disease, 'No description available'),
-                'precautions': self.prec_map.get(disease, [])
-            },
-            'alternative_predictions': top_diseases[1:] if len(top_diseases) > 1 else [],
+            'top_prediction': top_prediction,
+            'alternative_predictions': alternatives,
             'matched_symptoms': matched_symptoms,
             'symptom_details': symptom_details,
             'unmatched_symptoms': unmatched,
@@ -263,17 +597,231 @@ class DiseasePredictor:
                     print(f"   Did you mean '{original}' → {', '.join(suggestions)}?")
         print("\n" + "="*60)
 
+# Predictor used by bulk scoring workers; set in the parent before forking so
+# children share the loaded model (and, with engine='mmap', its pages)
+_bulk_predictor: Optional['DiseasePredictor'] = None
+
+def iter_symptom_records(path: str, fmt: str = 'auto',
+                         column: str = 'symptoms') -> Iterator[Dict[str, Any]]:
+    """
+    Stream records to score from a CSV or JSONL file, one at a time
+
+    CSV files either have a column of comma-separated symptom strings (column) or
+    are shaped like dataset.csv, whose Symptom_* columns are joined. JSONL lines are
+    objects with the symptoms as a string or list under column, or bare strings.
+    An 'id' field is passed through, otherwise the 1-based record number is used;
+    a 'Disease' field (dataset.csv) is passed through as 'label'.
+
+    Yields:
+        Dicts with 'id', 'symptoms' (comma-separated string) and optionally 'label'
+    """
+    if fmt == 'auto':
+        fmt = 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+    
+    with (sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')) as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            fields = reader.fieldnames or []
+            symptom_cols = [c for c in fields if c.startswith('Symptom_')]
+            if column not in fields and not symptom_cols:
+                raise ValueError(f"{path} has neither a '{column}' column nor Symptom_* columns")
+            for n, row in enumerate(reader, 1):
+                if column in row:
+                    symptoms = row[column] or ''
+                else:
+                    symptoms = ','.join(row[c].strip() for c in symptom_cols if row[c] and row[c].strip())
+                record = {'id': row.get('id') or n, 'symptoms': symptoms}
+                if row.get('Disease'):
+                    record['label'] = row['Disease'].strip()
+                yield record
+        else:
+            n = 0
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                n += 1
+                item = json.loads(line)
+                if isinstance(item, str):
+                    item = {column: item}
+                symptoms = item.get(column) or ''
+                if isinstance(symptoms, list):
+                    symptoms = ','.join(symptoms)
+                record = {'id': item.get('id', n), 'symptoms': symptoms}
+                if item.get('Disease'):
+                    record['label'] = item['Disease']
+                yield record
+
+def score_records(records: List[Dict[str, Any]], top_k: Optional[int] = None) -> Tuple[List[str], int]:
+    """
+    Score a batch of records with the bulk predictor and serialize the results
+
+    Only what a backfill needs is kept (diseases, probabilities, matched and
+    unmatched symptoms); descriptions and precautions are looked up by disease.
+
+    Returns:
+        One JSON line per record in input order, and the number of records
+        without a recognised symptom
+    """
+    results = _bulk_predictor.predict_and_info_batch([r['symptoms'] for r in records], top_k=top_k)
+    lines = []
+    errors = 0
+    for record, result in zip(records, results):
+        out: Dict[str, Any] = {'id': record['id']}
+        if 'label' in record:
+            out['label'] = record['label']
+        if 'error' in result:
+            out['error'] = result['error']
+            errors += 1
+            out['unmatched_symptoms'] = result['unmatched']
+        else:
+            out['predictions'] = [
+                {'disease': d['disease'], 'probability': round(d['probability'], 6)}
+                for d in [result['top_prediction']] + result['alternative_predictions']
+            ]
+            out['matched_symptoms'] = result['matched_symptoms']
+            out['unmatched_symptoms'] = result['unmatched_symptoms']
+        lines.append(json.dumps(out, separators=(',', ':')) + '\n')
+    return lines, errors
+
+def _load_bulk_predictor(predictor_kwargs: Dict[str, Any]) -> 'DiseasePredictor':
+    # The load banner goes to stderr so stdout carries nothing but JSONL results
+    with redirect_stdout(sys.stderr):
+        return DiseasePredictor(**predictor_kwargs)
+
+def _init_bulk_worker(predictor_kwargs: Dict[str, Any]) -> None:
+    global _bulk_predictor
+    # Forked workers inherit the parent's predictor; spawned ones load their own
+    if _bulk_predictor is None:
+        _bulk_predictor = _load_bulk_predictor(predictor_kwargs)
+
+def _batches(records: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def bulk_score(input_path: str, output, predictor_kwargs: Dict[str, Any], fmt: str = 'auto',
+               column: str = 'symptoms', batch_size: int = 512, workers: int = 1,
+               top_k: Optional[int] = None, progress_every: int = 0) -> Dict[str, Any]:
+    """
+    Score a CSV/JSONL file of symptom records in batches and stream JSONL results
+
+    The model is loaded once in this process; worker processes are forked from
+    it so they share the model instead of loading a copy each. At most
+    2 * workers batches are in flight and results are written in input order as
+    they complete, so memory stays constant however large the input is.
+
+    Args:
+        input_path: CSV or JSONL file ('-' for stdin)
+        output: Writable text file for the JSONL results
+        predictor_kwargs: DiseasePredictor arguments (model_dir, engine, ...)
+        fmt: 'csv', 'jsonl' or 'auto' (by file extension)
+        column: Field holding the symptom string
+        batch_size: Records per model call
+        workers: Scoring processes (1 scores in this process)
+        top_k: Diseases reported per record
+        progress_every: Print progress to stderr every this many records (0 disables)
+
+    Returns:
+        Summary with record, error and batch counts, elapsed seconds and records/s
+
+    Raises:
+        BrokenPipeError if the reader of output goes away (e.g. `| head`); the
+        worker processes are terminated first
+    """
+    global _bulk_predictor
+    _bulk_predictor = _load_bulk_predictor(predictor_kwargs)
+    records = iter_symptom_records(input_path, fmt, column)
+    summary = {'records': 0, 'errors': 0, 'batches': 0}
+    start = time.perf_counter()
+    
+    def write(scored: Tuple[List[str], int]) -> None:
+        lines, errors = scored
+        output.writelines(lines)
+        summary['batches'] += 1
+        reported = summary['records'] // progress_every if progress_every else 0
+        summary['records'] += len(lines)
+        summary['errors'] += errors
+        if progress_every and summary['records'] // progress_every > reported:
+            rate = summary['records'] / (time.perf_counter() - start)
+            print(f"{summary['records']} records scored ({rate:,.0f}/s)", file=sys.stderr)
+    
+    if workers <= 1:
+        for batch in _batches(records, batch_size):
+            write(score_records(batch, top_k))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        # Leaving the block on an error (a closed output pipe included) terminates the workers
+        with ctx.Pool(workers, initializer=_init_bulk_worker, initargs=(predictor_kwargs,)) as pool:
+            pending: deque = deque()
+            for batch in _batches(records, batch_size):
+                pending.append(pool.apply_async(score_records, (batch, top_k)))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().get())
+            while pending:
+                write(pending.popleft().get())
+    
+    output.flush()
+    elapsed = time.perf_counter() - start
+    summary['elapsed_s'] = elapsed
+    summary['records_per_s'] = summary['records'] / elapsed if elapsed > 0 else 0.0
+    return summary
+
 def main():
     """Main function for command-line interface"""
     parser = argparse.ArgumentParser(description='Predict diseases based on symptoms')
     parser.add_argument('--model-dir', default='models', help='Directory containing model files')
     parser.add_argument('--symptoms', help='Comma-separated list of symptoms')
     parser.add_argument('--interactive', action='store_true', help='Run in interactive mode')
+    parser.add_argument('--engine', choices=('sklearn', 'compiled', 'mmap'), default='sklearn',
+                        help='Model engine (mmap shares the model pages across --workers)')
+    parser.add_argument('--input', help='Bulk mode: CSV or JSONL file of symptom records to score (- for stdin)')
+    parser.add_argument('--output', default='-', help='Bulk mode: JSONL results file (default stdout)')
+    parser.add_argument('--format', choices=('auto', 'csv', 'jsonl'), default='auto',
+                        help='Bulk mode: input format (auto picks by file extension)')
+    parser.add_argument('--column', default='symptoms',
+                        help='Bulk mode: field holding the comma-separated symptoms')
+    parser.add_argument('--batch-size', type=int, default=512, help='Bulk mode: records per model call')
+    parser.add_argument('--workers', type=int, default=DEFAULT_BULK_WORKERS,
+                        help=f'Bulk mode: scoring processes (default {DEFAULT_BULK_WORKERS})')
+    parser.add_argument('--top-k', type=int, default=3, help='Bulk mode: diseases reported per record')
+    parser.add_argument('--progress-every', type=int, default=100000,
+                        help='Bulk mode: report progress every N records (0 disables)')
     
     args = parser.parse_args()
     
+    if args.input:
+        predictor_kwargs = {'model_dir': args.model_dir, 'engine': args.engine}
+        output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        try:
+            summary = bulk_score(args.input, output, predictor_kwargs, fmt=args.format,
+                                 column=args.column, batch_size=args.batch_size,
+                                 workers=args.workers, top_k=args.top_k,
+                                 progress_every=args.progress_every)
+        except BrokenPipeError:
+            # The reader stopped early (e.g. `| head`): point stdout at devnull so the
+            # interpreter's final flush doesn't fail again, and exit without a traceback
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            sys.exit(1)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        # Summary goes to stderr so stdout stays pure JSONL
+        print(f"Scored {summary['records']} records ({summary['errors']} without recognised symptoms) "
+              f"in {summary['batches']} batches with {args.workers} worker(s): "
+              f"{summary['elapsed_s']:.2f} s, {summary['records_per_s']:,.0f} records/s",
+              file=sys.stderr)
+        return
+    
     # Initialize predictor
-    predictor = DiseasePredictor(model_dir=args.model_dir)
+    predictor = DiseasePredictor(model_dir=args.model_dir, engine=args.engine)
     
     if args.interactive:
         print("\nDisease Prediction System")
@@ -17,11 +17,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Assuming you have a unifiedAiResponseTemplate in your HTML
     const unifiedAiResponseTemplate = document.getElementById('unifiedAiResponseTemplate'); 
     
-    // Store all available symptoms for autocomplete
-    let availableSymptoms = [];
-    
-    // Fetch symptoms from backend when page loads
-    fetchSymptoms();
+    // In-flight autocomplete request, aborted when the user keeps typing
+    let suggestRequest = null;
     
     // Event listeners
     sendButton.addEventListener('click', handleSendMessage);
@@ -33,7 +30,7 @@ document.addEventListener('DOMContentLoaded', function() {
     clearChatButton.addEventListener('click', clearChat);
     symptomInput.addEventListener('input', handleSymptomInput);
     symptomInput.addEventListener('focus', function() {
-        if (symptomInput.value.trim() && availableSymptoms.length > 0) {
+        if (symptomInput.value.trim()) {
             showAutocompleteSuggestions();
         }
     });
@@ -360,30 +357,31 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     /**
-     * Fetch available symptoms for autocomplete
+     * Fetch suggestions for a partial symptom name from the server-side index
      */
-    function fetchSymptoms() {
-        fetch('/api/symptoms') //
-            .then(response => response.json()) //
-            .then(data => {
-                if (data.status === 'success' && data.symptoms) { //
-                    availableSymptoms = data.symptoms; //
-                }
-            })
-            .catch(error => {
-                console.error('Error fetching symptoms:', error); //
-            });
+    function fetchSuggestions(searchTerm) {
+        if (suggestRequest) {
+            suggestRequest.abort();
+        }
+        suggestRequest = new AbortController();
+        const url = '/api/symptoms/suggest?limit=7&q=' + encodeURIComponent(searchTerm);
+        return fetch(url, { signal: suggestRequest.signal })
+            .then(response => response.json())
+            .then(data => (data.status === 'success' && data.suggestions) ? data.suggestions : []);
     }
     
     /**
      * Handle symptom input for autocomplete
      */
     function handleSymptomInput() {
-        const input = symptomInput.value.trim(); //
-        if (input && availableSymptoms.length > 0) { //
-            showAutocompleteSuggestions(); //
+        const input = symptomInput.value.trim();
+        if (input) {
+            showAutocompleteSuggestions();
         } else {
-            autocompleteContainer.style.display = 'none'; //
+            if (suggestRequest) {
+                suggestRequest.abort();
+            }
+            autocompleteContainer.style.display = 'none';
         }
     }
     
@@ -391,26 +389,30 @@ document.addEventListener('DOMContentLoaded', function() {
      * Show autocomplete suggestions based on current input
      */
     function showAutocompleteSuggestions() {
-        const input = symptomInput.value; //
-        const lastCommaIndex = input.lastIndexOf(','); //
-        const searchTerm = lastCommaIndex !== -1 ?  //
-            input.substring(lastCommaIndex + 1).trim().toLowerCase() :  //
-            input.trim().toLowerCase(); //
+        const input = symptomInput.value;
+        const lastCommaIndex = input.lastIndexOf(',');
+        const searchTerm = lastCommaIndex !== -1 ?
+            input.substring(lastCommaIndex + 1).trim() :
+            input.trim();
         
-        if (!searchTerm) { //
-            autocompleteContainer.style.display = 'none'; //
-            return; //
+        if (!searchTerm) {
+            autocompleteContainer.style.display = 'none';
+            return;
         }
         
-        const filteredSymptoms = availableSymptoms.filter(symptom =>  //
-            symptom.toLowerCase().includes(searchTerm) //
-        ).slice(0, 7); //
-        
-        if (filteredSymptoms.length > 0) { //
-            displayAutocompleteSuggestions(filteredSymptoms, searchTerm, lastCommaIndex); //
-        } else {
-            autocompleteContainer.style.display = 'none'; //
-        }
+        fetchSuggestions(searchTerm)
+            .then(suggestions => {
+                if (suggestions.length > 0) {
+                    displayAutocompleteSuggestions(suggestions, searchTerm, lastCommaIndex);
+                } else {
+                    autocompleteContainer.style.display = 'none';
+                }
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Error fetching symptom suggestions:', error);
+                }
+            });
     }
     
     /**
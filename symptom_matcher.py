@@ -0,0 +1,230 @@
+import heapq
+import re
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from prediction_cache import LRUCache
+
+
+def normalize_symptom(text: str) -> str:
+    """Canonical form used for matching: lowercase, underscores as spaces, single spaces"""
+    return re.sub(r'[\s_]+', ' ', text.lower()).strip()
+
+
+class SymptomMatcher:
+    """
+    Fuzzy matcher mapping free-text symptoms to known symptom names
+
+    Character counts of the normalized symptom names are indexed once as a
+    matrix, from which difflib's quick_ratio (an upper bound of its ratio) is
+    computed for every name in one vectorized step. Lookups then compute the
+    exact ratio for names in descending order of that bound and stop as soon as
+    the bound falls below the scores already found, which usually happens after
+    a handful of names.
+
+    Results are therefore exactly those of difflib.get_close_matches over the
+    normalized names, ties included (equal scores go to the name sorting last).
+    """
+    def __init__(self,
+                 symptoms: Iterable[str],
+                 match_cutoff: float = 0.6,
+                 suggestion_cutoff: float = 0.4,
+                 max_suggestions: int = 3):
+        """
+        Build the matcher indexes
+
+        Args:
+            symptoms: Known symptom names as used by the model
+            match_cutoff: Minimum similarity for a token to count as a match
+            suggestion_cutoff: Minimum similarity for a name to be suggested
+            max_suggestions: Number of suggestions returned for unmatched tokens
+        """
+        self.match_cutoff = match_cutoff
+        self.suggestion_cutoff = suggestion_cutoff
+        self.max_suggestions = max_suggestions
+
+        # Normalized name -> original symptom (first one wins on collisions)
+        self.exact: Dict[str, str] = {}
+        for sym in symptoms:
+            self.exact.setdefault(normalize_symptom(sym), sym)
+        self.names: List[str] = list(self.exact)
+
+        # Per-name character counts over the names' alphabet, plus name lengths
+        self.char_column: Dict[str, int] = {c: i for i, c in enumerate(sorted(set(''.join(self.names))))}
+        self.char_counts = np.zeros((len(self.names), len(self.char_column)), dtype=np.int32)
+        for idx, name in enumerate(self.names):
+            for char in name:
+                self.char_counts[idx, self.char_column[char]] += 1
+        self.name_lengths = np.array([len(name) for name in self.names], dtype=np.int32)
+
+    def _quick_ratios(self, query: str) -> np.ndarray:
+        """difflib's quick_ratio of the query against every name"""
+        counts = np.zeros(len(self.char_column), dtype=np.int32)
+        for char in query:
+            column = self.char_column.get(char)
+            if column is not None:
+                counts[column] += 1
+        common = np.minimum(self.char_counts, counts).sum(axis=1)
+        return 2.0 * common / (self.name_lengths + len(query))
+
+    def lookup(self, symptom: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Match a single free-text symptom
+
+        Returns:
+            Tuple of (best_match, suggestions). best_match is None when nothing
+            clears match_cutoff, in which case suggestions holds up to
+            max_suggestions names clearing suggestion_cutoff, best first.
+        """
+        query = normalize_symptom(symptom)
+        if not query:
+            return None, []
+
+        # Exact match
+        if query in self.exact:
+            return self.exact[query], []
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        bounds = self._quick_ratios(query)
+        order = np.argsort(-bounds, kind='stable')
+        ratios: Dict[int, float] = {}  # shared by both passes so no ratio is computed twice
+
+        best = self._top_scores(matcher, order, bounds, 1, ratios)
+        if best and best[0][0] >= self.match_cutoff:
+            return self.exact[best[0][1]], []
+        # Unmatched tokens only: widen to the suggestions
+        scored = self._top_scores(matcher, order, bounds, self.max_suggestions, ratios)
+        return None, [self.exact[name] for _, name in scored]
+
+    def _top_scores(self, matcher: SequenceMatcher, order: np.ndarray, bounds: np.ndarray,
+                    n: int, ratios: Dict[int, float]) -> List[Tuple[float, str]]:
+        """
+        (ratio, name) of the n best names clearing suggestion_cutoff, best first
+
+        Ties are ordered by name descending, as get_close_matches does.
+        """
+        if n <= 0:
+            return []
+        top: List[Tuple[float, str]] = []  # min-heap of the n best so far
+        cutoff = self.suggestion_cutoff
+        for idx in order:
+            if bounds[idx] < cutoff:
+                break  # no remaining name can score high enough
+            score = ratios.get(idx)
+            if score is None:
+                matcher.set_seq1(self.names[idx])
+                score = ratios[idx] = matcher.ratio()
+            if score >= cutoff:
+                item = (score, self.names[idx])
+                if len(top) < n:
+                    heapq.heappush(top, item)
+                else:
+                    heapq.heappushpop(top, item)
+                if len(top) == n:
+                    cutoff = max(cutoff, top[0][0])
+        return sorted(top, reverse=True)
+
+    def match(self, symptom: str) -> Optional[str]:
+        """Best matching known symptom, or None"""
+        return self.lookup(symptom)[0]
+
+
+class SymptomPrefixIndex:
+    """
+    Autocomplete index over symptom names
+
+    Every normalized name is stored twice in sorted key arrays: once whole and
+    once per word start ("skin rash" is also found under "rash"). A query is
+    normalized the same way, so underscores and spaces are interchangeable, and
+    its matches are the contiguous key range found with two binary searches.
+    """
+    def __init__(self, symptoms: Iterable[str], scores: Optional[Dict[str, Dict[str, float]]] = None,
+                 cache_size: int = 4096):
+        """
+        Args:
+            symptoms: Known symptom names as used by the model
+            scores: Optional rankings, e.g. {'importance': {symptom: value}}; higher ranks first
+            cache_size: Maximum cached (query, limit, rank) results (0 disables)
+        """
+        self.symptoms: List[str] = []
+        seen = set()
+        for sym in symptoms:
+            name = normalize_symptom(sym)
+            if name and name not in seen:
+                seen.add(name)
+                self.symptoms.append(sym)
+        names = [normalize_symptom(sym) for sym in self.symptoms]
+
+        # Whole names and word starts, each sorted as (key, symptom id)
+        full = sorted((name, idx) for idx, name in enumerate(names))
+        words = sorted(
+            (name[pos + 1:], idx)
+            for idx, name in enumerate(names)
+            for pos, char in enumerate(name) if char == ' '
+        )
+        self._full_keys = [key for key, _ in full]
+        self._full_ids = [idx for _, idx in full]
+        self._word_keys = [key for key, _ in words]
+        self._word_ids = [idx for _, idx in words]
+
+        self.rankings = ('name',) + tuple(scores or ())
+        self._scores = {
+            rank: [float(values.get(sym) or 0.0) for sym in self.symptoms]
+            for rank, values in (scores or {}).items()
+        }
+        self._cache = LRUCache(cache_size)
+
+    @staticmethod
+    def _range(keys: List[str], prefix: str) -> Tuple[int, int]:
+        # Every key starting with prefix sorts between prefix and prefix + U+10FFFF
+        return bisect_left(keys, prefix), bisect_right(keys, prefix + '\U0010ffff')
+
+    def suggest(self, query: str, limit: int = 7, rank: str = 'name') -> List[str]:
+        """
+        Symptoms whose name, or one of its words, starts with query
+
+        Args:
+            query: Text typed so far (case, underscores and extra spaces are ignored)
+            limit: Maximum number of symptoms returned
+            rank: 'name' puts whole-name matches before word matches, alphabetically;
+                any key of the scores given at construction orders by that score
+
+        Returns:
+            Original symptom names, best first
+        """
+        if rank not in self.rankings:
+            raise ValueError(f"Unknown rank '{rank}', expected one of {self.rankings}")
+        prefix = normalize_symptom(query)
+        if not prefix or limit <= 0:
+            return []
+
+        key = (prefix, limit, rank)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        start, stop = self._range(self._full_keys, prefix)
+        word_start, word_stop = self._range(self._word_keys, prefix)
+        if rank == 'name':
+            # Keys are already in name order, so only the first limit distinct ids are read
+            ids: List[int] = []
+            seen = set()
+            for idx in chain(self._full_ids[start:stop], self._word_ids[word_start:word_stop]):
+                if idx not in seen:
+                    seen.add(idx)
+                    ids.append(idx)
+                    if len(ids) == limit:
+                        break
+        else:
+            scores = self._scores[rank]
+            candidates = set(self._full_ids[start:stop]).union(self._word_ids[word_start:word_stop])
+            ids = heapq.nsmallest(limit, candidates, key=lambda i: (-scores[i], self.symptoms[i]))
+
+        result = tuple(self.symptoms[idx] for idx in ids)
+        self._cache.put(key, result)
+        return list(result)
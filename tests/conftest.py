@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, ROOT)
+
+DATASET = os.path.join(ROOT, 'dataset', 'dataset.csv')
+REFERENCE_DATA = {
+    'symptom_desc_path': os.path.join(ROOT, 'dataset', 'symptom_description.csv'),
+    'symptom_prec_path': os.path.join(ROOT, 'dataset', 'symptom_precaution.csv'),
+    'symptom_sev_path': os.path.join(ROOT, 'dataset', 'symptom_severity.csv'),
+}
+
+
+@pytest.fixture(scope='session')
+def training_data():
+    """One-hot features, labels and vocabulary of dataset.csv"""
+    from train_model import encode_symptoms, load_dataset
+    df, symptom_cols = load_dataset(DATASET)
+    X, symptoms, _, _ = encode_symptoms(df, symptom_cols)
+    return X, df['Disease'], symptoms
+
+
+@pytest.fixture(scope='session')
+def model_dir(tmp_path_factory, training_data):
+    """Model directory with every artifact of a small forest trained on dataset.csv"""
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from forest_engine import export_forest, save_compiled_forest
+    from model_bundle import write_bundle
+
+    X, y, symptoms = training_data
+    path = str(tmp_path_factory.mktemp('models'))
+    model = RandomForestClassifier(n_estimators=20, class_weight='balanced_subsample', random_state=42)
+    model.fit(X, y)
+    importance = pd.Series(model.feature_importances_, index=X.columns).sort_values(ascending=False)
+
+    joblib.dump(model, os.path.join(path, 'disease_rf_model.joblib'))
+    joblib.dump(symptoms, os.path.join(path, 'symptom_list.joblib'))
+    joblib.dump(importance, os.path.join(path, 'feature_importance.joblib'))
+    save_compiled_forest(model, path)
+    write_bundle(path, export_forest(model), symptoms, importance.to_dict(),
+                 metadata={'best_params': {'n_estimators': 20}})
+    return path
+
+
+@pytest.fixture(scope='session')
+def predictor_factory(model_dir):
+    """Build a DiseasePredictor on the test model, with keyword overrides"""
+    from predict_disease import DiseasePredictor
+
+    def make(**kwargs):
+        options = dict(REFERENCE_DATA, model_dir=model_dir)
+        options.update(kwargs)
+        return DiseasePredictor(**options)
+    return make
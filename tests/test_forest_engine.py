@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import (COMPILED_MODEL_FILE, CompiledForest, align_forest, export_forest,
+                           merge_forests, sklearn_proba, verify_compiled_forest)
+from model_bundle import open_bundle
+
+
+@pytest.fixture(scope='module')
+def model(model_dir):
+    import joblib
+    return joblib.load(f'{model_dir}/disease_rf_model.joblib')
+
+
+def random_rows(n_features, n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n, n_features)) < 0.05).astype(np.float32)
+
+
+def test_compiled_forest_matches_sklearn(model, training_data):
+    compiled = CompiledForest(export_forest(model))
+    for X in (training_data[0].to_numpy(dtype=np.float32), random_rows(model.n_features_in_)):
+        np.testing.assert_allclose(compiled.predict_proba(X), sklearn_proba(model, X), atol=1e-6)
+        assert verify_compiled_forest(model, compiled, X) <= 1e-6
+
+
+def test_saved_and_bundled_forests_match_sklearn(model, model_dir):
+    X = random_rows(model.n_features_in_, seed=1)
+    expected = sklearn_proba(model, X)
+    saved = CompiledForest.load(f'{model_dir}/{COMPILED_MODEL_FILE}')
+    bundled = CompiledForest(open_bundle(model_dir).forest_arrays())
+    np.testing.assert_allclose(saved.predict_proba(X), expected, atol=1e-6)
+    np.testing.assert_allclose(bundled.predict_proba(X), expected, atol=1e-6)
+
+
+def test_small_chunks_give_the_same_probabilities(model):
+    X = random_rows(model.n_features_in_, n=50, seed=2)
+    whole = CompiledForest(export_forest(model)).predict_proba(X)
+    chunked = CompiledForest(export_forest(model), chunk_size=7).predict_proba(X)
+    np.testing.assert_array_equal(whole, chunked)
+
+
+def test_wrong_feature_count_is_rejected(model):
+    with pytest.raises(ValueError):
+        CompiledForest(export_forest(model)).predict_proba(np.zeros((1, 3)))
+
+
+def test_merged_forests_match_jointly_trained_trees(training_data):
+    X, y, _ = training_data
+    forest = RandomForestClassifier(n_estimators=6, max_depth=5, random_state=0).fit(X, y)
+    first, second = RandomForestClassifier(), RandomForestClassifier()
+    for part, trees in ((first, forest.estimators_[:2]), (second, forest.estimators_[2:])):
+        part.estimators_, part.classes_, part.n_features_in_ = trees, forest.classes_, forest.n_features_in_
+
+    Xr = random_rows(forest.n_features_in_, seed=3)
+    expected = sklearn_proba(forest, Xr)
+    merged = CompiledForest(merge_forests(export_forest(first), export_forest(second)))
+    np.testing.assert_allclose(merged.predict_proba(Xr), expected, atol=1e-6)
+
+    # Vote shares equal to the tree-count shares change nothing
+    weighted = CompiledForest(merge_forests(export_forest(first), export_forest(second), shares=[2 / 6, 4 / 6]))
+    np.testing.assert_allclose(weighted.predict_proba(Xr), expected, atol=1e-6)
+
+
+def test_aligned_forest_scatters_classes_and_widens_features(model):
+    arrays = export_forest(model)
+    classes = ['AAA new disease'] + [str(c) for c in arrays['classes']]
+    aligned = CompiledForest(align_forest(arrays, classes, model.n_features_in_ + 2))
+    X = random_rows(model.n_features_in_, n=20, seed=4)
+    probas = aligned.predict_proba(np.hstack([X, np.ones((20, 2), dtype=np.float32)]))
+    assert (probas[:, 0] == 0).all()
+    np.testing.assert_allclose(probas[:, 1:], sklearn_proba(model, X), atol=1e-6)
@@ -0,0 +1,66 @@
+import gzip
+import re
+
+import pytest
+
+import app as app_module
+import http_caching
+
+
+@pytest.fixture
+def client(model_dir, monkeypatch):
+    # Keep these tests on gzip whether or not brotli is installed
+    monkeypatch.setattr(http_caching, 'brotli', None)
+    return app_module.create_app(model_dir).test_client()
+
+
+def test_symptom_list_revalidates_with_the_model_version(client):
+    first = client.get('/api/symptoms')
+    assert first.status_code == 200
+    assert 'no-cache' in first.headers['Cache-Control']
+    etag = first.headers['ETag']
+
+    cached = client.get('/api/symptoms', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+    since = client.get('/api/symptoms', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert since.status_code == 304
+    assert client.get('/api/symptoms', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_large_json_is_gzipped_for_clients_that_accept_it(client):
+    plain = client.get('/api/symptoms')
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    compressed = client.get('/api/symptoms', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == plain.data
+    assert len(compressed.data) < len(plain.data)
+    # Every encoding revalidates against the same (weak) validator
+    assert compressed.headers['ETag'] == 'W/' + plain.headers['ETag']
+    revalidated = client.get('/api/symptoms', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_small_bodies_are_not_compressed(client):
+    response = client.get('/api/symptoms/suggest?q=itch', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert len(response.data) < app_module.COMPRESS_MIN_SIZE
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_static_urls_are_fingerprinted_and_cached_for_a_year(client):
+    page = client.get('/')
+    assert page.status_code == 200
+    assert client.get('/', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+
+    url = re.search(r'href="(/static/css/style\.css\?v=[0-9a-f]{12})"', page.get_data(as_text=True)).group(1)
+    asset = client.get(url)
+    assert asset.status_code == 200
+    cache_control = asset.headers['Cache-Control']
+    assert 'immutable' in cache_control and f'max-age={http_caching.STATIC_MAX_AGE}' in cache_control
+    assert 'no-cache' in client.get('/static/css/style.css').headers['Cache-Control']
@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+from inference_pool import BatchingExecutor, InferenceTimeout, Overloaded
+
+
+class FakePredictor:
+    """predict_and_info_batch stand-in that records its batches and can be held"""
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+        self.entered = threading.Event()
+
+    def predict_and_info_batch(self, inputs):
+        self.entered.set()
+        self.release.wait(5)
+        self.batches.append(list(inputs))
+        if 'boom' in inputs:
+            raise ValueError('boom')
+        return [{'input': text} for text in inputs]
+
+
+@pytest.fixture
+def predictor():
+    return FakePredictor()
+
+
+def hold(predictor, pool):
+    """Occupy the only worker with a job blocked inside the model call"""
+    predictor.release.clear()
+    predictor.entered.clear()
+    future = pool.submit(['held'])
+    assert predictor.entered.wait(5)
+    return future
+
+
+def test_results_are_split_back_per_request(predictor):
+    pool = BatchingExecutor(lambda: predictor, workers=1)
+    assert pool.predict('a') == {'input': 'a'}
+    assert pool.predict_many(['b', 'c']) == [{'input': 'b'}, {'input': 'c'}]
+
+
+def test_queued_requests_are_coalesced_into_one_call(predictor):
+    pool = BatchingExecutor(lambda: predictor, workers=1, max_batch=64, batch_window=0.05)
+    held = hold(predictor, pool)
+    futures = [pool.submit([f'x{i}']) for i in range(5)]
+    predictor.release.set()
+
+    assert held.result(5)[0] == [{'input': 'held'}]
+    assert [f.result(5)[0] for f in futures] == [[{'input': f'x{i}'}] for i in range(5)]
+    assert predictor.batches[1] == [f'x{i}' for i in range(5)]
+    assert pool.stats()['batches'] == 2
+
+
+def test_full_queue_sheds_load(predictor):
+    pool = BatchingExecutor(lambda: predictor, workers=1, max_queue=2, batch_window=0)
+    held = hold(predictor, pool)
+    queued = [pool.submit(['q1']), pool.submit(['q2'])]
+    with pytest.raises(Overloaded):
+        pool.submit(['shed'])
+    assert pool.stats()['rejected'] == 1
+
+    predictor.release.set()
+    assert held.result(5)[0] and all(f.result(5)[0] for f in queued)
+
+
+def test_late_result_times_out_and_queued_job_is_dropped(predictor):
+    pool = BatchingExecutor(lambda: predictor, workers=1, batch_window=0)
+    held = hold(predictor, pool)
+    with pytest.raises(InferenceTimeout):
+        pool.predict('late', timeout=0.05)
+    assert pool.stats()['timeouts'] == 1
+
+    predictor.release.set()
+    held.result(5)
+    assert pool.predict('next') == {'input': 'next'}
+    # The timed-out job was cancelled before a worker picked it up
+    assert ['late'] not in predictor.batches
+
+
+def test_model_errors_reach_every_request_of_the_batch(predictor):
+    pool = BatchingExecutor(lambda: predictor, workers=1)
+    with pytest.raises(ValueError, match='boom'):
+        pool.predict_many(['ok', 'boom'])
+
+
+def test_missing_model_fails_the_request():
+    pool = BatchingExecutor(lambda: None, workers=1)
+    with pytest.raises(RuntimeError, match='Model not loaded'):
+        pool.predict('a')
+
+
+@pytest.fixture
+def client(monkeypatch, model_dir):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'INFERENCE_WORKERS', 1)
+    application = app_module.create_app(model_dir)
+    return application, application.test_client()
+
+
+@pytest.mark.parametrize('error, message', [
+    (Overloaded('full'), 'Server busy'),
+    (InferenceTimeout('late'), 'Prediction timed out'),
+])
+def test_shed_and_timed_out_requests_get_503(client, monkeypatch, error, message):
+    application, test_client = client
+    pool = application.extensions['inference_pool']
+
+    def fail(*args, **kwargs):
+        raise error
+    monkeypatch.setattr(pool, 'predict', fail)
+    monkeypatch.setattr(pool, 'predict_many', fail)
+
+    response = test_client.post('/api/predict', json={'symptoms': 'itching'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert message in response.get_json()['error']
+    assert test_client.post('/api/predict/batch', json=['itching']).status_code == 503
+
+
+def test_pool_serves_the_prediction_routes(client):
+    _, test_client = client
+    response = test_client.post('/api/predict', json={'symptoms': 'itching, skin rash'})
+    assert response.status_code == 200
+    assert response.get_json()['raw_results']['matched_symptoms'] == ['itching', 'skin_rash']
+
+
+def test_server_timing_includes_the_pool_stages(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'SERVER_TIMING', True)
+    _, test_client = client
+    response = test_client.post('/api/predict', json={'symptoms': 'itching, skin rash'})
+    stages = {entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')}
+    assert {'parse', 'model', 'format', 'total'} <= stages
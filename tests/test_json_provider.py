@@ -0,0 +1,40 @@
+import decimal
+import json
+
+import numpy as np
+import pytest
+
+import app as app_module
+
+orjson = pytest.importorskip('orjson')
+
+
+@pytest.fixture
+def application(model_dir):
+    return app_module.create_app(model_dir)
+
+
+def test_orjson_keeps_insertion_order_and_serializes_numpy(application):
+    assert isinstance(application.json, app_module.OrjsonProvider)
+    payload = {'zeta': np.float32(0.5), 'alpha': np.arange(3), 'mid': {'b': np.int64(2), 'a': 1}}
+    text = application.json.dumps(payload)
+    # Unlike Flask's stdlib provider, keys are not sorted
+    assert list(json.loads(text)) == ['zeta', 'alpha', 'mid']
+    assert json.loads(text) == {'zeta': 0.5, 'alpha': [0, 1, 2], 'mid': {'b': 2, 'a': 1}}
+
+
+def test_types_orjson_rejects_fall_back_to_the_stdlib_provider(application):
+    assert json.loads(application.json.dumps({'price': decimal.Decimal('1.5')})) == {'price': '1.5'}
+
+
+def test_prediction_response_matches_the_stdlib_provider(application, monkeypatch):
+    client = application.test_client()
+    body = {'symptoms': 'itching, skin rash, nodal skin eruptions'}
+    fast = client.post('/api/predict', json=body)
+    assert fast.status_code == 200
+
+    monkeypatch.setattr(app_module, 'orjson', None)
+    stdlib = app_module.create_app(application.config['MODEL_DIR']).test_client().post('/api/predict', json=body)
+    assert json.loads(fast.data) == json.loads(stdlib.data)
+    # Same document, only the key order differs
+    assert list(json.loads(stdlib.data)) == sorted(json.loads(stdlib.data))
@@ -0,0 +1,83 @@
+import os
+
+import metrics
+from metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def make_registry(directory):
+    registry = MetricsRegistry(str(directory))
+    requests = registry.register(Counter('requests_total', 'Requests', ('outcome',)))
+    queued = registry.register(Gauge('queued', 'Queued jobs'))
+    latency = registry.register(Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+    return registry, requests, queued, latency
+
+
+def write_as(registry, monkeypatch, pid):
+    monkeypatch.setattr(metrics.os, 'getpid', lambda: pid)
+    registry.write_snapshot()
+    monkeypatch.undo()
+
+
+def test_render_merges_every_process(tmp_path, monkeypatch):
+    registry, requests, queued, latency = make_registry(tmp_path)
+    requests.inc(2, outcome='success')
+    queued.set(3)
+    latency.observe(0.05)
+    write_as(registry, monkeypatch, 101)
+
+    registry.reset()
+    requests.inc(outcome='success')
+    requests.inc(outcome='error')
+    queued.set(1)
+    latency.observe(0.5)
+    text = registry.render()
+
+    assert 'requests_total{outcome="success"} 3' in text
+    assert 'requests_total{outcome="error"} 1' in text
+    assert 'queued{pid="101"} 3' in text
+    assert f'queued{{pid="{os.getpid()}"}} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_count 2' in text
+
+
+def test_exited_process_keeps_its_counters_but_not_its_gauges(tmp_path, monkeypatch):
+    registry, requests, queued, _ = make_registry(tmp_path)
+    requests.inc(5, outcome='success')
+    queued.set(7)
+    write_as(registry, monkeypatch, 202)
+    registry.mark_process_dead(202)
+
+    registry.reset()
+    text = registry.render()
+    assert 'requests_total{outcome="success"} 5' in text
+    assert 'pid="202"' not in text
+
+
+def test_collectors_run_before_each_snapshot(tmp_path):
+    registry, _, queued, _ = make_registry(tmp_path)
+    registry.set_collector('test', lambda: queued.set(42))
+    assert f'queued{{pid="{os.getpid()}"}} 42' in registry.render()
+
+    local = MetricsRegistry()
+    local.register(queued)
+    local.set_collector('test', lambda: queued.set(43))
+    assert 'queued 43' in local.render()
+
+
+def test_borrowed_timings_are_reported_but_not_observed_again():
+    metrics.begin_timing()
+    with metrics.stage('format'):
+        pass
+    metrics.add_timings({'model': 0.25, 'parse': 0.5})
+
+    def counts():
+        return {key[0]: count for key, _, _, count in metrics.STAGE_SECONDS.snapshot()}
+    before = counts()
+    timings = metrics.finish_timing()
+
+    assert set(timings) == {'format', 'model', 'parse'}
+    assert timings['model'] == 0.25
+    after = counts()
+    assert after['format'] == before.get('format', 0) + 1
+    assert after.get('model') == before.get('model')
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='module')
+def predictor(predictor_factory):
+    return predictor_factory(cache_size=0)
+
+
+def legacy_features(predictor, symptoms):
+    """Feature row as built before the symptom index: one DataFrame column per known symptom"""
+    return pd.DataFrame([{f'has_{sym}': int(sym in symptoms) for sym in predictor.symptom_list}])
+
+
+SYMPTOM_SETS = [
+    ['itching', 'skin_rash', 'nodal_skin_eruptions'],
+    ['high_fever', 'headache', 'nausea', 'vomiting'],
+    ['dischromic _patches'],
+    ['cough', 'cough', 'unknown_symptom'],
+]
+
+
+@pytest.mark.parametrize('symptoms', SYMPTOM_SETS)
+def test_encode_matches_legacy_features(predictor, symptoms):
+    row = predictor.encode(symptoms).copy()
+    predictor.encode(symptoms)[:] = 0
+    np.testing.assert_array_equal(row[0], legacy_features(predictor, symptoms).to_numpy()[0])
+
+
+@pytest.mark.parametrize('symptoms', SYMPTOM_SETS)
+def test_predict_matches_legacy_dataframe_path(predictor, symptoms):
+    disease, probas = predictor.predict(symptoms)
+    # The predictor drops the model's feature names at load time, so pass the values
+    X = legacy_features(predictor, symptoms).to_numpy(dtype=np.float32)
+    expected = predictor.model.predict_proba(X)[0]
+    np.testing.assert_allclose(probas, expected)
+    assert disease == predictor.model.classes_[np.argmax(expected)]
+
+
+def test_predict_leaves_the_row_buffer_clean(predictor):
+    predictor.predict(['itching', 'skin_rash'])
+    assert not predictor.encode([]).any()
+
+
+def test_encode_batch_matches_single_rows(predictor):
+    X = predictor.encode_batch(SYMPTOM_SETS)
+    for i, symptoms in enumerate(SYMPTOM_SETS):
+        np.testing.assert_array_equal(X[i], legacy_features(predictor, symptoms).to_numpy()[0])
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from prediction_cache import LRUCache
+
+SYMPTOMS = 'itching, skin rash, nodal skin eruptions'
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now[0])
+    cache = LRUCache(maxsize=4, ttl=10)
+    cache.put('a', 1)
+    now[0] += 9
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_zero_size_disables_caching():
+    cache = LRUCache(maxsize=0)
+    cache.put('a', 1)
+    assert cache.get('a') is None and len(cache) == 0
+
+
+def test_repeated_input_is_served_from_the_caches(predictor_factory):
+    predictor = predictor_factory()
+    first = predictor.predict_and_info(SYMPTOMS)
+    # Same symptom set in another order and spelling: parse misses, prediction hits
+    second = predictor.predict_and_info('nodal_skin_eruptions,itching ,Skin Rash')
+    third = predictor.predict_and_info(SYMPTOMS)
+    assert first == third
+    assert second['top_prediction'] == first['top_prediction']
+    stats = predictor.cache_stats()
+    assert stats['parse_cache']['hits'] == 1
+    assert stats['prediction_cache']['hits'] == 2
+    assert stats['prediction_cache']['misses'] == 1
+
+
+def test_batch_and_single_predictions_share_the_cache(predictor_factory):
+    predictor = predictor_factory()
+    single = predictor.predict_and_info(SYMPTOMS)
+    batch = predictor.predict_and_info_batch([SYMPTOMS, 'not a symptom'])
+    assert batch[0] == single
+    assert 'error' in batch[1]
+    assert predictor.cache_stats()['prediction_cache']['hits'] == 1
+
+
+@pytest.fixture
+def two_bundles(tmp_path, training_data):
+    """Model directory with two bundle versions of differently seeded forests"""
+    from sklearn.ensemble import RandomForestClassifier
+    from forest_engine import export_forest
+    from model_bundle import write_bundle
+
+    X, y, symptoms = training_data
+    for version, seed in (('v1', 1), ('v2', 2)):
+        model = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=seed).fit(X, y)
+        write_bundle(str(tmp_path), export_forest(model), symptoms, version=version)
+    return str(tmp_path)
+
+
+def test_shared_caches_never_serve_another_model_version(predictor_factory, two_bundles):
+    parse_cache, prediction_cache = LRUCache(), LRUCache()
+    predictors = [
+        predictor_factory(model_dir=two_bundles, engine='mmap', bundle_version=version,
+                          parse_cache=parse_cache, prediction_cache=prediction_cache)
+        for version in ('v1', 'v2')
+    ]
+    old, new = (p.predict_and_info(SYMPTOMS) for p in predictors)
+    assert old != new
+
+    assert prediction_cache.stats()['hits'] == 0
+    assert parse_cache.stats()['hits'] == 0
+    _, expected = predictors[1].predict(predictors[1].parse_symptoms(SYMPTOMS)[0])
+    assert new['top_prediction']['probability'] == pytest.approx(float(np.max(expected)))
+    # Both versions stay cached side by side
+    assert predictors[0].predict_and_info(SYMPTOMS) == old
+    assert prediction_cache.stats()['hits'] == 1
@@ -0,0 +1,72 @@
+import difflib
+import random
+
+import pytest
+
+from symptom_matcher import SymptomMatcher, SymptomPrefixIndex, normalize_symptom
+
+
+@pytest.fixture(scope='module')
+def symptoms(training_data):
+    return list(training_data[2])
+
+
+@pytest.fixture(scope='module')
+def matcher(symptoms):
+    return SymptomMatcher(symptoms)
+
+
+def difflib_lookup(symptoms, text):
+    """Match and suggestions as the predictor computed them with get_close_matches"""
+    names = {normalize_symptom(s): s for s in reversed(symptoms)}
+    query = normalize_symptom(text)
+    if query in names:
+        return names[query], []
+    match = difflib.get_close_matches(query, list(names), n=1, cutoff=0.6)
+    if match:
+        return names[match[0]], []
+    return None, [names[m] for m in difflib.get_close_matches(query, list(names), n=3, cutoff=0.4)]
+
+
+def probes(symptoms):
+    """Typos, truncations and single words of every symptom, plus free-text phrases"""
+    rng = random.Random(0)
+    texts = {'fever', 'pain', 'tired', 'dizzy', 'sore throat', 'stomach ache', 'runny nose', 'fatige'}
+    for sym in symptoms:
+        name = sym.replace('_', ' ')
+        cut = rng.randrange(len(name))
+        texts.update([name[:-1], name[1:], name[:cut] + name[cut + 1:]])
+        texts.update(name.split())
+    return sorted(t for t in texts if t.strip())
+
+
+def test_lookup_matches_difflib(symptoms, matcher):
+    mismatches = [(text, matcher.lookup(text), difflib_lookup(symptoms, text))
+                  for text in probes(symptoms)
+                  if matcher.lookup(text) != difflib_lookup(symptoms, text)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize('text, expected', [
+    # Equal scores go to the name sorting last, as in get_close_matches
+    ('fever', 'mild_fever'),
+    ('pain', 'neck_pain'),
+    ('Skin Rash', 'skin_rash'),
+    ('dischromic patches', 'dischromic _patches'),
+    ('itchng', 'itching'),
+])
+def test_match(matcher, text, expected):
+    assert matcher.match(text) == expected
+
+
+def test_unmatched_token_gets_suggestions(matcher):
+    match, suggestions = matcher.lookup('tired')
+    assert match is None
+    assert suggestions[0] == 'fatigue'
+
+
+def test_prefix_index_matches_word_starts_and_ignores_separators(symptoms):
+    index = SymptomPrefixIndex(symptoms)
+    assert index.suggest('skin_r') == ['skin_rash']
+    assert 'skin_rash' in index.suggest('rash', limit=20)
+    assert index.suggest('') == []
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import joblib
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from conftest import DATASET
+from forest_engine import CompiledForest, export_forest, save_compiled_forest
+from model_bundle import latest_version, open_bundle, write_bundle
+from train_model import encode_symptoms, load_dataset, save_model_artifacts
+from update_model import update_model
+
+NEW_DISEASE = 'Malaria'
+
+
+@pytest.fixture(scope='module')
+def datasets(tmp_path_factory):
+    """dataset.csv split into the original records and new records of a disease the model lacks"""
+    path = tmp_path_factory.mktemp('update_data')
+    raw = pd.read_csv(DATASET)
+    is_new = raw['Disease'].str.strip() == NEW_DISEASE
+    raw[~is_new].to_csv(path / 'base.csv', index=False)
+    raw[is_new].to_csv(path / 'new.csv', index=False)
+    return str(path / 'base.csv'), str(path / 'new.csv')
+
+
+@pytest.fixture(scope='module')
+def base_model_dir(tmp_path_factory, datasets):
+    path = str(tmp_path_factory.mktemp('base_model'))
+    df, symptom_cols = load_dataset(datasets[0])
+    X, symptoms, _, _ = encode_symptoms(df, symptom_cols)
+    model = RandomForestClassifier(n_estimators=30, class_weight='balanced_subsample', random_state=0)
+    model.fit(X, df['Disease'])
+    importance = pd.Series(model.feature_importances_, index=X.columns)
+    save_model_artifacts(path, model, symptoms, importance)
+    save_compiled_forest(model, path)
+    write_bundle(path, export_forest(model), symptoms, importance.to_dict(),
+                 metadata={'best_params': {'n_estimators': 30}})
+    return path
+
+
+@pytest.fixture
+def model_copy(tmp_path, base_model_dir):
+    path = str(tmp_path / 'models')
+    shutil.copytree(base_model_dir, path)
+    return path
+
+
+def test_add_trees_learns_new_disease_and_keeps_old_accuracy(model_copy, datasets):
+    base, new = datasets
+    result = update_model(new, model_dir=model_copy, base_dataset=base, random_state=1)
+
+    assert result['new_diseases'] == [NEW_DISEASE]
+    assert result['old_data_accuracy_after'] >= result['old_data_accuracy_before']
+    assert result['holdout_accuracy'] == 1.0
+    assert result['new_data_accuracy_after'] > result['new_data_accuracy_before']
+    assert os.path.basename(result['bundle_path']) == latest_version(model_copy)
+
+    bundle = open_bundle(model_copy)
+    assert NEW_DISEASE in bundle.manifest['classes']
+    # The searched tree count is kept, not the grown forest's
+    assert bundle.manifest['metadata']['best_params']['n_estimators'] == 30
+    assert CompiledForest(bundle.forest_arrays()).n_estimators == 80
+
+
+def test_update_lowering_old_accuracy_is_refused(model_copy, datasets):
+    base, new = datasets
+    before = latest_version(model_copy)
+    with pytest.raises(RuntimeError, match='refused'):
+        update_model(new, model_dir=model_copy, base_dataset=base, new_share=0.95, random_state=1)
+    assert latest_version(model_copy) == before
+
+
+def test_add_trees_needs_the_mmap_engine(model_copy, datasets):
+    base, new = datasets
+    with pytest.raises(ValueError, match='mmap'):
+        update_model(new, model_dir=model_copy, base_dataset=base, engine='sklearn')
+
+
+def test_refit_rewrites_the_artifacts_of_every_engine(model_copy, datasets):
+    base, new = datasets
+    result = update_model(new, model_dir=model_copy, mode='refit', base_dataset=base,
+                          engine='sklearn', random_state=1)
+    assert result['old_data_accuracy_after'] >= result['old_data_accuracy_before']
+
+    model = joblib.load(os.path.join(model_copy, 'disease_rf_model.joblib'))
+    assert NEW_DISEASE in model.classes_
+    assert list(model.feature_names_in_) == [
+        f'has_{s}' for s in joblib.load(os.path.join(model_copy, 'symptom_list.joblib'))]
+    compiled = CompiledForest.load(os.path.join(model_copy, 'disease_rf_compiled.npz'))
+    assert NEW_DISEASE in list(compiled.classes_)
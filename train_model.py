@@ -2,101 +2,343 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import GridSearchCV, train_test_split, StratifiedKFold
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables Halving*SearchCV)
+from sklearn.model_selection import (GridSearchCV, RandomizedSearchCV, HalvingGridSearchCV,
+                                     HalvingRandomSearchCV, train_test_split, StratifiedKFold)
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import joblib
 import os
+import time
+import argparse
+import json
+from contextlib import contextmanager
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from forest_engine import CompiledForest, export_forest, save_compiled_forest, verify_compiled_forest
+from model_bundle import write_bundle
+from feature_store import build_feature_store, clean_dataset_frame, peak_rss_mb
+from forest_compaction import balanced_accuracy, compact_forest, print_tradeoff, sub_forest
+from training_cache import CachedCVScorer, LazyRandomForestClassifier, TrainingCache, file_digest
 
-def train_disease_model(dataset_path='dataset/dataset.csv', output_dir='models'):
+SEARCH_STRATEGIES = ('grid', 'random', 'halving-grid', 'halving-random')
+
+# Dense training set size above which streaming without dedupe or max_train_rows warns;
+# training holds the uint8 frame, its train/validation copies and sklearn's float32 copy
+DENSE_TRAINING_WARN_MB = 1024
+
+class PhaseTimer:
+    """
+    Collects wall-clock and CPU time per training phase.
+    
+    CPU time is that of the training process itself; with n_jobs=-1 the work done
+    in the search's worker processes shows up in wall-clock time only.
+    """
+    def __init__(self):
+        self.timings = {}
+    
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.timings[name] = {
+                'wall_s': round(time.perf_counter() - wall, 3),
+                'cpu_s': round(time.process_time() - cpu, 3)
+            }
+            print(f"[{name}] wall {self.timings[name]['wall_s']:.2f}s, cpu {self.timings[name]['cpu_s']:.2f}s")
+
+def build_search(strategy, estimator, param_grid, cv, search_budget=20, random_state=42,
+                 n_samples=None, n_classes=None, scoring='balanced_accuracy'):
+    """
+    Create the hyperparameter search for a strategy.
+    
+    Args:
+        strategy: 'grid' (exhaustive GridSearchCV), 'random' (RandomizedSearchCV over
+            the same grid with search_budget candidates), 'halving-grid'
+            (HalvingGridSearchCV) or 'halving-random' (HalvingRandomSearchCV
+            starting from search_budget candidates)
+        estimator: Base estimator
+        param_grid: Parameter grid, also used as the sampling space for random searches
+        cv: Cross-validation splitter
+        search_budget: Number of candidates for the randomized strategies
+        n_samples, n_classes: Size of the training data, used to pick the halving resource
+        scoring: Scorer name or callable (e.g. a CachedCVScorer)
+    """
+    common = dict(cv=cv, n_jobs=-1, verbose=1, scoring=scoring)
+    
+    # Halving over rows needs at least 2 * n_splits * n_classes rows in the first
+    # round; smaller (e.g. deduplicated) datasets halve over the number of trees instead
+    if (strategy.startswith('halving') and n_samples is not None and n_classes is not None
+            and n_samples < 2 * cv.get_n_splits() * n_classes and 'n_estimators' in param_grid):
+        tree_counts = param_grid['n_estimators']
+        param_grid = {k: v for k, v in param_grid.items() if k != 'n_estimators'}
+        common.update(resource='n_estimators', min_resources=min(tree_counts),
+                      max_resources=max(tree_counts))
+
+    if strategy == 'grid':
+        return GridSearchCV(estimator, param_grid, **common)
+    if strategy == 'random':
+        return RandomizedSearchCV(estimator, param_grid, n_iter=search_budget,
+                                  random_state=random_state, **common)
+    # Successive halving: every candidate is scored on a small sample of the rows
+    # and only the best third advances to the next round with three times the data
+    if strategy == 'halving-grid':
+        return HalvingGridSearchCV(estimator, param_grid, factor=3,
+                                   random_state=random_state, **common)
+    if strategy == 'halving-random':
+        return HalvingRandomSearchCV(estimator, param_grid, n_candidates=search_budget, factor=3,
+                                     random_state=random_state, **common)
+    raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
+
+def load_dataset(dataset_path):
+    """
+    Read and clean a dataset.csv-shaped file.
+    
+    Returns:
+        Tuple of (df, symptom_cols) with stripped disease names and symptom
+        cells, empty/NaN symptom cells replaced by ''
+    """
+    return clean_dataset_frame(pd.read_csv(dataset_path))
+
+def encode_symptoms(df, symptom_cols):
+    """
+    One-hot encode the symptom columns of a cleaned dataset in a single pass.
+    
+    The Symptom_* cells are stacked into one array, factorized into sorted
+    symptom codes and scattered into a uint8 matrix, instead of building a
+    dict per row.
+    
+    Args:
+        df: Dataset with cleaned symptom columns ('' for empty cells)
+        symptom_cols: Names of the symptom columns
+    
+    Returns:
+        Tuple of (X, all_symptoms, symptom_occurrence, symptoms_per_row) where X is
+        a uint8 DataFrame with one 'has_<symptom>' column per symptom
+    """
+    values = df[symptom_cols].to_numpy(dtype=object)
+    present = (values != '') & (values != 'nan')
+    rows = np.nonzero(present)[0]
+    
+    # Codes follow the sorted symptom names, so columns come out in sorted order
+    codes, uniques = pd.factorize(values[present], sort=True)
+    all_symptoms = [str(s) for s in uniques]
+    
+    X = np.zeros((len(df), len(all_symptoms)), dtype=np.uint8)
+    X[rows, codes] = 1
+    
+    symptom_occurrence = dict(zip(all_symptoms, np.bincount(codes, minlength=len(all_symptoms)).tolist()))
+    symptoms_per_row = pd.Series(present.sum(axis=1), index=df.index)
+    
+    X = pd.DataFrame(X, columns=[f'has_{s}' for s in all_symptoms], index=df.index)
+    return X, all_symptoms, symptom_occurrence, symptoms_per_row
+
+def deduplicate(X, y):
+    """
+    Collapse identical (disease, symptom set) rows into one weighted row.
+    
+    Args:
+        X: One-hot feature DataFrame
+        y: Disease labels aligned with X
+    
+    Returns:
+        Tuple of (X_unique, y_unique, sample_weight) where sample_weight counts how
+        many original rows each unique row stands for
+    """
+    # Bit-pack each feature row and append the label code so a row is a short byte key
+    packed = np.packbits(X.to_numpy(dtype=np.uint8), axis=1)
+    label_codes = pd.factorize(y)[0].astype('>u4').view(np.uint8).reshape(len(y), 4)
+    keys = np.hstack([packed, label_codes])
+    
+    _, first, counts = np.unique(keys, axis=0, return_index=True, return_counts=True)
+    order = np.argsort(first)  # keep the original row order
+    first, counts = first[order], counts[order]
+    
+    return (X.iloc[first].reset_index(drop=True),
+            y.iloc[first].reset_index(drop=True),
+            counts.astype(np.float64))
+
+def save_model_artifacts(output_dir, model, all_symptoms, feature_importance):
+    """
+    Write the joblib artifacts loaded by the 'sklearn' engine (and, except for the
+    model itself, by the 'compiled' engine).
+    
+    Args:
+        output_dir: Model directory
+        model: Fitted RandomForestClassifier
+        all_symptoms: Feature order used by the model
+        feature_importance: Series of importances indexed by 'has_<symptom>'
+    """
+    joblib.dump(model, os.path.join(output_dir, 'disease_rf_model.joblib'))
+    joblib.dump(all_symptoms, os.path.join(output_dir, 'symptom_list.joblib'))
+    
+    # Also save symptom-to-feature mapping for easier interpretation
+    symptom_mapping = {
+        'symptom_to_feature': {s: f'has_{s}' for s in all_symptoms},
+        'feature_to_symptom': {f'has_{s}': s for s in all_symptoms}
+    }
+    joblib.dump(symptom_mapping, os.path.join(output_dir, 'symptom_mapping.joblib'))
+    
+    # Save feature importance for later use
+    joblib.dump(feature_importance, os.path.join(output_dir, 'feature_importance.joblib'))
+
+def train_disease_model(dataset_path='dataset/dataset.csv', output_dir='models',
+                        search='grid', search_budget=20, reuse_best_estimator=False,
+                        dedupe=False, streaming=False, chunksize=100_000, max_train_rows=None,
+                        compact=False,
+                        compact_tolerance=0.005, latency_budget_ms=None, compact_engine='compiled',
+                        use_cache=False, cache_dir=None, cache_max_mb=1024):
     """
     Train a disease prediction model based on symptoms.
     
     Args:
         dataset_path: Path to the main dataset CSV file
         output_dir: Directory to save model artifacts
+        search: Hyperparameter search strategy, one of SEARCH_STRATEGIES
+        search_budget: Candidates evaluated by the 'random' and 'halving-random' strategies
+        reuse_best_estimator: Ship the best estimator from the search (fitted on the
+            training split) instead of refitting the best parameters on the full dataset
+        dedupe: Train on unique (disease, symptom set) rows weighted by how often they
+            occur. Each unique row lands in exactly one of train/validation and one CV
+            fold, so duplicates never leak across a split
+        streaming: Ingest the CSV in chunks into a bit-packed feature store under
+            output_dir/feature_store and train from it, so ingestion memory is bounded
+            by chunksize rather than by the file size. Training memory is only bounded
+            with dedupe (it grows with the unique rows) or max_train_rows; otherwise
+            every row is densified for the search
+        chunksize: Rows per chunk for streaming ingestion
+        max_train_rows: With streaming and without dedupe, train on a stratified
+            sample of at most this many rows from the feature store
+        compact: Ship the smallest sub-forest (first n trees, each cut at a depth cap)
+            whose validation balanced accuracy is within compact_tolerance of the
+            full model, chosen on the search's best estimator and applied to the
+            final model. A refit final model is re-scored on the validation split
+            and shipped whole if the cut costs it more than compact_tolerance.
+            The trade-off curve is written to compaction_report.json
+        compact_tolerance: Largest acceptable drop in validation balanced accuracy
+        latency_budget_ms: Optional p95 per-prediction latency budget for compaction
+        compact_engine: Engine whose single-row latency compaction measures
+            ('compiled' or 'sklearn')
+        use_cache: Reuse the cleaned frame, vocabulary/feature matrix and per-fold CV
+            scores of earlier runs with the same dataset content and configuration,
+            so re-runs and widened grids only compute what is new. Off by default;
+            every reused stage is reported
+        cache_dir: Training cache directory (defaults to output_dir/training_cache)
+        cache_max_mb: Training cache size cap; least recently used entries are evicted
     
     Returns:
-        Dict with model performance metrics
+        Dict with model performance metrics, including wall-clock and CPU time per phase
     """
     print(f"Starting model training process at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    timer = PhaseTimer()
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # 1. Load main dataset
-    print("Loading dataset...")
-    df = pd.read_csv(dataset_path)
-    
-    # Clean column names and values
-    df.columns = [c.strip() for c in df.columns]
-    
-    # Extract symptom columns
-    symptom_cols = [c for c in df.columns if c.lower().startswith('symptom')]
-    for col in symptom_cols:
-        df[col] = df[col].astype(str).str.strip()
-        # Replace empty/NaN values with empty string
-        df[col] = df[col].fillna('').replace('nan', '')
+    cache = None
+    if use_cache:
+        cache_dir = cache_dir or os.path.join(output_dir, 'training_cache')
+        cache = TrainingCache(cache_dir, max_bytes=int(cache_max_mb * 1024 * 1024))
+        print(f"Training cache enabled ({cache_dir}): results of earlier runs are reused")
+        # Stages are keyed by the file's content, not its path or mtime
+        dataset_hash = file_digest(dataset_path)
     
-    # Clean disease names
-    df['Disease'] = df['Disease'].astype(str).str.strip()
-    
-    # 2. Analyze dataset
-    print(f"Dataset shape: {df.shape}")
-    print(f"Total unique diseases: {df['Disease'].nunique()}")
+    if streaming:
+        # 1-3. Stream the CSV into the feature store (vocabulary pass + encoding pass)
+        print(f"Streaming dataset into feature store ({chunksize} rows per chunk)...")
+        with timer.phase('load'):
+            store = build_feature_store(dataset_path, os.path.join(output_dir, 'feature_store'), chunksize)
+        n_rows = store.n_rows
+        all_symptoms = store.vocabulary
+        symptom_occurrence = store.symptom_occurrence
+        per_row = store.symptoms_per_row
+        print(f"Dataset rows: {n_rows}")
+        print(f"Total unique diseases: {len(store.classes)}")
+        
+        sample_weight = None
+        with timer.phase('encode'):
+            if dedupe:
+                # Collapse duplicates straight from the packed rows, never densifying all of them
+                X, y, sample_weight = store.deduplicated(chunksize)
+                print(f"Deduplicated {n_rows} rows into {len(X)} unique (disease, symptom set) rows")
+            else:
+                dense_mb = n_rows * len(all_symptoms) * 6 / (1024 * 1024)
+                if max_train_rows is not None and n_rows > max_train_rows:
+                    print(f"Warning: training on a stratified sample of {max_train_rows} "
+                          f"of {n_rows} rows (max_train_rows)")
+                    X, y = store.sample_frame(max_train_rows)
+                else:
+                    if dense_mb > DENSE_TRAINING_WARN_MB:
+                        print(f"Warning: training densifies all {n_rows} rows (~{dense_mb:,.0f} MiB); "
+                              f"use --dedupe or --max-train-rows to bound memory")
+                    X, y = store.to_frame()
+    else:
+        # 1. Load main dataset
+        print("Loading dataset...")
+        with timer.phase('load'):
+            if cache is not None:
+                df, symptom_cols = cache.cached('clean', lambda: load_dataset(dataset_path),
+                                                dataset=dataset_hash)
+                if cache.hits.get('clean'):
+                    print("Reused the cleaned dataset from the training cache")
+            else:
+                df, symptom_cols = load_dataset(dataset_path)
+        n_rows = len(df)
+        
+        # 2. Analyze dataset
+        print(f"Dataset shape: {df.shape}")
+        print(f"Total unique diseases: {df['Disease'].nunique()}")
+        
+        # 3. Build one-hot feature matrix
+        print("Creating one-hot encoded features...")
+        with timer.phase('encode'):
+            if cache is not None:
+                X, all_symptoms, symptom_occurrence, disease_symptom_counts = cache.cached(
+                    'encode', lambda: encode_symptoms(df, symptom_cols), dataset=dataset_hash)
+                if cache.hits.get('encode'):
+                    print("Reused the feature matrix from the training cache")
+            else:
+                X, all_symptoms, symptom_occurrence, disease_symptom_counts = encode_symptoms(df, symptom_cols)
+        per_row = {
+            'min': disease_symptom_counts.min(),
+            'max': disease_symptom_counts.max(),
+            'mean': disease_symptom_counts.mean()
+        }
+        
+        # Target vector
+        y = df['Disease']
+        sample_weight = None
+        del df
+        
+        if dedupe:
+            with timer.phase('dedupe'):
+                X, y, sample_weight = deduplicate(X, y)
+            print(f"Deduplicated {n_rows} rows into {len(X)} unique (disease, symptom set) rows")
     
     # Count symptoms per disease
-    disease_symptom_counts = df.apply(
-        lambda row: sum(1 for col in symptom_cols if row[col]), axis=1
-    )
-    print(f"Symptoms per disease - Min: {disease_symptom_counts.min()}, "
-          f"Max: {disease_symptom_counts.max()}, "
-          f"Avg: {disease_symptom_counts.mean():.2f}")
-    
-    # 3. Build one-hot feature matrix
-    print("Creating one-hot encoded features...")
-    # Get all unique symptoms, excluding empty strings and NaN values
-    all_symptoms = sorted({
-        s for col in symptom_cols 
-        for s in df[col].unique() 
-        if s and s != 'nan' and not pd.isna(s)
-    })
+    print(f"Symptoms per disease - Min: {per_row['min']}, "
+          f"Max: {per_row['max']}, "
+          f"Avg: {per_row['mean']:.2f}")
     print(f"Total unique symptoms: {len(all_symptoms)}")
     
-    # Create feature dictionary and save mapping of symptoms
-    data = []
-    # Track which symptoms actually appear in the dataset
-    symptom_occurrence = {sym: 0 for sym in all_symptoms}
-    
-    for _, row in df.iterrows():
-        # Get all non-empty symptoms for this row
-        row_symptoms = [s for s in row[symptom_cols].values if s and s != 'nan']
-        # Create one-hot encoded features
-        vec = {f'has_{sym}': int(sym in row_symptoms) for sym in all_symptoms}
-        data.append(vec)
-        
-        # Update symptom occurrence counts
-        for sym in row_symptoms:
-            if sym in symptom_occurrence:
-                symptom_occurrence[sym] += 1
-    
     # Report on symptom distribution
     print(f"Most common symptoms: {sorted(symptom_occurrence.items(), key=lambda x: x[1], reverse=True)[:5]}")
     print(f"Least common symptoms: {sorted(symptom_occurrence.items(), key=lambda x: x[1])[:5]}")
     
-    # Create feature matrix and target vector
-    X = pd.DataFrame(data)
-    y = df['Disease']
-    
     # 4. Train/test split for validation
     print("Splitting data into train and validation sets...")
-    tX, vX, tY, vY = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+    if sample_weight is not None:
+        tX, vX, tY, vY, tW, vW = train_test_split(X, y, sample_weight, test_size=0.2,
+                                                  stratify=y, random_state=42)
+    else:
+        tX, vX, tY, vY = train_test_split(X, y, test_size=0.2, stratify=y, random_state=42)
+        tW = vW = None
     print(f"Training set size: {tX.shape[0]}, Validation set size: {vX.shape[0]}")
     
     # 5. Hyperparameter tuning with class balance
-    print("Starting hyperparameter tuning...")
+    print(f"Starting hyperparameter tuning ({search} search)...")
     param_grid = {
         'n_estimators': [100, 200, 500],
         'max_depth': [None, 20, 40, 60],
@@ -105,31 +347,53 @@ def train_disease_model(dataset_path='dataset/dataset.csv', output_dir='models')
     }
     
     # Use stratified k-fold to handle potential class imbalance
-    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-    
-    clf = GridSearchCV(
-        RandomForestClassifier(class_weight='balanced_subsample', random_state=42),
-        param_grid, 
-        cv=cv, 
-        n_jobs=-1, 
-        verbose=1,
-        scoring='balanced_accuracy'
+    # (deduplicated data can have fewer than 5 unique rows for a disease)
+    n_splits = int(min(5, tY.value_counts().min()))
+    cv = StratifiedKFold(n_splits=max(n_splits, 2), shuffle=True, random_state=42)
+    
+    # With the cache, forests are only fitted for (parameters, fold) pairs whose score
+    # is not cached yet; the scores are keyed by the fold contents and parameters
+    forest_class = LazyRandomForestClassifier if cache is not None else RandomForestClassifier
+    clf = build_search(
+        search,
+        forest_class(class_weight='balanced_subsample', random_state=42),
+        param_grid,
+        cv,
+        search_budget=search_budget,
+        n_samples=len(tX),
+        n_classes=tY.nunique(),
+        scoring=CachedCVScorer(cache) if cache is not None else 'balanced_accuracy'
     )
+    cached_scores = cache.count('cv_score') if cache is not None else 0
     
-    clf.fit(tX, tY)
+    with timer.phase('search'):
+        # Weights are sliced per CV fold and passed on to every forest fit
+        fit_params = {'sample_weight': tW} if tW is not None else {}
+        clf.fit(tX, tY, **fit_params)
+    n_fits = len(clf.cv_results_['params']) * cv.get_n_splits()
     print(f"Best parameters: {clf.best_params_}")
-    print(f"Best cross-validation score: {clf.best_score_:.4f}")
+    print(f"Best cross-validation score: {clf.best_score_:.4f} ({n_fits} CV fits)")
+    if cache is not None:
+        # Scores are cached by the worker processes, so count new entries instead of
+        # misses; halving searches also score every training fold
+        n_scores = n_fits * (2 if clf.return_train_score else 1)
+        computed = min(max(cache.count('cv_score') - cached_scores, 0), n_scores)
+        print(f"CV scores: {n_scores - computed} reused from the cache, {computed} computed")
     
     # 6. Evaluate on validation set
     print("Evaluating model on validation set...")
-    v_pred = clf.predict(vX)
-    v_accuracy = accuracy_score(vY, v_pred)
+    with timer.phase('evaluate'):
+        v_pred = clf.predict(vX)
+        # Weighted by multiplicity, so this matches accuracy over the original rows
+        v_accuracy = accuracy_score(vY, v_pred, sample_weight=vW)
     
     print(f"Validation accuracy: {v_accuracy:.4f}")
-    print(classification_report(vY, v_pred))
+    print(classification_report(vY, v_pred, sample_weight=vW))
     
     # 7. Analyze feature importance
     best_model = clf.best_estimator_
+    if isinstance(best_model, LazyRandomForestClassifier):
+        best_model = best_model.to_forest()
     feature_importance = pd.Series(
         best_model.feature_importances_, 
         index=X.columns
@@ -141,31 +405,83 @@ def train_disease_model(dataset_path='dataset/dataset.csv', output_dir='models')
         symptom = feature[4:] if feature.startswith('has_') else feature
         print(f"  - {symptom}: {importance:.4f}")
     
-    # 8. Retrain on full data with best params
-    print("Training final model on full dataset...")
-    final_model = RandomForestClassifier(
-        **clf.best_params_,
-        class_weight='balanced_subsample',
-        random_state=42
-    )
-    final_model.fit(X, y)
-    
-    # 9. Save model artifacts
-    model_path = os.path.join(output_dir, 'disease_rf_model.joblib')
-    symptoms_path = os.path.join(output_dir, 'symptom_list.joblib')
+    # 8. Retrain on full data with best params (or keep the search's refit model)
+    if reuse_best_estimator:
+        print("Reusing the best estimator from the search (trained on the training split)...")
+        final_model = best_model
+    else:
+        print("Training final model on full dataset...")
+        with timer.phase('final_fit'):
+            final_model = RandomForestClassifier(
+                **clf.best_params_,
+                class_weight='balanced_subsample',
+                random_state=42
+            )
+            final_model.fit(X, y, sample_weight=sample_weight)
     
-    joblib.dump(final_model, model_path)
-    joblib.dump(all_symptoms, symptoms_path)
+    # 8b. Keep only as many trees and as much depth as validation accuracy needs
+    compaction = None
+    if compact:
+        print(f"Compacting forest (balanced accuracy tolerance {compact_tolerance})...")
+        with timer.phase('compact'):
+            # Selected on held-out rows with the search's model, which never saw them
+            compaction, curve = compact_forest(best_model, vX, vY, vW, tolerance=compact_tolerance,
+                                               latency_budget_ms=latency_budget_ms,
+                                               engine=compact_engine)
+            compacted = sub_forest(final_model, compaction['n_trees'], compaction['max_depth'])
+            compaction['applied'] = True
+            if final_model is not best_model:
+                # The refit model's trees differ from the evaluated ones: check the cut
+                # on them too and ship the full forest if it costs more than the tolerance
+                full_score = balanced_accuracy(final_model, vX, vY, vW)
+                compacted_score = balanced_accuracy(compacted, vX, vY, vW)
+                compaction['final_model_check'] = {
+                    'full_balanced_accuracy': full_score,
+                    'compacted_balanced_accuracy': compacted_score,
+                    'accuracy_drop': round(full_score - compacted_score, 6)
+                }
+                compaction['applied'] = full_score - compacted_score <= compact_tolerance
+        print_tradeoff(curve, compaction)
+        print(f"Selected {compaction['n_trees']} trees, max depth {compaction['max_depth']} "
+              f"(balanced accuracy drop {compaction['accuracy_drop']:.4f})")
+        if compaction['applied']:
+            final_model = compacted
+        else:
+            print(f"Warning: on the final model the sub-forest drops balanced accuracy by "
+                  f"{compaction['final_model_check']['accuracy_drop']:.4f} (> {compact_tolerance}); "
+                  f"shipping the full forest")
+        with open(os.path.join(output_dir, 'compaction_report.json'), 'w') as f:
+            json.dump({
+                'tolerance': compact_tolerance,
+                'latency_budget_ms': latency_budget_ms,
+                'engine': compact_engine,
+                'selected': compaction,
+                'curve': curve
+            }, f, indent=2)
     
-    # Also save symptom-to-feature mapping for easier interpretation
-    symptom_mapping = {
-        'symptom_to_feature': {s: f'has_{s}' for s in all_symptoms},
-        'feature_to_symptom': {f'has_{s}': s for s in all_symptoms}
-    }
-    joblib.dump(symptom_mapping, os.path.join(output_dir, 'symptom_mapping.joblib'))
+    # 9. Save model artifacts
+    save_model_artifacts(output_dir, final_model, all_symptoms, feature_importance)
     
-    # Save feature importance for later use
-    joblib.dump(feature_importance, os.path.join(output_dir, 'feature_importance.joblib'))
+    with timer.phase('export'):
+        # Export the forest as flat arrays for the compiled inference engine and
+        # check it reproduces sklearn's probabilities on the training rows
+        compiled_path = save_compiled_forest(final_model, output_dir)
+        max_diff = verify_compiled_forest(final_model, CompiledForest.load(compiled_path), X.values)
+        print(f"Compiled forest exported to {compiled_path} (max probability difference {max_diff:.2e})")
+        
+        # Write a versioned, memory-mappable bundle for multi-process serving
+        bundle_path = write_bundle(
+            output_dir, export_forest(final_model), all_symptoms, feature_importance.to_dict(),
+            metadata={
+                'dataset': dataset_path,
+                'search': search,
+                'best_params': clf.best_params_,
+                'validation_accuracy': float(v_accuracy),
+                'cv_score': float(clf.best_score_),
+                'compaction': compaction
+            }
+        )
+        print(f"Model bundle written to {bundle_path}")
     
     print(f"Training complete. Artifacts saved in {output_dir}/")
     
@@ -174,11 +490,85 @@ def train_disease_model(dataset_path='dataset/dataset.csv', output_dir='models')
         'accuracy': v_accuracy,
         'best_params': clf.best_params_,
         'cv_score': clf.best_score_,
-        'feature_importance': feature_importance.head(10).to_dict()
+        'feature_importance': feature_importance.head(10).to_dict(),
+        'search': search,
+        'n_cv_fits': n_fits,
+        'n_training_rows': len(X),
+        'compaction': compaction,
+        'timings': timer.timings,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'cache': cache.stats() if cache is not None else None
     }
 
-if __name__ == '__main__':
-    metrics = train_disease_model()
+def main():
+    """Command-line entry point for training"""
+    parser = argparse.ArgumentParser(description='Train the disease prediction model')
+    parser.add_argument('--dataset', default='dataset/dataset.csv', help='Path to the dataset CSV')
+    parser.add_argument('--output-dir', default='models', help='Directory to save model artifacts')
+    parser.add_argument('--search', choices=SEARCH_STRATEGIES, default='grid',
+                        help='Hyperparameter search strategy')
+    parser.add_argument('--search-budget', type=int, default=20,
+                        help='Candidates evaluated by the random and halving-random strategies')
+    parser.add_argument('--reuse-best-estimator', action='store_true',
+                        help='Skip the final refit on the full dataset')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Ingest the dataset in chunks through an on-disk feature store')
+    parser.add_argument('--chunksize', type=int, default=100_000,
+                        help='Rows per chunk for streaming ingestion')
+    parser.add_argument('--max-train-rows', type=int, default=None,
+                        help='With --streaming and without --dedupe, train on a stratified sample of this many rows')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='Collapse duplicate rows into weighted unique rows before training')
+    parser.add_argument('--compact', action='store_true',
+                        help='Ship the smallest sub-forest within --compact-tolerance of the full model')
+    parser.add_argument('--compact-tolerance', type=float, default=0.005,
+                        help='Largest acceptable drop in validation balanced accuracy when compacting')
+    parser.add_argument('--latency-budget-ms', type=float, default=None,
+                        help='p95 per-prediction latency budget for the compacted forest')
+    parser.add_argument('--compact-engine', choices=('compiled', 'sklearn'), default='compiled',
+                        help='Engine whose latency compaction measures')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse cached stages and CV scores of earlier runs (each reuse is logged)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Training cache directory with --cache (default: <output-dir>/training_cache)')
+    parser.add_argument('--cache-max-mb', type=float, default=1024,
+                        help='Training cache size cap in MiB')
+    args = parser.parse_args()
+    
+    metrics = train_disease_model(
+        dataset_path=args.dataset,
+        output_dir=args.output_dir,
+        search=args.search,
+        search_budget=args.search_budget,
+        reuse_best_estimator=args.reuse_best_estimator,
+        dedupe=args.dedupe,
+        streaming=args.streaming,
+        chunksize=args.chunksize,
+        max_train_rows=args.max_train_rows,
+        compact=args.compact,
+        compact_tolerance=args.compact_tolerance,
+        latency_budget_ms=args.latency_budget_ms,
+        compact_engine=args.compact_engine,
+        use_cache=args.cache,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb
+    )
     print("\nTraining Summary:")
     print(f"Validation Accuracy: {metrics['accuracy']:.4f}")
     print(f"Cross-Validation Score: {metrics['cv_score']:.4f}")
+    print(f"Search: {metrics['search']} ({metrics['n_cv_fits']} CV fits)")
+    if metrics['compaction']:
+        c = metrics['compaction']
+        if c['applied']:
+            print(f"Compacted forest: {c['n_trees']} trees, max depth {c['max_depth']}, "
+                  f"{c['n_nodes']} nodes, p95 {c['latency_p95_ms']:.3f} ms")
+        else:
+            print("Compaction rejected on the final model: shipped the full forest")
+    for phase, timing in metrics['timings'].items():
+        print(f"  {phase:<10} wall {timing['wall_s']:8.2f}s  cpu {timing['cpu_s']:8.2f}s")
+    print(f"Peak RSS: {metrics['peak_rss_mb']:.1f} MiB")
+    if metrics['cache']:
+        print(f"Training cache: {metrics['cache']['entries']} entries, {metrics['cache']['size_mb']:.1f} MiB")
+
+if __name__ == '__main__':
+    main()
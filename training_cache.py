@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import balanced_accuracy_score
+
+# Part of every key; bump when a cached stage's code changes what it produces
+CACHE_FORMAT_VERSION = 1
+ENTRY_SUFFIX = '.joblib'
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def data_digest(data: Any) -> str:
+    """
+    SHA-256 of an array, DataFrame or Series, including its shape, dtype and column names
+
+    Object (string) data is hashed through its string values, so two frames with
+    the same cells hash alike regardless of how they were built.
+    """
+    digest = hashlib.sha256()
+    if data is None:
+        return 'none'
+    if isinstance(data, pd.DataFrame):
+        digest.update(json.dumps([str(c) for c in data.columns]).encode())
+    values = data.to_numpy() if isinstance(data, (pd.DataFrame, pd.Series)) else np.asarray(data)
+    digest.update(f'{values.shape}{values.dtype}'.encode())
+    if values.dtype == object:
+        digest.update('\x00'.join(map(str, values.ravel())).encode())
+    else:
+        digest.update(np.ascontiguousarray(values).data)
+    return digest.hexdigest()
+
+
+class TrainingCache:
+    """
+    Content-addressed on-disk cache of training stage results
+
+    An entry's key is a hash of the stage name and everything its result depends
+    on (typically the dataset's content hash and the stage configuration), so a
+    changed input simply misses instead of needing invalidation. Entries are
+    joblib files written atomically, which makes the cache safe to share with the
+    search's worker processes. When the directory grows beyond max_bytes the
+    least recently used entries are removed.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 30):
+        """
+        Args:
+            cache_dir: Directory holding the entries (created if needed)
+            max_bytes: Size cap; entries are evicted least recently used first
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        # Size estimate of this process's view of the directory; None until first scanned
+        self._approx_bytes: Optional[int] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Worker processes start with fresh counters and their own size estimate
+        return {'cache_dir': self.cache_dir, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state['cache_dir'], state['max_bytes'])
+
+    def key(self, stage: str, **parts: Any) -> str:
+        """Entry key of a stage result depending on parts (JSON-serializable or repr-able values)"""
+        payload = json.dumps({'format': CACHE_FORMAT_VERSION, 'sklearn': sklearn.__version__,
+                              'stage': stage, 'parts': parts}, sort_keys=True, default=repr)
+        return f'{stage}-{hashlib.sha256(payload.encode()).hexdigest()[:40]}'
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Stored value for key, or None on a miss"""
+        path = self._path(key)
+        stage = key.rsplit('-', 1)[0]
+        try:
+            value = joblib.load(path)
+            os.utime(path)  # mark as recently used for eviction
+        except FileNotFoundError:
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+            return None
+        except Exception:
+            # Truncated or unreadable entry: drop it and recompute
+            self._remove(path)
+            self.misses[stage] = self.misses.get(stage, 0) + 1
+            return None
+        self.hits[stage] = self.hits.get(stage, 0) + 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store value under key, then evict old entries if the cache is over its cap"""
+        path = self._path(key)
+        tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+        joblib.dump(value, tmp)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, path)
+        if self._approx_bytes is None:
+            self._approx_bytes = self.size()
+        else:
+            self._approx_bytes += size
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def cached(self, stage: str, compute: Callable[[], Any], **parts: Any) -> Any:
+        """Value of compute() for a stage and its inputs, computed only on a miss"""
+        key = self.key(stage, **parts)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue  # evicted by another process meanwhile
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def size(self) -> int:
+        """Total bytes of the stored entries"""
+        return sum(size for _, size, _ in self._entries())
+
+    def count(self, stage: Optional[str] = None) -> int:
+        """Number of stored entries, optionally of one stage only"""
+        return sum(1 for _, _, name in self._entries() if stage is None or name.startswith(stage + '-'))
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache is below 90% of its cap"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, name in entries:
+            if total <= target:
+                break
+            self._remove(os.path.join(self.cache_dir, name))
+            total -= size
+            removed += 1
+        self._approx_bytes = total
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits and misses per stage in this process, plus the current size"""
+        return {'hits': dict(self.hits), 'misses': dict(self.misses),
+                'entries': self.count(), 'size_mb': round(self.size() / (1024 * 1024), 2)}
+
+
+class LazyRandomForestClassifier(RandomForestClassifier):
+    """
+    RandomForestClassifier that only fits when its predictions are first needed
+
+    fit() records the training data and a fingerprint of it and of the
+    parameters (fit_key_). Paired with CachedCVScorer in a hyperparameter
+    search, a (parameters, fold) combination whose score is already cached is
+    never fitted at all.
+    """
+    def fit(self, X, y, sample_weight=None):
+        self.fit_key_ = hashlib.sha256(json.dumps({
+            'params': {k: repr(v) for k, v in sorted(self.get_params(deep=False).items())},
+            'X': data_digest(X), 'y': data_digest(y), 'sample_weight': data_digest(sample_weight)
+        }, sort_keys=True).encode()).hexdigest()
+        self._pending = (X, y, sample_weight)
+        return self
+
+    def _materialize(self) -> None:
+        pending = self.__dict__.pop('_pending', None)
+        if pending is not None:
+            X, y, sample_weight = pending
+            RandomForestClassifier.fit(self, X, y, sample_weight=sample_weight)
+
+    def __getattr__(self, name: str) -> Any:
+        # Fitted attributes (estimators_, classes_, ...) fit the forest on first access
+        if name.startswith('__') or not name.endswith('_') or '_pending' not in self.__dict__:
+            raise AttributeError(name)
+        self._materialize()
+        return getattr(self, name)
+
+    def predict_proba(self, X):
+        self._materialize()
+        return super().predict_proba(X)
+
+    def predict(self, X):
+        self._materialize()
+        return super().predict(X)
+
+    def to_forest(self) -> RandomForestClassifier:
+        """The fitted model as a plain RandomForestClassifier, for saving and serving"""
+        self._materialize()
+        forest = RandomForestClassifier(**self.get_params())
+        forest.__dict__.update({k: v for k, v in self.__dict__.items() if k != 'fit_key_'})
+        return forest
+
+
+class CachedCVScorer:
+    """
+    Balanced-accuracy scorer that caches each score by training fold, parameters and test fold
+
+    Used as a search's scoring with LazyRandomForestClassifier as the estimator:
+    on a hit the cached score is returned and the forest is never fitted.
+    """
+    name = 'balanced_accuracy'
+
+    def __init__(self, cache: TrainingCache):
+        self.cache = cache
+
+    def __call__(self, estimator, X, y, sample_weight=None) -> float:
+        # Accepting sample_weight makes the search pass the fold's weights, as it
+        # does for the built-in 'balanced_accuracy' scorer
+        fit_key = getattr(estimator, 'fit_key_', None)
+        if fit_key is None:
+            return float(balanced_accuracy_score(y, estimator.predict(X), sample_weight=sample_weight))
+        key = self.cache.key('cv_score', fit=fit_key, X=data_digest(X), y=data_digest(y),
+                             sample_weight=data_digest(sample_weight), metric=self.name)
+        score = self.cache.get(key)
+        if score is None:
+            score = float(balanced_accuracy_score(y, estimator.predict(X), sample_weight=sample_weight))
+            self.cache.put(key, score)
+        return score
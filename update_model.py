@@ -0,0 +1,320 @@
+# File: update_model.py
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+
+from feature_store import encode_with_vocabulary
+from forest_engine import CompiledForest, align_forest, export_forest, merge_forests, save_compiled_forest
+from model_bundle import open_bundle, write_bundle
+from train_model import encode_symptoms, load_dataset, save_model_artifacts
+
+UPDATE_MODES = ('add-trees', 'refit')
+ENGINES = ('sklearn', 'compiled', 'mmap')
+
+# Tree settings used when the current bundle does not record the tuned parameters
+DEFAULT_TREE_PARAMS = {'max_depth': None, 'min_samples_leaf': 1, 'min_samples_split': 2}
+
+# Vote shares tried for the added trees besides their share of the tree count
+NEW_SHARE_CANDIDATES = (0.25, 0.5, 0.75)
+
+# Fraction of the new records held out from the added trees to choose their vote share
+HOLDOUT_FRACTION = 0.25
+
+def _tree_params(bundle):
+    """Tuned forest parameters recorded by train_disease_model, minus n_estimators"""
+    params = dict(DEFAULT_TREE_PARAMS)
+    params.update(bundle.manifest.get('metadata', {}).get('best_params') or {})
+    params.pop('n_estimators', None)
+    return params
+
+def _tuned_n_estimators(bundle, default):
+    """Tree count chosen by the last hyperparameter search, as recorded in the bundle"""
+    return int((bundle.manifest.get('metadata', {}).get('best_params') or {}).get('n_estimators', default))
+
+def _merge_added_trees(base_arrays, extra, classes, n_features, new_share):
+    """Existing forest plus the added trees, with new_share of the vote going to the latter"""
+    return merge_forests(
+        align_forest(base_arrays, classes, n_features),
+        align_forest(export_forest(extra), classes, n_features),
+        shares=[1.0 - new_share, new_share]
+    )
+
+def _accuracy(forest, X, y):
+    """Accuracy of a compiled forest on rows it may not fully know (unknown classes count as misses)"""
+    if len(X) == 0:
+        return None
+    return float(accuracy_score(y, forest.predict(X[:, :forest.n_features_in_])))
+
+def _split_new_records(y, holdout, seed):
+    """Indices of the new records the added trees train on, and of those held out from them"""
+    idx = np.arange(len(y))
+    n_holdout = int(round(len(y) * holdout))
+    if n_holdout == 0 or n_holdout >= len(y):
+        return idx, idx[:0]
+    try:
+        return train_test_split(idx, test_size=n_holdout, stratify=y, random_state=seed)
+    except ValueError:
+        # Some disease has too few new records to appear on both sides
+        return train_test_split(idx, test_size=n_holdout, random_state=seed)
+
+def update_model(new_data_path, model_dir='models', mode='add-trees', n_trees=50,
+                 new_share=None, base_dataset='dataset/dataset.csv', engine='mmap',
+                 holdout=HOLDOUT_FRACTION, max_old_accuracy_drop=0.0, random_state=None):
+    """
+    Fold newly labelled records into the current model without a hyperparameter search.
+
+    The current model is the latest bundle in model_dir/bundles. The result is
+    written as a new bundle version; 'refit' also rewrites the joblib and .npz
+    artifacts, so every engine serves it. An 'add-trees' forest carries
+    per-forest vote shares that only exist as compiled arrays, so it can only
+    be served with engine='mmap'.
+
+    Accuracy on the original records (base_dataset) is measured before and
+    after, and the update is refused if it drops by more than
+    max_old_accuracy_drop.
+
+    Args:
+        new_data_path: dataset.csv-shaped file with the new records
+        model_dir: Directory containing the model bundles
+        mode: 'add-trees' trains n_trees new trees on the new records and
+            appends them to the existing forest; 'refit' refits a forest with the
+            tuned parameters on base_dataset plus the new records
+        n_trees: Number of trees added in 'add-trees' mode
+        new_share: Fraction of the vote given to the added trees. By default it is
+            chosen among their tree-count share and NEW_SHARE_CANDIDATES: the share
+            with the best accuracy on the held-out new records among those keeping
+            the original records' accuracy (smallest share on ties)
+        base_dataset: The data the current model was trained on
+        engine: MODEL_ENGINE of the deployment that is to serve the update
+        holdout: Fraction of the new records held out from the added trees to
+            choose their share (0 trains on all of them; the share is then chosen
+            on the original records alone)
+        max_old_accuracy_drop: Largest acceptable drop in accuracy on the original records
+        random_state: Seed for the new trees and the holdout split (defaults to a time-based seed)
+
+    Returns:
+        Dict with the new bundle path and before/after accuracy on the new and original records
+
+    Raises:
+        ValueError for an engine that cannot serve the update, RuntimeError if
+        the update is refused
+    """
+    if mode not in UPDATE_MODES:
+        raise ValueError(f"Unknown update mode '{mode}', expected one of {UPDATE_MODES}")
+    if mode == 'add-trees' and engine != 'mmap':
+        raise ValueError(f"An add-trees update is only published as a model bundle, which the "
+                         f"'{engine}' engine does not load; serve with MODEL_ENGINE=mmap or use --mode refit")
+    if base_dataset is None:
+        raise ValueError("update_model needs base_dataset (the data the current model was trained on)")
+    start = time.perf_counter()
+    print(f"Starting incremental model update at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # 1. Current model, new records and the original records
+    bundle = open_bundle(model_dir, mmap=True)
+    base_arrays = bundle.forest_arrays()
+    current = CompiledForest(base_arrays)
+    vocabulary = list(bundle.symptom_list)
+    classes = [str(c) for c in base_arrays['classes']]
+    print(f"Current model: bundle {bundle.version} ({current.n_estimators} trees, "
+          f"{len(vocabulary)} symptoms, {len(classes)} diseases)")
+
+    df, symptom_cols = load_dataset(new_data_path)
+    base_df, base_cols = load_dataset(base_dataset)
+    print(f"New records: {len(df)}, original records: {len(base_df)}")
+
+    # 2. Extend the vocabulary and class list; new entries go last so the
+    # existing trees' feature indices and class columns stay valid
+    values = df[symptom_cols].to_numpy(dtype=object)
+    seen = {str(s) for s in values[(values != '') & (values != 'nan')]}
+    new_symptoms = sorted(seen - set(vocabulary))
+    new_diseases = sorted(set(df['Disease']) - set(classes))
+    vocabulary += new_symptoms
+    classes += new_diseases
+    if new_symptoms:
+        print(f"New symptoms: {new_symptoms}")
+    if new_diseases:
+        print(f"New diseases: {new_diseases}")
+
+    X_new, _, _ = encode_with_vocabulary(df, symptom_cols, vocabulary)
+    y_new = df['Disease'].to_numpy()
+    X_old, _, _ = encode_with_vocabulary(base_df, base_cols, vocabulary)
+    y_old = base_df['Disease'].to_numpy()
+    accuracy_before = _accuracy(current, X_new, y_new)
+    old_accuracy_before = _accuracy(current, X_old, y_old)
+    print(f"Accuracy on the original records before the update: {old_accuracy_before:.4f}")
+
+    params = _tree_params(bundle)
+    n_estimators = _tuned_n_estimators(bundle, current.n_estimators)
+    seed = random_state if random_state is not None else int(time.time())
+    holdout_accuracy = None
+
+    # 3. Build the updated forest
+    if mode == 'add-trees':
+        fit_idx, holdout_idx = _split_new_records(y_new, holdout, seed)
+        X_holdout, y_holdout = X_new[holdout_idx], y_new[holdout_idx]
+        print(f"Training {n_trees} new trees on {len(fit_idx)} new records "
+              f"({len(holdout_idx)} held out to choose their vote share)...")
+        extra = RandomForestClassifier(n_estimators=n_trees, class_weight='balanced_subsample',
+                                       random_state=seed, **params)
+        extra.fit(X_new[fit_idx], y_new[fit_idx])
+
+        # The original records guard against the added trees outvoting what the
+        # model already knows; the held-out new records rank what is left
+        if new_share is not None:
+            shares = [new_share]
+        else:
+            shares = sorted({n_trees / (current.n_estimators + n_trees), *NEW_SHARE_CANDIDATES})
+        print(f"{'share':>6} {'original':>9} {'held-out new':>13}")
+        best = None
+        for share in shares:
+            candidate = _merge_added_trees(base_arrays, extra, classes, len(vocabulary), share)
+            forest = CompiledForest(candidate)
+            old_accuracy = _accuracy(forest, X_old, y_old)
+            new_accuracy = _accuracy(forest, X_holdout, y_holdout)
+            print(f"{share:>6.2f} {old_accuracy:>9.4f} "
+                  f"{new_accuracy if new_accuracy is not None else float('nan'):>13.4f}")
+            if old_accuracy_before - old_accuracy > max_old_accuracy_drop:
+                continue
+            rank = new_accuracy if new_accuracy is not None else old_accuracy
+            if best is None or rank > best[0]:
+                best = (rank, share, candidate, new_accuracy)
+        if best is None:
+            raise RuntimeError(f"Update refused: every vote share tried for the added trees lowers "
+                               f"accuracy on the original records by more than {max_old_accuracy_drop}; "
+                               f"consider --mode refit")
+        _, new_share, merged, holdout_accuracy = best
+        print(f"Vote share of the added trees: {new_share:.2f}")
+
+        # Importances: blend of the old forest and the new trees by vote share
+        old_importance = bundle.feature_importance or {}
+        importance = {
+            f'has_{s}': old_importance.get(f'has_{s}', 0.0) * (1.0 - new_share) + float(imp) * new_share
+            for s, imp in zip(vocabulary, extra.feature_importances_)
+        }
+        updated = CompiledForest(merged)
+        old_accuracy_after = _accuracy(updated, X_old, y_old)
+    else:
+        combined = pd.concat([base_df, df], ignore_index=True)
+        combined_cols = [c for c in combined.columns if c.lower().startswith('symptom')]
+        combined[combined_cols] = combined[combined_cols].fillna('')
+        X_all, vocabulary, _, _ = encode_symptoms(combined, combined_cols)
+        print(f"Refitting {n_estimators} trees on {len(combined)} records with the tuned parameters...")
+        refit = RandomForestClassifier(n_estimators=n_estimators, class_weight='balanced_subsample',
+                                       random_state=seed, **params)
+        refit.fit(X_all, combined['Disease'])
+        merged = export_forest(refit)
+        importance = pd.Series(refit.feature_importances_, index=X_all.columns).sort_values(ascending=False)
+        X_new, _, _ = encode_with_vocabulary(df, symptom_cols, vocabulary)
+        X_old, _, _ = encode_with_vocabulary(base_df, base_cols, vocabulary)
+        updated = CompiledForest(merged)
+        old_accuracy_after = _accuracy(updated, X_old, y_old)
+        if old_accuracy_before - old_accuracy_after > max_old_accuracy_drop:
+            raise RuntimeError(f"Update refused: accuracy on the original records drops from "
+                               f"{old_accuracy_before:.4f} to {old_accuracy_after:.4f}")
+
+    accuracy_after = _accuracy(updated, X_new, y_new)
+    print(f"Accuracy on the original records after the update: {old_accuracy_after:.4f}")
+    if accuracy_before is not None and accuracy_before < 1.0 and accuracy_after <= accuracy_before:
+        print(f"Warning: accuracy on the new records did not improve ({accuracy_before:.4f} -> "
+              f"{accuracy_after:.4f}); consider a larger --new-share or --mode refit")
+
+    # 4. Publish as a new bundle version (and, for a refit, as the joblib/npz artifacts)
+    if mode == 'refit':
+        save_model_artifacts(model_dir, refit, vocabulary, importance)
+        save_compiled_forest(refit, model_dir)
+        importance = importance.to_dict()
+    bundle_path = write_bundle(
+        model_dir, merged, vocabulary, importance,
+        metadata={
+            'parent': bundle.version,
+            'update_mode': mode,
+            'update_data': new_data_path,
+            'new_records': int(len(df)),
+            'new_symptoms': new_symptoms,
+            'new_diseases': new_diseases,
+            'new_share': new_share if mode == 'add-trees' else None,
+            'old_data_accuracy_before': old_accuracy_before,
+            'old_data_accuracy_after': old_accuracy_after,
+            # The searched tree count, so add-trees runs don't inflate a later refit
+            'best_params': {**params, 'n_estimators': n_estimators}
+        }
+    )
+    elapsed = time.perf_counter() - start
+    print(f"New model bundle written to {bundle_path} ({updated.n_estimators} trees) in {elapsed:.1f}s")
+
+    return {
+        'bundle_path': bundle_path,
+        'parent_version': bundle.version,
+        'mode': mode,
+        'n_trees': updated.n_estimators,
+        'new_symptoms': new_symptoms,
+        'new_diseases': new_diseases,
+        'new_data_accuracy_before': accuracy_before,
+        'new_data_accuracy_after': accuracy_after,
+        'holdout_accuracy': holdout_accuracy,
+        'old_data_accuracy_before': old_accuracy_before,
+        'old_data_accuracy_after': old_accuracy_after,
+        'new_share': new_share if mode == 'add-trees' else None,
+        'elapsed_s': round(elapsed, 3)
+    }
+
+def main():
+    """
+    Command-line entry point for incremental updates
+
+    Which engines serve the result depends on the mode:
+
+    - refit writes a new bundle and rewrites disease_rf_model.joblib, the
+      compiled .npz and the other joblib artifacts, so every MODEL_ENGINE picks
+      it up (the app's model watcher hot-reloads it).
+    - add-trees only writes a new bundle, because the merged forest's vote
+      shares cannot be expressed as an sklearn model. Only MODEL_ENGINE=mmap
+      serves it, so the command refuses to run unless --engine (which defaults
+      to $MODEL_ENGINE, else 'sklearn' like the app) is mmap.
+    """
+    parser = argparse.ArgumentParser(description='Fold new labelled records into the current model')
+    parser.add_argument('new_data', help='dataset.csv-shaped file with the new records')
+    parser.add_argument('--model-dir', default='models', help='Directory containing the model bundles')
+    parser.add_argument('--mode', choices=UPDATE_MODES, default='add-trees',
+                        help='Append trees trained on the new data, or refit on base + new data')
+    parser.add_argument('--engine', choices=ENGINES, default=os.environ.get('MODEL_ENGINE', 'sklearn'),
+                        help='MODEL_ENGINE of the deployment serving the update (add-trees needs mmap)')
+    parser.add_argument('--n-trees', type=int, default=50, help='Trees added in add-trees mode')
+    parser.add_argument('--new-share', type=float, default=None,
+                        help='Fraction of the vote given to the added trees (add-trees mode)')
+    parser.add_argument('--holdout', type=float, default=HOLDOUT_FRACTION,
+                        help='Fraction of the new records held out to choose the vote share (add-trees mode)')
+    parser.add_argument('--max-old-drop', type=float, default=0.0,
+                        help='Largest acceptable drop in accuracy on the original records')
+    parser.add_argument('--base-dataset', default='dataset/dataset.csv',
+                        help='Data the current model was trained on')
+    parser.add_argument('--random-state', type=int, default=None, help='Seed for the new trees')
+    args = parser.parse_args()
+
+    try:
+        metrics = update_model(args.new_data, model_dir=args.model_dir, mode=args.mode,
+                               n_trees=args.n_trees, new_share=args.new_share,
+                               base_dataset=args.base_dataset, engine=args.engine,
+                               holdout=args.holdout, max_old_accuracy_drop=args.max_old_drop,
+                               random_state=args.random_state)
+    except FileNotFoundError as e:
+        sys.exit(f"Error loading model files: {e}. Please ensure you've trained the model first.")
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Error: {e}")
+
+    print("\nUpdate Summary:")
+    for key in ('new_data_accuracy_before', 'new_data_accuracy_after', 'holdout_accuracy',
+                'old_data_accuracy_before', 'old_data_accuracy_after'):
+        value = metrics[key]
+        print(f"{key}: {value:.4f}" if value is not None else f"{key}: n/a")
+
+if __name__ == '__main__':
+    main()